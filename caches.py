@@ -0,0 +1,357 @@
+"""Ergebnis- und Audio-Cache sowie Checkpoints abgebrochener Jobs"""
+
+import os
+import numpy as np
+import hashlib
+import json
+import gzip
+from core import (
+    AUDIO_CACHE_MAX_MB, CACHE_DIR, COMPRESSION_RATIO_THRESHOLD, LOGPROB_THRESHOLD, NO_SPEECH_THRESHOLD,
+    RESULT_CACHE_MAX_MB, SAMPLE_RATE, TEMPERATURES, WINDOW_SECONDS, job_tasks, MelPrefix, PcmAudio, torch,
+)
+from decoding import CASCADE_LOGPROB_THRESHOLD, CASCADE_NO_SPEECH_THRESHOLD, DECODE_GUARD
+
+def audio_fingerprint(audio):
+    """SHA-256 über die PCM-Daten, unabhängig von Container und Dateiname"""
+    digest = hashlib.sha256()
+    block = SAMPLE_RATE * 60
+    for start in range(0, len(audio), block):
+        digest.update(np.ascontiguousarray(audio[start:start + block], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+class JobCheckpoint:
+    """Sichert fertig dekodierte Fenster eines Jobs in einer Datei neben den Ausgaben
+
+    Die Datei ist ein JSON-Lines-Protokoll: die erste Zeile enthält den Schlüssel
+    (Audio-Hash, Modell, Aufgaben, VAD), jede weitere Zeile die Segmente eines
+    fertigen Fensters samt Prompt-Kontext des Decoders und der Position je Aufgabe
+    (die Aufgaben rücken je nach Zeitstempeln unterschiedlich weit vor). Angehängte
+    Zeilen halten die Schreibkosten pro Fenster konstant; eine halb geschriebene
+    letzte Zeile nach einem Absturz wird beim Laden ignoriert.
+    """
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self._file = None
+
+    def load(self):
+        """Gibt den Fortsetzungszustand zurück oder None, wenn kein passender Checkpoint existiert"""
+        if not os.path.exists(self.path):
+            return None
+        resume = {"position": 0.0, "positions": {}, "segments": {}, "prompt": {}}
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            try:
+                header = f.readline()
+                if json.loads(header) != self.key:
+                    return None
+            except ValueError:
+                return None
+            valid_bytes = len(header)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                resume["position"] = record["position"]
+                resume["positions"] = record.get("positions", {})
+                resume["prompt"] = record["prompt"]
+                for name, segments in record["segments"].items():
+                    resume["segments"].setdefault(name, []).extend(segments)
+        resume["valid_bytes"] = valid_bytes
+        return resume if resume["position"] > 0 else None
+
+    def start(self, resume=None):
+        """Öffnet den Checkpoint zum Anhängen; ohne Fortsetzung wird er neu angelegt"""
+        if resume:
+            # Eine abgeschnittene letzte Zeile vor dem Anhängen entfernen
+            self._file = open(self.path, "r+b")
+            self._file.truncate(resume["valid_bytes"])
+            self._file.seek(resume["valid_bytes"])
+        else:
+            self._file = open(self.path, "wb")
+            self._write(self.key)
+
+    def save(self, position, segments, prompt, positions=None):
+        """Sichert ein fertiges Fenster; position ist die kleinste Position, positions die je Aufgabe"""
+        self._write({"position": position, "positions": positions or {}, "segments": segments, "prompt": prompt})
+
+    def _write(self, record):
+        self._file.write((json.dumps(record) + "\n").encode("utf-8"))
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def decode_options_key(vad=False, precision="fp32", condition_on_previous_text=False, word_timestamps=True,
+                       cascade_model=None):
+    """Alle Einstellungen, die das Dekodierergebnis beeinflussen (für Cache-Schlüssel)"""
+    options = {
+        "precision": precision,
+        "condition_on_previous_text": condition_on_previous_text,
+        "word_timestamps": word_timestamps,
+        "window_seconds": WINDOW_SECONDS,
+        "window_seek": "timestamps",  # Fenster rücken bis zum letzten vollständigen Segment vor
+        "temperatures": TEMPERATURES,
+        "decode_guard": DECODE_GUARD,
+        "compression_ratio_threshold": COMPRESSION_RATIO_THRESHOLD,
+        "logprob_threshold": LOGPROB_THRESHOLD,
+        "no_speech_threshold": NO_SPEECH_THRESHOLD,
+        "vad": vad,
+    }
+    # Nur mit Kaskade, damit die Schlüssel bisheriger Ergebnisse gültig bleiben
+    if cascade_model:
+        options["cascade"] = {
+            "model": cascade_model,
+            "logprob_threshold": CASCADE_LOGPROB_THRESHOLD,
+            "no_speech_threshold": CASCADE_NO_SPEECH_THRESHOLD,
+        }
+    return options
+
+def source_key(path):
+    """Identifiziert eine Quelldatei über Pfad, Größe und Änderungszeit"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+class ResultCache:
+    """Inhaltsadressierter Cache für Transkriptionsergebnisse (Segmente mit Zeitstempeln)
+
+    Ein Eintrag pro Aufgabe, adressiert über den Hash der PCM-Daten, das Modell, die
+    Aufgabe, die Sprache und die Dekodieroptionen. Zusätzlich merkt sich ein Index,
+    welcher Audio-Hash zu einer unveränderten Quelldatei gehört, sodass ein erneuter
+    Lauf ohne Audioextraktion und ohne Modell auskommt, und ein zweiter die erkannte
+    Sprache je Audio-Hash und Modell. Überschreitet der Cache seine Größe, werden die
+    am längsten nicht genutzten Einträge gelöscht.
+    """
+    def __init__(self, directory=None, max_mb=RESULT_CACHE_MAX_MB):
+        self.directory = directory or os.path.join(CACHE_DIR, "results")
+        self.max_mb = max_mb
+        self.index_file = os.path.join(self.directory, "sources.json")
+        self.language_file = os.path.join(self.directory, "languages.json")
+
+    @staticmethod
+    def key(fingerprint, model_id, task, options):
+        payload = {"audio": fingerprint, "model": model_id, "task": task, "options": options}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry["result"] if entry else None
+
+    def get_entry(self, key):
+        """Gibt den Eintrag mit Metadaten ({"meta", "result"}) zurück oder None"""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # Für LRU als zuletzt genutzt markieren
+        return entry
+
+    def put(self, key, meta, result):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            json.dump({"meta": meta, "result": result}, f)
+        os.replace(temporary, path)
+        self.prune()
+
+    def lookup_source(self, path):
+        """Gibt den bekannten Audio-Hash einer unveränderten Quelldatei zurück"""
+        return self._load_index(self.index_file).get(source_key(path))
+
+    def remember_source(self, path, fingerprint):
+        index = self._load_index(self.index_file)
+        index[source_key(path)] = fingerprint
+        self._save_index(self.index_file, index)
+
+    def sources(self):
+        """Gibt den Quellindex (Quellschlüssel -> Audio-Hash) zurück"""
+        return self._load_index(self.index_file)
+
+    def lookup_language(self, fingerprint, model_id):
+        """Gibt die zwischengespeicherte Spracherkennung (siehe detect_language) eines Audios zurück"""
+        return self._load_index(self.language_file).get(f"{fingerprint}|{model_id}")
+
+    def remember_language(self, fingerprint, model_id, detection):
+        index = self._load_index(self.language_file)
+        index[f"{fingerprint}|{model_id}"] = detection
+        self._save_index(self.language_file, index)
+
+    def _load_index(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, path, index):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temporary, path)
+
+    def entries(self):
+        """Gibt alle Einträge als (Pfad, Größe, Zeitpunkt der letzten Nutzung) zurück, älteste zuerst"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.gz"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def read_meta(self, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)["meta"]
+
+    def prune(self, max_mb=None):
+        """Löscht die am längsten ungenutzten Einträge, bis der Cache ins Größenlimit passt"""
+        limit = (self.max_mb if max_mb is None else max_mb) * 1024 * 1024
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= limit:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+RESULT_CACHE = ResultCache()
+
+class AudioCache:
+    """Cache für das extrahierte Audio (16-kHz-Mono-PCM) und die ersten Mel-Fenster
+
+    Einträge sind nach dem Audio-Hash benannt; welcher Hash zu einer unveränderten
+    Quelldatei (Pfad, Größe, Änderungszeit) gehört, steht im Quellindex des
+    RESULT_CACHE. Spätere Jobs auf demselben Video lesen das Audio mit beliebigem
+    Modell und beliebigen Aufgaben direkt aus dem Cache statt über ffmpeg. Das PCM
+    liegt unkomprimiert als s16le vor, damit die Fenster weiterhin mit positionierten
+    Zugriffen gelesen werden können; die Mel-Fenster (je Anzahl Mel-Bänder) als .npy.
+    Überschreitet der Cache seine Größe, werden die am längsten nicht genutzten Audios
+    samt ihren Mel-Fenstern gelöscht.
+    """
+    def __init__(self, directory=None, max_mb=AUDIO_CACHE_MAX_MB):
+        self.directory = directory or os.path.join(CACHE_DIR, "pcm")
+        self.max_mb = max_mb
+
+    def _path(self, fingerprint, suffix=".pcm"):
+        return os.path.join(self.directory, f"{fingerprint}{suffix}")
+
+    def open(self, fingerprint):
+        """Gibt das zwischengespeicherte Audio als PcmAudio zurück (oder None)"""
+        path = self._path(fingerprint)
+        try:
+            audio = PcmAudio.open(path)
+            os.utime(path)  # Für LRU als zuletzt genutzt markieren
+        except OSError:
+            return None
+        return audio
+
+    def put(self, fingerprint, audio):
+        path = self._path(fingerprint)
+        if self.max_mb <= 0 or os.path.exists(path):
+            return
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            audio.save(temporary)
+            os.replace(temporary, path)
+        except OSError:
+            # Ein voller Datenträger darf den Job nicht scheitern lassen
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        self.prune()
+
+    def load_mel(self, fingerprint, n_mels):
+        """Gibt das zwischengespeicherte Mel-Spektrogramm ab Beginn der Aufnahme zurück (siehe prefetch_mel)"""
+        path = self._path(fingerprint, f".mel{n_mels}.npy")
+        try:
+            frames = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if frames.ndim != 2:
+            return None  # Fenster im 30-Sekunden-Raster aus früheren Versionen
+        return MelPrefix(0, torch.from_numpy(frames))
+
+    def put_mel(self, fingerprint, n_mels, mel):
+        if self.max_mb <= 0 or mel is None or mel.start != 0 or not os.path.exists(self._path(fingerprint)):
+            return
+        path = self._path(fingerprint, f".mel{n_mels}.npy")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                np.save(f, mel.frames.numpy())
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def entries(self):
+        """Gibt alle Audios als (Audio-Hash, Größe samt Mel-Fenstern, letzte Nutzung) zurück, älteste zuerst"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            fingerprint = name.split(".")[0]
+            size, last_used = entries.get(fingerprint, (0, 0.0))
+            entries[fingerprint] = (size + stat.st_size, max(last_used, stat.st_mtime))
+        return sorted(
+            ((fingerprint, size, last_used) for fingerprint, (size, last_used) in entries.items()),
+            key=lambda entry: entry[2]
+        )
+
+    def prune(self, max_mb=None):
+        """Löscht die am längsten ungenutzten Audios, bis der Cache ins Größenlimit passt"""
+        limit = (self.max_mb if max_mb is None else max_mb) * 1024 * 1024
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for fingerprint, size, _ in entries:
+            if total <= limit:
+                break
+            for name in os.listdir(self.directory):
+                if name.split(".")[0] == fingerprint and not name.endswith(".tmp"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass  # Unter Windows noch von einem laufenden Job geöffnet
+            total -= size
+            removed += 1
+        return removed
+
+AUDIO_CACHE = AudioCache()
+
+def expected_tasks(video_path, model_id, language=None):
+    """Aufgaben eines Jobs vor dem Lauf: aus der vorgegebenen oder zwischengespeicherten Sprache
+
+    Gibt None zurück, wenn die Sprache erst beim Lauf erkannt werden kann.
+    """
+    if language:
+        return job_tasks(language)
+    fingerprint = RESULT_CACHE.lookup_source(video_path)
+    detection = RESULT_CACHE.lookup_language(fingerprint, model_id) if fingerprint else None
+    return job_tasks(detection["language"]) if detection else None
@@ -0,0 +1,557 @@
+"""Gemeinsame Grundlagen: verzögerte Imports, Modelle, Audio-Ein-/Ausgabe und Zeitmessung"""
+
+import sys
+import os
+import importlib
+import warnings
+import multiprocessing
+import numpy as np
+import threading
+import tempfile
+import wave
+import time
+from contextlib import contextmanager
+
+class LazyModule:
+    """Importiert ein Modul erst beim ersten Attributzugriff
+
+    torch und whisper zu importieren dauert mehrere Sekunden. Die GUI lädt sie erst im
+    Hintergrund (siehe DeviceProbeWorker), als Client des lokalen Dienstes und in den
+    Dienst-Kommandos der CLI gar nicht.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+ffmpeg = LazyModule("ffmpeg")
+psutil = LazyModule("psutil")
+
+# Unterdrücke Warnungen
+warnings.filterwarnings("ignore", category=FutureWarning)
+warnings.filterwarnings("ignore", category=UserWarning)
+
+# Verfügbare Whisper-Modelle mit Speicheranforderungen (in MB)
+WHISPER_MODELS = {
+    "Tiny (schnell, niedrige Genauigkeit)": {"name": "tiny", "memory": 72},
+    "Base (ausgewogen)": {"name": "base", "memory": 139},
+    "Small (gut)": {"name": "small", "memory": 461},
+    "Medium (sehr gut)": {"name": "medium", "memory": 1420},
+    "Turbo (sehr schnell, eventuell ungenau)": {"name": "turbo", "memory": 1510},
+    "Large (beste Qualität)": {"name": "large", "memory": 2880},
+    "Large V2 (beste Qualität, neu)": {"name": "large-v2", "memory": 2870},
+    "Large V3 (beste Qualität, neueste)": {"name": "large-v3", "memory": 2880}
+}
+
+# Unterstützte Videoformate und erzeugte Ausgabedateien
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+SUBTITLE_FORMATS = ("srt", "vtt", "json")  # Je Aufgabe: <Basisname>_de.srt, <Basisname>_en.vtt usw.
+
+def subtitle_suffix(name, fmt):
+    """Endung einer Untertiteldatei; die englischen SRT-Untertitel heißen wie bisher <Basisname>.srt"""
+    if name == "en" and fmt == "srt":
+        return ".srt"
+    return f"_{name}.{fmt}"
+
+def output_suffixes(formats=SUBTITLE_FORMATS, names=("de", "en")):
+    """Endungen aller Ausgabedateien eines Jobs (Texte und Untertitel je Aufgabe)
+
+    names sind die Aufgaben des Jobs, benannt nach der Sprache ihrer Ausgabe (siehe job_tasks).
+    """
+    return tuple(f"_{name}.txt" for name in names) + tuple(
+        subtitle_suffix(name, fmt) for name in names for fmt in formats
+    )
+
+OUTPUT_SUFFIXES = output_suffixes()
+CHECKPOINT_SUFFIX = '.checkpoint.jsonl'
+
+# Lokale Caches (Ergebnisse usw.)
+CACHE_DIR = os.environ.get(
+    "WHISPER_TRANSCRIBE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "whisper-transcribe")
+)
+RESULT_CACHE_MAX_MB = 500
+AUDIO_CACHE_MAX_MB = 10000  # Extrahiertes PCM: ca. 115 MB je Stunde Audio
+
+def check_cuda_availability():
+    """Überprüft die Verfügbarkeit von CUDA und gibt Details zurück"""
+    if torch.cuda.is_available():
+        return {
+            "available": True,
+            "device_count": torch.cuda.device_count(),
+            "device_name": torch.cuda.get_device_name(0),
+            "memory_allocated": torch.cuda.memory_allocated(0) / 1024**2,  # In MB
+            "memory_total": torch.cuda.get_device_properties(0).total_memory / 1024**2  # In MB
+        }
+    return {"available": False}
+
+# Rechengenauigkeit auf der CPU; memory_factor bezieht sich auf die Angaben in WHISPER_MODELS
+PRECISION_MODES = {
+    "fp32": {"label": "FP32 (Standard)", "memory_factor": 2.0},
+    "bf16": {"label": "BF16 (neuere CPUs)", "memory_factor": 1.0},
+    "int8": {"label": "INT8 (quantisiert)", "memory_factor": 1.0},
+}
+
+def cpu_supports_bf16():
+    """Prüft, ob die CPU BF16-Arithmetik in Hardware unterstützt"""
+    if sys.platform == "darwin":
+        return os.uname().machine == "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def model_memory_mb(model_name, device, precision="fp32"):
+    """Schätzt den Speicherbedarf eines geladenen Modells (in MB)"""
+    memory = next(v["memory"] for v in WHISPER_MODELS.values() if v["name"] == model_name)
+    if device == "cpu":
+        # FP32 benötigt doppelten Speicher; BF16 und INT8 etwa so viel wie angegeben
+        return memory * PRECISION_MODES[precision]["memory_factor"]
+    return memory
+
+def quantize_model_int8(model):
+    """Ersetzt alle Linear-Schichten durch dynamisch quantisierte INT8-Varianten (nur CPU)"""
+    # quantize_dynamic erkennt nur exakt nn.Linear, Whisper nutzt eine Unterklasse;
+    # die Schichten werden daher ohne Kopie der Gewichte gegen nn.Linear getauscht
+    for module in list(model.modules()):
+        for name, child in module.named_children():
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                plain = torch.nn.Linear(
+                    child.in_features, child.out_features, bias=child.bias is not None, device="meta"
+                )
+                plain.weight = child.weight
+                plain.bias = child.bias
+                setattr(module, name, plain)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+def load_model(model_name, device, precision="fp32"):
+    """Lädt ein Whisper-Modell in der gewünschten Rechengenauigkeit"""
+    model = whisper.load_model(model_name, device=device)
+    if device == "cpu" and precision == "bf16":
+        model = model.to(torch.bfloat16)
+    elif device == "cpu" and precision == "int8":
+        model = quantize_model_int8(model)
+    return model
+
+def loaded_model_mb(model):
+    """Größe der Gewichte eines geladenen Modells (in MB)
+
+    Zählt Parameter und Puffer; bei INT8 liegen die quantisierten Gewichte als gepackte
+    Tupel im state_dict und nicht unter parameters().
+    """
+    def tensor_bytes(value):
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(v) for v in value)
+        return 0
+    return sum(tensor_bytes(v) for v in model.state_dict(keep_vars=True).values()) / (1024 * 1024)
+
+# Audio-Parameter von Whisper (16 kHz, 30-Sekunden-Fenster)
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = SAMPLE_RATE * WINDOW_SECONDS
+HOP_LENGTH = 160  # Samples pro Mel-Frame
+N_FRAMES = WINDOW_SAMPLES // HOP_LENGTH  # Mel-Frames pro Fenster
+TIME_PRECISION = 0.02  # Sekunden pro Zeitstempel-Token
+
+# Standardwerte wie in whisper.transcribe
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+PREPEND_PUNCTUATIONS = "\"'“¿([{-"  # Werden bei den Wortzeitstempeln dem folgenden Wort zugeschlagen
+APPEND_PUNCTUATIONS = "\"'.。,，!！?？:：”)]}、"  # ... bzw. dem vorherigen
+
+# Aufgaben je Quellsprache; ohne Vorgabe wird die Sprache je Aufnahme erkannt (siehe detect_language)
+def job_tasks(language):
+    """Aufgaben eines Jobs: Transkription in der Quellsprache und, außer bei Englisch, Übersetzung ins Englische
+
+    Jede Aufgabe ist nach der Sprache ihrer Ausgabe benannt (<Basisname>_<Sprache>.txt).
+    Auch die Übersetzung bekommt die Quellsprache, da Whisper sie als Sprache des Audios erwartet.
+    """
+    tasks = {language: {"task": "transcribe", "language": language}}
+    if language != "en":
+        tasks["en"] = {"task": "translate", "language": language}
+    return tasks
+
+DEFAULT_TASKS = job_tasks("de")  # Deutsche Transkription und englische Übersetzung (Benchmarks)
+
+# Quellsprachen zur Auswahl in der GUI (im Batch-Modus sind alle Sprachen von Whisper möglich)
+SOURCE_LANGUAGES = {
+    "Automatisch erkennen": None,
+    "Deutsch": "de",
+    "Englisch (ohne Übersetzung)": "en",
+    "Französisch": "fr",
+    "Spanisch": "es",
+    "Italienisch": "it",
+    "Niederländisch": "nl",
+    "Polnisch": "pl",
+    "Türkisch": "tr",
+    "Russisch": "ru",
+}
+
+def language_code(language):
+    """Wandelt eine Sprachangabe ("de", "German") in Whispers Kürzel um (ValueError bei unbekannter Sprache)"""
+    language = language.lower()
+    language = whisper.tokenizer.TO_LANGUAGE_CODE.get(language, language)
+    if language not in whisper.tokenizer.LANGUAGES:
+        raise ValueError(f"Unbekannte Sprache: {language}")
+    return language
+
+# Kürzere Aufnahmen bleiben als int16 im RAM, längere liegen in einer temporären PCM-Datei
+PCM_FILE_THRESHOLD_SECONDS = 600
+AUDIO_TEMP_DIR = os.path.join(CACHE_DIR, "audio")  # Nicht /tmp, das oft im RAM liegt (tmpfs)
+READ_CHUNK_BYTES = SAMPLE_RATE * 2 * 10  # 10 Sekunden s16le
+
+def probe_duration(path):
+    """Gibt die Dauer einer Mediendatei in Sekunden zurück (oder None)"""
+    try:
+        return float(ffmpeg.probe(path)["format"]["duration"])
+    except (ffmpeg.Error, KeyError, ValueError):
+        return None
+
+class AudioSource:
+    """Fensterweise lesbares 16-kHz-Mono-Audio
+
+    len(source) ist die Anzahl der Samples, source[a:b] liefert die Samples als
+    float32-Array. Im Speicher liegen nur die jeweils angeforderten Ausschnitte, so
+    dass der Speicherbedarf nicht mit der Länge der Aufnahme wächst.
+    """
+    def __len__(self):
+        raise NotImplementedError
+
+    def read(self, start, stop):
+        raise NotImplementedError
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("Audioquellen unterstützen nur zusammenhängende Ausschnitte")
+        start, stop, _ = index.indices(len(self))
+        return self.read(start, max(start, stop))
+
+    def range(self, start, stop=None):
+        """Sicht auf einen Ausschnitt, ohne ihn zu lesen"""
+        return AudioRange(self, start, len(self) if stop is None else min(stop, len(self)))
+
+    def close(self):
+        """Gibt Datei und Puffer frei; Sichten auf andere Quellen besitzen nichts"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def audio_range(audio, start, stop=None):
+    """Ausschnitt einer AudioSource (ohne Lesen) oder eines Arrays"""
+    if isinstance(audio, AudioSource):
+        return audio.range(start, stop)
+    return audio[start:stop]
+
+class AudioRange(AudioSource):
+    def __init__(self, source, start, stop):
+        self.source = source
+        self.start = start
+        self.stop = max(start, stop)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def read(self, start, stop):
+        return self.source[self.start + start:self.start + stop]
+
+class PcmAudio(AudioSource):
+    """int16-PCM im RAM oder in einer temporären Datei, beim Lesen in float32 umgerechnet
+
+    Die Datei wird mit positionierten Lesezugriffen statt mmap gelesen: Eingeblendete
+    Seiten zählen zum RSS des Prozesses und würden bei einem Durchlauf über die ganze
+    Aufnahme mit ihrer Länge wachsen.
+    """
+    def __init__(self, use_file, capacity):
+        self.num_samples = 0
+        self._lock = threading.Lock()
+        if use_file:
+            os.makedirs(AUDIO_TEMP_DIR, exist_ok=True)
+            self.file = tempfile.TemporaryFile(dir=AUDIO_TEMP_DIR)
+            self.buffer = None
+        else:
+            self.file = None
+            self.buffer = np.empty(capacity, dtype=np.int16)
+
+    def append(self, samples):
+        if self.file:
+            self.file.seek(self.num_samples * 2)
+            self.file.write(samples.tobytes())
+        else:
+            # Puffer vergrößern, falls die Dauer unterschätzt wurde
+            if self.num_samples + len(samples) > len(self.buffer):
+                grown = np.empty(max(2 * len(self.buffer), self.num_samples + len(samples)), dtype=np.int16)
+                grown[:self.num_samples] = self.buffer[:self.num_samples]
+                self.buffer = grown
+            self.buffer[self.num_samples:self.num_samples + len(samples)] = samples
+        self.num_samples += len(samples)
+
+    def __len__(self):
+        return self.num_samples
+
+    def read(self, start, stop):
+        if self.file:
+            with self._lock:
+                self.file.seek(start * 2)
+                samples = np.frombuffer(self.file.read((stop - start) * 2), dtype=np.int16)
+        else:
+            samples = self.buffer[start:stop]
+        return samples.astype(np.float32) / 32768.0
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+    @classmethod
+    def open(cls, path):
+        """Öffnet eine gespeicherte PCM-Datei (s16le) zum Lesen"""
+        audio = cls.__new__(cls)
+        audio._lock = threading.Lock()
+        audio.buffer = None
+        audio.file = open(path, "rb")
+        audio.num_samples = os.fstat(audio.file.fileno()).st_size // 2
+        return audio
+
+    def save(self, path):
+        """Schreibt die Samples als rohes s16le nach path, blockweise bei dateibasiertem Audio"""
+        with open(path, "wb") as f:
+            if not self.file:
+                f.write(self.buffer[:self.num_samples].tobytes())
+                return
+            for offset in range(0, self.num_samples * 2, READ_CHUNK_BYTES):
+                with self._lock:
+                    self.file.seek(offset)
+                    f.write(self.file.read(min(READ_CHUNK_BYTES, self.num_samples * 2 - offset)))
+
+def write_pcm_wav(wav_path, audio):
+    """Schreibt eine AudioSource verlustfrei als 16-kHz-Mono-WAV, Block für Block"""
+    with wave.open(wav_path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        for start in range(0, len(audio), READ_CHUNK_BYTES // 2):
+            samples = audio[start:start + READ_CHUNK_BYTES // 2]
+            wav_file.writeframes(np.round(samples * 32768.0).clip(-32768, 32767).astype(np.int16).tobytes())
+
+def extract_audio(video_path, wav_path=None, is_cancelled=None):
+    """Streamt das Audio einer Videodatei über ffmpeg in eine PcmAudio-Quelle
+
+    ffmpeg liefert 16-kHz-Mono-PCM (s16le) über stdout. Aufnahmen ab
+    PCM_FILE_THRESHOLD_SECONDS landen in einer temporären Datei, aus der die Fenster
+    bei Bedarf gelesen werden. Mit wav_path wird zusätzlich eine WAV-Datei geschrieben.
+    """
+    duration = probe_duration(video_path)
+    use_file = duration is None or duration >= PCM_FILE_THRESHOLD_SECONDS
+    audio = PcmAudio(use_file, int((duration or 0) * SAMPLE_RATE) + SAMPLE_RATE)
+
+    process = (
+        ffmpeg.input(video_path)
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ar=SAMPLE_RATE, ac=1)
+        .global_args("-loglevel", "error", "-nostats")
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+    stderr = []
+    stderr_reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    wav_file = None
+    if wav_path:
+        wav_file = wave.open(wav_path, "wb")
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+
+    remainder = b""
+    try:
+        while True:
+            if is_cancelled and is_cancelled():
+                process.kill()
+                raise InterruptedError("Transkription wurde abgebrochen")
+
+            data = process.stdout.read(READ_CHUNK_BYTES)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 2
+            remainder = data[usable:]
+            if wav_file:
+                wav_file.writeframes(data[:usable])
+            audio.append(np.frombuffer(data[:usable], dtype=np.int16))
+    except BaseException:
+        audio.close()
+        raise
+    finally:
+        if wav_file:
+            wav_file.close()
+        process.stdout.close()
+        process.wait()
+        stderr_reader.join()
+
+    if process.returncode != 0:
+        audio.close()
+        message = stderr[0].decode(errors="replace").strip() if stderr else ""
+        raise RuntimeError(f"ffmpeg konnte das Audio nicht extrahieren: {message}")
+
+    return audio
+
+class StageTimer:
+    """Summiert die Laufzeit der einzelnen Pipeline-Stufen (Sekunden je Stufe)"""
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - started
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+def process_rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+class PeakMemorySampler:
+    """Ermittelt im Hintergrund den höchsten RSS-Wert des Prozesses (in MB)"""
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        process = psutil.Process()
+        while True:
+            self.peak_mb = max(self.peak_mb, process.memory_info().rss / (1024 * 1024))
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+# Vorab berechnetes Mel-Spektrogramm je Job: höchstens 8 Minuten (ca. 15 MB bei 80 Mel-Bändern),
+# genug um das Laden des Modells zu überbrücken; der Rest wird je Fenster berechnet
+MEL_PREFETCH_MAX_WINDOWS = 16
+STFT_EDGE_FRAMES = 2  # Frames am Ende eines Ausschnitts, deren STFT über ihn hinausreicht
+
+def model_n_mels(model_id):
+    """Anzahl der Mel-Bänder eines Modells, ohne es zu laden"""
+    return 128 if model_id in ("large-v3", "turbo") else 80
+
+def window_frames(mel):
+    """Füllt die Mel-Frames eines Fensters wie whisper.transcribe mit Nullen auf 30 Sekunden auf"""
+    return whisper.pad_or_trim(mel, N_FRAMES)
+
+def window_mel(chunk, n_mels, device=None):
+    """Log-Mel-Spektrogramm eines Fensters (höchstens 30 Sekunden)
+
+    Wie whisper.transcribe: das Spektrogramm des Audios mit angehängter Stille, davon
+    nur die Frames des Audios, mit Nullen auf 30 Sekunden aufgefüllt.
+    """
+    chunk = torch.from_numpy(np.ascontiguousarray(chunk, dtype=np.float32))
+    mel = whisper.log_mel_spectrogram(chunk, n_mels, padding=WINDOW_SAMPLES, device=device)
+    return window_frames(mel[:, :len(chunk) // HOP_LENGTH])
+
+class MelPrefix:
+    """Zusammenhängend vorab berechnetes Mel-Spektrogramm ab Sample start
+
+    frames enthält nur Frames, deren STFT vollständig im Audio liegt. window gibt das
+    Fenster ab seek mit samples Samples zurück, oder None, wenn es über den Ausschnitt
+    hinausreicht und einzeln berechnet werden muss.
+    """
+    def __init__(self, start, frames):
+        self.start = start
+        self.frames = frames
+
+    @property
+    def end(self):
+        return self.start + self.frames.shape[-1] * HOP_LENGTH
+
+    def window(self, seek, samples):
+        offset = (seek - self.start) // HOP_LENGTH
+        count = samples // HOP_LENGTH
+        if seek < self.start or offset + count > self.frames.shape[-1]:
+            return None
+        return window_frames(self.frames[:, offset:offset + count])
+
+def prefetch_mel(audio, n_mels, start=0, max_windows=MEL_PREFETCH_MAX_WINDOWS, is_cancelled=None):
+    """Berechnet das Mel-Spektrogramm der ersten max_windows Fenster ab start auf der CPU vorab
+
+    Gibt einen MelPrefix zurück, den MultiTaskTranscriber.transcribe über den Parameter
+    mel nutzt. Reicht der Ausschnitt bis zum Ende des Audios, entsprechen die Fenster
+    genau denen von whisper.transcribe.
+    """
+    if is_cancelled and is_cancelled():
+        raise InterruptedError("Transkription wurde abgebrochen")
+    stop = min(len(audio), start + max_windows * WINDOW_SAMPLES)
+    piece = torch.from_numpy(np.ascontiguousarray(audio[start:stop], dtype=np.float32))
+    mel = whisper.log_mel_spectrogram(piece, n_mels, padding=WINDOW_SAMPLES)
+    usable = len(piece) // HOP_LENGTH
+    if stop < len(audio):
+        usable = max(0, usable - STFT_EDGE_FRAMES)  # Dahinter fehlt dem STFT das folgende Audio
+    return MelPrefix(start, mel[:, :usable].clone())
+
+# Energieanalyse in 30-ms-Frames (Schnittpunkte in Stille, Sprachaktivitätserkennung)
+FRAME_SAMPLES = 480  # 30-ms-Frames für die Energieanalyse
+SILENCE_SEARCH_SECONDS = 5.0  # Suchbereich für Schnittpunkte in Stille
+
+def frame_energy_db(audio, frame_samples=FRAME_SAMPLES):
+    """Berechnet die RMS-Energie (dB) je Frame, blockweise um Speicherspitzen zu vermeiden"""
+    num_frames = len(audio) // frame_samples
+    energy = np.empty(num_frames, dtype=np.float32)
+    block_frames = SAMPLE_RATE * 60 // frame_samples
+    for first in range(0, num_frames, block_frames):
+        last = min(num_frames, first + block_frames)
+        frames = np.asarray(audio[first * frame_samples:last * frame_samples], dtype=np.float32)
+        frames = frames.reshape(last - first, frame_samples)
+        energy[first:last] = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    return energy
+
+class DeviceManager:
+    """Verwaltet die Geräteauswahl und -konfiguration"""
+    def __init__(self, cuda_info=None):
+        # Als Client des lokalen Dienstes kommen die CUDA-Angaben vom Dienst (ohne torch-Import)
+        self.cuda_info = cuda_info if cuda_info is not None else check_cuda_availability()
+        self.current_device = "cuda" if self.cuda_info["available"] else "cpu"
+        self.cpu_cores = multiprocessing.cpu_count()
+
+    def get_device_info(self):
+        """Gibt Informationen über das aktuelle Gerät zurück"""
+        if self.current_device == "cuda":
+            return f"GPU: {self.cuda_info['device_name']}"
+        return f"CPU: {self.cpu_cores} Kerne verfügbar"
+
+    def set_device(self, device):
+        """Setzt das zu verwendende Gerät"""
+        if device == "cuda" and not self.cuda_info["available"]:
+            raise ValueError("CUDA ist nicht verfügbar")
+        self.current_device = device
+
+def model_label(model_id):
+    """Gibt den Anzeigenamen zu einem Modellnamen (z. B. "small") zurück"""
+    for label, info in WHISPER_MODELS.items():
+        if info["name"] == model_id:
+            return label
+    raise ValueError(f"Unbekanntes Modell: {model_id}")
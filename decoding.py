@@ -0,0 +1,1056 @@
+"""Decoder-Engines: sequentiell, gebatcht, spekulativ und als Kaskade"""
+
+from collections import defaultdict
+from core import (
+    APPEND_PUNCTUATIONS, COMPRESSION_RATIO_THRESHOLD, DEFAULT_TASKS, FRAME_SAMPLES, HOP_LENGTH, LOGPROB_THRESHOLD,
+    NO_SPEECH_THRESHOLD, PREPEND_PUNCTUATIONS, SAMPLE_RATE, SILENCE_SEARCH_SECONDS, TEMPERATURES, TIME_PRECISION,
+    WINDOW_SAMPLES, WINDOW_SECONDS, frame_energy_db, model_memory_mb, np, psutil, StageTimer, torch, whisper,
+    window_mel,
+)
+from resources import BATCH_MEMORY_FRACTION, MODEL_CACHE
+
+# Spracherkennung über den Sprachkopf des Modells auf wenigen, über die Aufnahme verteilten Fenstern
+LANGUAGE_PROBE_WINDOWS = 3
+
+def language_probe_chunks(audio, windows=LANGUAGE_PROBE_WINDOWS):
+    """Gleichmäßig über die Aufnahme verteilte Fenster für die Spracherkennung
+
+    Die Fenster liegen in der Mitte gleich langer Abschnitte, damit Vor- und Abspann
+    nicht überwiegen.
+    """
+    if len(audio) <= WINDOW_SAMPLES:
+        return [audio[0:len(audio)]]
+    windows = min(windows, len(audio) // WINDOW_SAMPLES)
+    section = len(audio) / windows
+    starts = [max(0, int((index + 0.5) * section) - WINDOW_SAMPLES // 2) for index in range(windows)]
+    return [audio[start:start + WINDOW_SAMPLES] for start in starts]
+
+def detect_language(model, chunks, device="cpu", precision="fp32"):
+    """Erkennt die Quellsprache mit dem Sprachkopf des Modells
+
+    Die Sprachwahrscheinlichkeiten der Fenster werden gemittelt. Gibt
+    {"language": Kürzel, "probability": Wahrscheinlichkeit} zurück.
+    """
+    if not model.is_multilingual:
+        return {"language": "en", "probability": 1.0}
+    if device == "cuda":
+        dtype = torch.float16
+    elif precision == "bf16":
+        dtype = torch.bfloat16
+    else:
+        dtype = torch.float32
+    mel = torch.stack([window_mel(chunk, model.dims.n_mels, device=model.device) for chunk in chunks])
+    with torch.no_grad():
+        _, window_probs = model.detect_language(mel.to(dtype))
+    probs = defaultdict(float)
+    for window in window_probs:
+        for language, probability in window.items():
+            probs[language] += probability / len(window_probs)
+    language = max(probs, key=probs.get)
+    return {"language": language, "probability": probs[language]}
+
+# Abbruch von Wiederholungsschleifen und unplausibel dichtem Text während der Dekodierung
+DECODE_GUARD = {
+    "min_repeats": 3,  # Eine Schleife wiederholt eine Tokenfolge mindestens so oft ...
+    "min_loop_tokens": 12,  # ... und umfasst insgesamt mindestens so viele Tokens
+    "max_ngram": 25,  # Längste geprüfte Tokenfolge
+    "max_tokens_per_second": 15,  # Deutlich mehr, als selbst schnelle Sprecher erreichen
+    "token_slack": 8,
+}
+
+class GuardedRow:
+    """Verfolgt die Tokens eines dekodierten Fensters und erkennt Schleifen und zu dichten Text
+
+    feed prüft nach jedem neuen Token nur die Stelle, an der es endet: eine
+    Wiederholung derselben Tokenfolge direkt davor, ein gerade geschlossenes Segment
+    mit mehr Tokens, als in seine Dauer passen, oder ein offenes Segment, das selbst
+    bis zum Fensterende zu dicht wäre. cut ist danach der Grund, keep die Anzahl der
+    Tokens vor der Schleife bzw. vor dem zu dichten Segment.
+    """
+    def __init__(self, eot, timestamp_begin, duration, settings=DECODE_GUARD):
+        self.eot = eot
+        self.timestamp_begin = timestamp_begin
+        self.duration = duration
+        self.settings = settings
+        self.tokens = []
+        self.text = []  # Positionen der Text-Tokens in self.tokens
+        self.segment_start = 0  # Position des Zeitstempels, mit dem das offene Segment beginnt
+        self.segment_time = 0.0
+        self.segment_text = 0
+        self.cut = None
+        self.keep = None
+
+    def feed(self, token):
+        position = len(self.tokens)
+        self.tokens.append(token)
+        if self.cut or token == self.eot:
+            return self.cut
+        if token > self.eot:
+            if token >= self.timestamp_begin:
+                self.timestamp(position, (token - self.timestamp_begin) * TIME_PRECISION)
+            return self.cut
+        self.text.append(position)
+        self.segment_text += 1
+        settings = self.settings
+        if self.segment_text > settings["max_tokens_per_second"] * max(0.0, self.duration - self.segment_time) \
+                + settings["token_slack"]:
+            self.stop("token_rate", self.segment_start)
+        else:
+            self.check_repetition()
+        return self.cut
+
+    def timestamp(self, position, time):
+        settings = self.settings
+        if self.segment_text:
+            # Geschlossenes Segment: Text bis zu diesem Zeitstempel
+            if self.segment_text > settings["max_tokens_per_second"] * max(0.0, time - self.segment_time) \
+                    + settings["token_slack"]:
+                self.stop("token_rate", self.segment_start)
+                return
+            self.segment_text = 0
+        self.segment_start = position
+        self.segment_time = time
+
+    def check_repetition(self):
+        settings = self.settings
+        tokens = self.tokens
+        text = self.text
+        for size in range(1, min(settings["max_ngram"], len(text) // settings["min_repeats"]) + 1):
+            repeats = max(settings["min_repeats"], -(-settings["min_loop_tokens"] // size))
+            if repeats * size > len(text):
+                continue
+            tail = [tokens[index] for index in text[-size:]]
+            if all(
+                tokens[text[-copy * size + offset]] == tail[offset]
+                for copy in range(2, repeats + 1) for offset in range(size)
+            ):
+                # Die erste der Wiederholungen bleibt erhalten
+                self.stop("repetition", text[-(repeats - 1) * size - 1] + 1)
+                return
+
+    def stop(self, reason, keep):
+        self.cut = reason
+        self.keep = keep
+
+class DecodeGuard:
+    """Logit-Filter für whisper.decoding, der Fenster mit Schleifen oder zu dichtem Text beendet
+
+    Für jedes Fenster der Batch-Dimension (durations in Sekunden) führt er eine
+    GuardedRow; ein abgebrochenes Fenster erzeugt ab dann nur noch EOT. Der Decoder
+    spart so die Tokens bis zum Längenlimit, und der Temperatur-Fallback kann das
+    Fenster sofort wiederholen.
+    """
+    def __init__(self, tokenizer, sample_begin, durations):
+        self.sample_begin = sample_begin
+        self.rows = [GuardedRow(tokenizer.eot, tokenizer.timestamp_begin, duration) for duration in durations]
+
+    def apply(self, logits, tokens):
+        for index, row in enumerate(self.rows):
+            new_tokens = tokens[index, self.sample_begin + len(row.tokens):].tolist()
+            for token in new_tokens:
+                row.feed(token)
+            if row.cut:
+                logits[index] = float("-inf")
+                logits[index, row.eot] = 0.0
+
+def apply_guard(result, row, tokenizer):
+    """Kürzt ein abgebrochenes Ergebnis auf die Tokens vor der Schleife und vermerkt den Grund"""
+    result.guard = row.cut if row else None
+    if result.guard:
+        result.tokens = result.tokens[:row.keep]
+        result.text = tokenizer.decode([token for token in result.tokens if token < tokenizer.eot]).strip()
+    return result
+
+class TaskState:
+    """Zustand einer Decoder-Aufgabe (Transkription oder Übersetzung) über alle Fenster"""
+    def __init__(self, model, task, language):
+        self.task = task
+        self.language = language
+        self.tokenizer = whisper.tokenizer.get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=language,
+            task=task,
+        )
+        self.segments = []
+        self.all_tokens = []
+        self.prompt_reset_since = 0
+        self.last_speech_timestamp = 0.0
+        self.seek = 0  # Nächste zu dekodierende Position in Samples
+
+    def prompt(self):
+        return self.all_tokens[self.prompt_reset_since:]
+
+    def result(self):
+        return {
+            "text": "".join(segment["text"] for segment in self.segments),
+            "segments": self.segments,
+            "language": self.language,
+        }
+
+class EncodedAudioModel:
+    """Whisper-Modell, dessen Aufruf model(features, tokens) die fertige Encoder-Ausgabe nutzt
+
+    whisper.timing.find_alignment ruft model(mel, tokens) auf und würde den Encoder für
+    die Wortzeitstempel erneut rechnen. Mit diesem Stellvertreter wird statt des
+    Mel-Spektrogramms die Encoder-Ausgabe des Fensters übergeben.
+    """
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, attr):
+        return getattr(self.model, attr)
+
+    def __call__(self, audio_features, tokens):
+        return self.model.decoder(tokens, audio_features)
+
+def window_samples(total, seek):
+    """Länge des Fensters ab seek in Samples: höchstens 30 Sekunden, in ganzen Mel-Frames wie in whisper.transcribe"""
+    return min(WINDOW_SAMPLES, (total - seek) // HOP_LENGTH * HOP_LENGTH)
+
+def segments_end(segments):
+    """Ende des letzten Wortes, sonst des letzten Segments (None ohne Segmente), wie whisper.utils.get_end"""
+    for segment in reversed(segments):
+        for word in reversed(segment.get("words", [])):
+            return word["end"]
+    return segments[-1]["end"] if segments else None
+
+class MultiTaskTranscriber:
+    """Führt mehrere Decoder-Aufgaben in einem einzigen Durchlauf über das Audio aus
+
+    Das Audio wird nur einmal geladen. Wie in whisper.transcribe rückt jede Aufgabe nach
+    einem Fenster bis zum Ende ihres letzten vollständigen Segments vor; ein am
+    Fensterende angeschnittenes Segment wird im nächsten Fenster vollständig dekodiert.
+    Aufgaben an derselben Position teilen sich Mel-Spektrogramm und Encoder-Ausgabe.
+    """
+    def __init__(self, model, tasks=None, device="cpu", precision="fp32", timer=None, word_timestamps=True):
+        self.model = model
+        self.tasks = tasks or DEFAULT_TASKS
+        self.timer = timer or StageTimer()
+        self.word_timestamps = word_timestamps
+        self.decoded_tokens = 0
+        # Abgebrochene Fenster je Grund und Fenster, die auch nach dem Fallback abgebrochen blieben
+        self.guard_stats = {"repetition": 0, "token_rate": 0, "unresolved": 0}
+        self.fp16 = device == "cuda"
+        if self.fp16:
+            self.dtype = torch.float16
+        elif device == "cpu" and precision == "bf16":
+            self.dtype = torch.bfloat16
+        else:
+            self.dtype = torch.float32
+        self.states = {}
+        self.window_ranges = {}  # Aufgabe -> (Start, Ende) in Samples des zuletzt gemeldeten Fensters
+
+    def transcribe(self, audio, is_cancelled=None, on_window=None, resume=None, mel=None):
+        """Transkribiert 16-kHz-Mono-Audio (Array oder AudioSource) und gibt ein Ergebnis pro Aufgabe zurück
+
+        on_window(position, segments) wird nach jedem Fenster mit der Position, bis zu der
+        alle Aufgaben dekodiert sind (Sekunden), und den neuen Segmenten je Aufgabe
+        aufgerufen; window_ranges enthält dann den Bereich, den jede Aufgabe in diesem
+        Fenster verbraucht hat. Mit resume (siehe JobCheckpoint.load) wird ab den
+        gespeicherten Positionen fortgesetzt. Ein vorab berechnetes Mel-Spektrogramm
+        (siehe prefetch_mel) ersetzt die Berechnung der Fenster, die darin liegen.
+        """
+        states = self.init_states(resume)
+        total = len(audio)
+
+        with torch.no_grad():
+            while True:
+                active = [state for state in states.values() if window_samples(total, state.seek) > 0]
+                if not active:
+                    break
+                if is_cancelled and is_cancelled():
+                    raise InterruptedError("Transkription wurde abgebrochen")
+
+                seek = min(state.seek for state in active)
+                samples = window_samples(total, seek)
+                if mel is not None and seek >= mel.end:
+                    mel = None  # Vorab berechneter Ausschnitt verbraucht
+                audio_features = self.encode(audio[seek:seek + samples], mel.window(seek, samples) if mel else None)
+
+                new_segments = {}
+                self.window_ranges = {}
+                for name, state in states.items():
+                    if state.seek != seek:
+                        new_segments[name] = []
+                        continue
+                    new_segments[name], consumed = self.decode_window(state, audio_features, seek, samples)
+                    self.window_ranges[name] = (seek, seek + consumed)
+                    state.seek = seek + consumed
+                if on_window:
+                    on_window(self.position(total) / SAMPLE_RATE, new_segments)
+
+        return {name: state.result() for name, state in states.items()}
+
+    def position(self, total):
+        """Position in Samples, bis zu der alle Aufgaben dekodiert sind"""
+        return min(state.seek if window_samples(total, state.seek) > 0 else total for state in self.states.values())
+
+    def init_states(self, resume=None):
+        """Legt den Zustand je Aufgabe an, bei resume mit Segmenten, Prompts und Positionen des Checkpoints"""
+        self.states = {
+            name: TaskState(self.model, config["task"], config["language"])
+            for name, config in self.tasks.items()
+        }
+        if resume:
+            for name, state in self.states.items():
+                state.segments = list(resume["segments"].get(name, []))
+                state.all_tokens = list(resume["prompt"].get(name, []))
+                position = resume.get("positions", {}).get(name, resume["position"])
+                state.seek = round(position * SAMPLE_RATE / HOP_LENGTH) * HOP_LENGTH
+        return self.states
+
+    def prompt_context(self):
+        """Gibt die aktuellen Prompt-Tokens je Aufgabe für einen Checkpoint zurück"""
+        return {name: state.prompt() for name, state in self.states.items()}
+
+    def task_positions(self):
+        """Gibt die Position (Sekunden) je Aufgabe für einen Checkpoint zurück"""
+        return {name: state.seek / SAMPLE_RATE for name, state in self.states.items()}
+
+    def encode(self, chunk, mel=None):
+        """Berechnet Mel-Spektrogramm (falls nicht vorab berechnet) und Encoder-Ausgabe für ein Fenster"""
+        with self.timer.stage("mel"):
+            if mel is None:
+                mel = window_mel(chunk, self.model.dims.n_mels, device=self.model.device)
+            mel = mel.to(self.model.device).unsqueeze(0).to(self.dtype)
+        with self.timer.stage("encoder"):
+            return self.model.embed_audio(mel)
+
+    def decode_window(self, state, audio_features, seek, samples, prompt=True):
+        """Dekodiert ein Fenster für eine Aufgabe und hängt die Segmente an den Zustand an
+
+        Gibt die neuen Segmente und die Anzahl der verbrauchten Samples zurück.
+        """
+        with self.timer.stage("decoder"):
+            result = self.decode_with_fallback(state, audio_features, durations=[samples / SAMPLE_RATE], prompt=prompt)
+        return self.add_result(state, result, seek, samples, audio_features)
+
+    def decode_range(self, state, audio, seek, end, audio_features=None, prompt=True):
+        """Dekodiert audio[seek:end] für eine Aufgabe Fenster für Fenster und gibt die neuen Segmente zurück
+
+        audio_features kann die Encoder-Ausgabe des ersten Fensters enthalten.
+        """
+        segments = []
+        while window_samples(end, seek) > 0:
+            samples = window_samples(end, seek)
+            if audio_features is None:
+                audio_features = self.encode(audio[seek:seek + samples])
+            new_segments, consumed = self.decode_window(state, audio_features, seek, samples, prompt)
+            segments.extend(new_segments)
+            seek += consumed
+            audio_features = None
+        return segments
+
+    def add_result(self, state, result, seek, samples, audio_features=None):
+        """Übernimmt das Decoder-Ergebnis eines Fensters als Segmente in den Zustand
+
+        Gibt die neuen Segmente und die Anzahl der verbrauchten Samples zurück.
+        """
+        segments, consumed = self.window_segments(state, result, seek, samples, audio_features)
+        if not self.silent(result):
+            self.append_segments(state, segments, result.temperature)
+        return segments, consumed
+
+    def window_segments(self, state, result, seek, samples, audio_features=None):
+        """Segmente eines Fensters und die verbrauchten Samples, wie in whisper.transcribe
+
+        Ohne abschließendes Zeitstempelpaar endet das Fenster am letzten vollständigen
+        Segment, mit Wortzeitstempeln am Ende des letzten Wortes; Fenster ohne Sprache
+        werden ganz übersprungen. Segmente ohne Dauer oder Text entfallen.
+        """
+        if self.silent(result):
+            return [], samples
+        segments, consumed, single_timestamp_ending = self.split_segments(state, result, seek, samples)
+        if self.word_timestamps and audio_features is not None:
+            self.add_word_timestamps(state, segments, audio_features, samples)
+            last_word_end = segments_end(segments)
+            if not single_timestamp_ending and last_word_end is not None and last_word_end > seek / SAMPLE_RATE:
+                consumed = round(last_word_end * SAMPLE_RATE / HOP_LENGTH) * HOP_LENGTH - seek
+        if not 0 < consumed <= samples:
+            consumed = samples
+        return self.spoken(segments), consumed
+
+    def append_segments(self, state, segments, temperature):
+        """Hängt die Segmente eines Fensters an den Zustand an und erweitert den Vortext"""
+        for segment in segments:
+            segment["id"] = len(state.segments)
+            state.segments.append(segment)
+            state.all_tokens.extend(segment["tokens"])
+        # Bei hoher Temperatur nicht auf den bisherigen Text konditionieren
+        if temperature > 0.5:
+            state.prompt_reset_since = len(state.all_tokens)
+
+    def add_word_timestamps(self, state, segments, audio_features, samples):
+        """Ergänzt die Segmente eines Fensters um Wortzeitstempel (Cross-Attention-Alignment)
+
+        audio_features ist die Encoder-Ausgabe dieses einen Fensters (Batch-Dimension 1).
+        """
+        if not segments:
+            return
+        with self.timer.stage("alignment"):
+            whisper.timing.add_word_timestamps(
+                segments=segments,
+                model=EncodedAudioModel(self.model),
+                tokenizer=state.tokenizer,
+                mel=audio_features[0],
+                num_frames=samples // HOP_LENGTH,
+                prepend_punctuations=PREPEND_PUNCTUATIONS,
+                append_punctuations=APPEND_PUNCTUATIONS,
+                last_speech_timestamp=state.last_speech_timestamp,
+            )
+        state.last_speech_timestamp = segments_end(segments)
+
+    def decode_with_fallback(self, state, audio_features, temperatures=TEMPERATURES, durations=None, prompt=True):
+        """Dekodiert mit steigender Temperatur, bis das Ergebnis plausibel ist
+
+        Nach einem Abbruch durch den DecodeGuard wird zusätzlich ohne Vortext dekodiert,
+        der eine Schleife oft fortsetzt. Bleibt das Fenster abgebrochen, gilt das
+        gekürzte Ergebnis.
+        """
+        result = None
+        for temperature in temperatures:
+            result = self.run_decoder(state, audio_features, temperature, durations, prompt)[0]
+            if not self.needs_fallback(result):
+                break
+            prompt = prompt and not result.guard
+        if result.guard:
+            self.guard_stats["unresolved"] += 1
+        return result
+
+    def run_decoder(self, state, audio_features, temperature, durations=None, prompt=True):
+        """Dekodiert alle Fenster der Batch-Dimension von audio_features und gibt die Ergebnisse zurück
+
+        durations sind die Audiodauern der Fenster in Sekunden (für den DecodeGuard).
+        """
+        options = whisper.DecodingOptions(
+            task=state.task,
+            language=state.language,
+            temperature=temperature,
+            prompt=self.prompt_for(state) if prompt else None,
+            fp16=self.fp16,
+        )
+        task = whisper.decoding.DecodingTask(self.model, options)
+        # Die Encoder-Ausgabe liegt bereits im passenden Datentyp vor (auch BF16,
+        # was die Typprüfung von DecodingTask nicht kennt)
+        task._get_audio_features = lambda features: features
+        guard = DecodeGuard(task.tokenizer, task.sample_begin, durations or [WINDOW_SECONDS] * len(audio_features))
+        task.logit_filters.append(guard)
+        results = task.run(audio_features)
+        self.decoded_tokens += sum(len(result.tokens) for result in results)
+        for result, row in zip(results, guard.rows):
+            self.count_guard(apply_guard(result, row, task.tokenizer))
+        return results
+
+    def count_guard(self, result):
+        if result.guard:
+            self.guard_stats[result.guard] += 1
+
+    def prompt_for(self, state):
+        return state.prompt()
+
+    @staticmethod
+    def silent(result):
+        """Fenster ohne Sprache: whisper.transcribe überspringt es ganz"""
+        return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob <= LOGPROB_THRESHOLD
+
+    @staticmethod
+    def spoken(segments):
+        """Verwirft Segmente ohne Dauer oder Text (whisper.transcribe leert sie)"""
+        return [segment for segment in segments if segment["start"] != segment["end"] and segment["text"].strip()]
+
+    @staticmethod
+    def needs_fallback(result):
+        if result.guard:
+            return True  # Schleife oder zu dichter Text, vom DecodeGuard abgebrochen
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD:
+            return False  # Stille
+        return result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+
+    @staticmethod
+    def split_segments(state, result, seek, samples):
+        """Zerlegt die Tokens eines Fensters an Zeitstempelpaaren in Segmente, wie whisper.transcribe
+
+        Gibt die Segmente, die verbrauchten Samples und zurück, ob die Tokens mit einem
+        einzelnen Zeitstempel enden. Ein Segment ohne schließenden Zeitstempel am Ende
+        wird verworfen; das Fenster endet dann am letzten Zeitstempel, und das Segment
+        wird ab dort neu dekodiert. Ganz ohne Zeitstempelpaar bilden alle Tokens ein
+        Segment bis zum letzten Zeitstempel bzw. Fensterende.
+        """
+        tokenizer = state.tokenizer
+        timestamp_begin = tokenizer.timestamp_begin
+        tokens = list(result.tokens)
+        time_offset = seek / SAMPLE_RATE
+        is_timestamp = [token >= timestamp_begin for token in tokens]
+        single_timestamp_ending = is_timestamp[-2:] == [False, True]
+        # Ein Zeitstempel-Token entspricht zwei Mel-Frames
+        samples_per_timestamp = round(TIME_PRECISION * SAMPLE_RATE)
+
+        def segment(start, end, segment_tokens):
+            return {
+                "seek": seek // HOP_LENGTH,
+                "start": time_offset + start,
+                "end": time_offset + end,
+                "text": tokenizer.decode([token for token in segment_tokens if token < tokenizer.eot]),
+                "tokens": segment_tokens,
+                "temperature": result.temperature,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": result.compression_ratio,
+                "no_speech_prob": result.no_speech_prob,
+            }
+
+        slices = [index + 1 for index in range(len(tokens) - 1) if is_timestamp[index] and is_timestamp[index + 1]]
+        if not slices:
+            timestamps = [token for token in tokens if token >= timestamp_begin]
+            end = samples / SAMPLE_RATE
+            if timestamps and timestamps[-1] != timestamp_begin:
+                end = (timestamps[-1] - timestamp_begin) * TIME_PRECISION
+            return [segment(0.0, end, tokens)], samples, single_timestamp_ending
+
+        if single_timestamp_ending:
+            slices.append(len(tokens))
+        segments = []
+        last_slice = 0
+        for current_slice in slices:
+            sliced = tokens[last_slice:current_slice]
+            segments.append(segment(
+                (sliced[0] - timestamp_begin) * TIME_PRECISION, (sliced[-1] - timestamp_begin) * TIME_PRECISION, sliced
+            ))
+            last_slice = current_slice
+        if single_timestamp_ending:
+            consumed = samples  # Nach dem letzten Zeitstempel folgt keine Sprache mehr
+        else:
+            consumed = (tokens[last_slice - 1] - timestamp_begin) * samples_per_timestamp
+        return segments, consumed, single_timestamp_ending
+
+# Gleichzeitig dekodierte Fenster
+BATCH_MAX_WINDOWS = 16
+
+def window_memory_mb(dims, dtype):
+    """Schätzt den Zusatzspeicher je Fenster im Batch (Encoder-Attention und -Aktivierungen, KV-Cache)"""
+    audio_ctx = dims.n_audio_ctx
+    attention = dims.n_audio_head * audio_ctx * audio_ctx
+    activations = 4 * audio_ctx * dims.n_audio_state
+    cross_cache = 2 * dims.n_text_layer * audio_ctx * dims.n_text_state
+    self_cache = 2 * dims.n_text_layer * dims.n_text_ctx * dims.n_text_state
+    bytes_per_value = torch.finfo(dtype).bits // 8
+    return (attention + activations + cross_cache + self_cache) * bytes_per_value / (1024 * 1024)
+
+def choose_batch_size(model, device, dtype, memory_mb=None, max_windows=BATCH_MAX_WINDOWS):
+    """Wählt die Anzahl gleichzeitig dekodierter Fenster nach Speicherbudget (MB)"""
+    if memory_mb is None:
+        if device == "cuda":
+            free, _ = torch.cuda.mem_get_info()
+        else:
+            free = psutil.virtual_memory().available
+        memory_mb = free / (1024 * 1024) * BATCH_MEMORY_FRACTION
+    return max(1, min(max_windows, int(memory_mb // window_memory_mb(model.dims, dtype))))
+
+class BatchedTranscriber(MultiTaskTranscriber):
+    """Dekodiert mehrere Fenster gleichzeitig, ohne Konditionierung auf den Vortext
+
+    Die Fenster enden an der leisesten Stelle vor der 30-Sekunden-Grenze. Encoder und
+    Decoder laufen über die Batch-Dimension auf batch_size Fenstern; fertige Fenster
+    erzeugen im Decoder nur noch EOT. Wie in der sequentiellen Engine rückt jede Aufgabe
+    nur bis zu ihrem letzten vollständigen Segment vor; den Rest eines Fensters dekodiert
+    die nächste Runde. Fenster, die die Plausibilitätsprüfung nicht bestehen, werden
+    einzeln mit steigender Temperatur wiederholt.
+    """
+    def __init__(self, model, tasks=None, device="cpu", precision="fp32", timer=None, word_timestamps=True,
+                 batch_size=None, memory_mb=None):
+        super().__init__(model, tasks, device, precision, timer, word_timestamps)
+        self.batch_size = batch_size or choose_batch_size(model, device, self.dtype, memory_mb)
+
+    def transcribe(self, audio, is_cancelled=None, on_window=None, resume=None, mel=None):
+        """Wie MultiTaskTranscriber.transcribe; on_window wird weiterhin je Fenster aufgerufen"""
+        states = self.init_states(resume)
+        total = len(audio)
+        seek = self.position(total)
+
+        with torch.no_grad():
+            while window_samples(total, seek) > 0:
+                group = []
+                while len(group) < self.batch_size and window_samples(total, seek) > 0:
+                    end = self.window_end(audio, total, seek)
+                    group.append((seek, end))
+                    seek = end
+                pieces = self.decode_group(audio, group, is_cancelled, mel)
+
+                for index, (start, end) in enumerate(group):
+                    new_segments = {}
+                    self.window_ranges = {}
+                    for name, state in states.items():
+                        new_segments[name] = []
+                        if state.seek >= end:
+                            continue
+                        for segments, temperature in pieces.get((name, index), []):
+                            self.append_segments(state, segments, temperature)
+                            new_segments[name].extend(segments)
+                        self.window_ranges[name] = (max(start, state.seek), end)
+                        state.seek = end
+                    if on_window:
+                        on_window(self.position(total) / SAMPLE_RATE, new_segments)
+
+        return {name: state.result() for name, state in states.items()}
+
+    @staticmethod
+    def window_end(audio, total, seek):
+        """Ende des Fensters ab seek: an der leisesten Stelle der letzten Sekunden vor der 30-Sekunden-Grenze"""
+        if total - seek <= WINDOW_SAMPLES:
+            return total
+        search = int(SILENCE_SEARCH_SECONDS * SAMPLE_RATE) // FRAME_SAMPLES * FRAME_SAMPLES
+        first = seek + WINDOW_SAMPLES - search
+        energy = frame_energy_db(audio[first:seek + WINDOW_SAMPLES])
+        return first + int(np.argmin(energy)) * FRAME_SAMPLES
+
+    def decode_group(self, audio, group, is_cancelled=None, mel=None):
+        """Dekodiert die Fenster (Start, Ende) einer Gruppe für alle Aufgaben
+
+        Gibt je (Aufgabe, Fensterindex) die Segmentlisten der Runden mit ihrer Temperatur
+        zurück. Jede Runde dekodiert von jeder offenen Position höchstens 30 Sekunden bis
+        zum Fensterende; Aufgaben an derselben Position teilen sich die Encoder-Ausgabe.
+        """
+        pieces = defaultdict(list)
+        items = [
+            (name, index, max(start, state.seek), end, state.last_speech_timestamp)
+            for index, (start, end) in enumerate(group)
+            for name, state in self.states.items()
+            if state.seek < end
+        ]
+        while items:
+            if is_cancelled and is_cancelled():
+                raise InterruptedError("Transkription wurde abgebrochen")
+
+            ranges = sorted({(seek, window_samples(end, seek)) for _, _, seek, end, _ in items})
+            rows = {window: row for row, window in enumerate(ranges)}
+            audio_features = torch.cat([
+                self.encode_batch(
+                    [audio[seek:seek + samples] for seek, samples in batch],
+                    [mel.window(seek, samples) if mel is not None else None for seek, samples in batch],
+                )
+                for batch in (ranges[first:first + self.batch_size] for first in range(0, len(ranges), self.batch_size))
+            ])
+
+            next_items = []
+            for name, state in self.states.items():
+                task_items = [item for item in items if item[0] == name]
+                if not task_items:
+                    continue
+                task_rows = [rows[(seek, window_samples(end, seek))] for _, _, seek, end, _ in task_items]
+                results = self.decode_batch(
+                    state, audio_features[task_rows],
+                    [window_samples(end, seek) / SAMPLE_RATE for _, _, seek, end, _ in task_items]
+                )
+                for (_, index, seek, end, last_speech), row, result in zip(task_items, task_rows, results):
+                    # Fenster sind unabhängig: Wortzeitstempel beginnen nach der zuletzt gehörten Sprache im Fenster
+                    state.last_speech_timestamp = last_speech
+                    samples = window_samples(end, seek)
+                    segments, consumed = self.window_segments(
+                        state, result, seek, samples, audio_features[row:row + 1]
+                    )
+                    pieces[(name, index)].append((segments, 0.0 if self.silent(result) else result.temperature))
+                    if window_samples(end, seek + consumed) > 0:
+                        next_items.append((name, index, seek + consumed, end, state.last_speech_timestamp))
+            items = next_items
+        return pieces
+
+    def prompt_for(self, state):
+        return None
+
+    def prompt_context(self):
+        # Fenster werden unabhängig dekodiert, es gibt keinen fortlaufenden Prompt
+        return {}
+
+    def encode_batch(self, chunks, mels):
+        """Berechnet Mel-Spektrogramme und Encoder-Ausgabe für alle Fenster eines Batches"""
+        with self.timer.stage("mel"):
+            mel = torch.stack([
+                window_mel(chunk, self.model.dims.n_mels, device=self.model.device) if mel is None
+                else mel.to(self.model.device)
+                for chunk, mel in zip(chunks, mels)
+            ]).to(self.dtype)
+        with self.timer.stage("encoder"):
+            return self.model.embed_audio(mel)
+
+    def decode_batch(self, state, audio_features, durations=None):
+        """Dekodiert alle Fenster gierig und wiederholt unplausible Fenster einzeln"""
+        durations = durations or [WINDOW_SECONDS] * len(audio_features)
+        with self.timer.stage("decoder"):
+            results = self.run_decoder(state, audio_features, TEMPERATURES[0], durations)
+            for index, result in enumerate(results):
+                if self.needs_fallback(result):
+                    results[index] = self.decode_with_fallback(
+                        state, audio_features[index:index + 1], TEMPERATURES[1:], [durations[index]]
+                    )
+        return results
+
+# Spekulative Dekodierung: ein kleines Entwurfsmodell schlägt Tokens vor, das Modell prüft sie
+SPECULATIVE_DRAFT_TOKENS = 5  # Vorgeschlagene Tokens je Prüfdurchlauf
+V3_TOKENIZER_MODELS = ("large-v3", "turbo")  # Eigener Tokenizer (zusätzliches Sprach-Token)
+
+def draft_compatible(model_id, draft_id):
+    """Prüft, ob ein Entwurfsmodell denselben Tokenizer wie das Modell verwendet"""
+    return draft_id != model_id and (model_id in V3_TOKENIZER_MODELS) == (draft_id in V3_TOKENIZER_MODELS)
+
+class IncrementalDecoder:
+    """Decoder-Durchlauf mit eigenem KV-Cache, der mehrere neue Tokens auf einmal annimmt
+
+    Der Decoder von whisper maskiert mehrere neue Tokens nur bei leerem Cache korrekt.
+    Zum Prüfen der Vorschläge werden hier mehrere Tokens an einen gefüllten Cache
+    angehängt; danach wird der Cache auf die angenommenen Tokens gekürzt. Gerechnet
+    wird mit den Schichten des Modells, die Cross-Attention-Schlüssel einmal je Fenster.
+    """
+    def __init__(self, model, audio_features):
+        self.decoder = model.decoder
+        self.n_head = model.dims.n_text_head
+        self.cross = [
+            (block.cross_attn.key(audio_features), block.cross_attn.value(audio_features))
+            for block in self.decoder.blocks
+        ]
+        self.keys = [None] * len(self.decoder.blocks)
+        self.values = [None] * len(self.decoder.blocks)
+        self.length = 0
+
+    def truncate(self, length):
+        if length < self.length:
+            self.keys = [key[:, :length] for key in self.keys]
+            self.values = [value[:, :length] for value in self.values]
+            self.length = length
+
+    def forward(self, tokens):
+        """Hängt tokens an den Cache an und gibt die Logits (float32) je neuer Position zurück"""
+        decoder = self.decoder
+        offset = self.length
+        tokens = torch.tensor([tokens], device=decoder.token_embedding.weight.device)
+        count = tokens.shape[1]
+        x = decoder.token_embedding(tokens) + decoder.positional_embedding[offset:offset + count]
+        x = x.to(self.cross[0][0].dtype)
+        # Kausal relativ zum Cache: die neue Position i sieht den Cache und die neuen Tokens bis i
+        mask = torch.full((count, offset + count), float("-inf"), device=x.device).triu(offset + 1)
+        for index, block in enumerate(decoder.blocks):
+            h = block.attn_ln(x)
+            key, value = block.attn.key(h), block.attn.value(h)
+            if self.keys[index] is not None:
+                key = torch.cat([self.keys[index], key], dim=1)
+                value = torch.cat([self.values[index], value], dim=1)
+            self.keys[index], self.values[index] = key, value
+            x = x + block.attn.out(self.attention(block.attn.query(h), key, value, mask))
+            h = block.cross_attn_ln(x)
+            x = x + block.cross_attn.out(self.attention(block.cross_attn.query(h), *self.cross[index]))
+            x = x + block.mlp(block.mlp_ln(x))
+        self.length = offset + count
+        x = decoder.ln(x)
+        return (x @ torch.transpose(decoder.token_embedding.weight.to(x.dtype), 0, 1)).float()[0]
+
+    def attention(self, query, key, value, mask=None):
+        n_batch, n_ctx, n_state = query.shape
+        scale = (n_state // self.n_head) ** -0.25
+        query = query.view(n_batch, n_ctx, self.n_head, -1).permute(0, 2, 1, 3)
+        key = key.view(n_batch, key.shape[1], self.n_head, -1).permute(0, 2, 1, 3)
+        value = value.view(n_batch, value.shape[1], self.n_head, -1).permute(0, 2, 1, 3)
+        qk = (query * scale) @ (key * scale).transpose(-1, -2)
+        if mask is not None:
+            qk = qk + mask
+        weights = qk.float().softmax(dim=-1).to(query.dtype)
+        return (weights @ value).permute(0, 2, 1, 3).flatten(start_dim=2)
+
+class SpeculativeTranscriber(MultiTaskTranscriber):
+    """Greedy-Dekodierung des Modells mit Vorschlägen eines kleinen Entwurfsmodells
+
+    Das Entwurfsmodell (gleicher Tokenizer) schlägt je Schritt bis zu draft_tokens Tokens
+    greedy vor. Das Modell berechnet in einem einzigen Durchlauf die Logits für alle
+    Vorschläge, übernimmt sie, solange sein eigenes argmax (nach denselben Logit-Filtern
+    wie whisper.decoding) übereinstimmt, und setzt an der ersten Abweichung sein eigenes
+    Token. Das Ergebnis ist damit die Greedy-Dekodierung des Modells; das Entwurfsmodell
+    bestimmt nur, wie viele Tokens ein Durchlauf des großen Decoders liefert. Fenster mit
+    Temperatur-Fallback werden wie bisher ohne Entwurf dekodiert.
+    """
+    def __init__(self, model, draft_model, tasks=None, device="cpu", precision="fp32", timer=None,
+                 word_timestamps=True, condition_on_previous_text=False, draft_tokens=SPECULATIVE_DRAFT_TOKENS):
+        super().__init__(model, tasks, device, precision, timer, word_timestamps)
+        if draft_model.dims.n_vocab != model.dims.n_vocab:
+            raise ValueError("Entwurfsmodell und Modell verwenden unterschiedliche Tokenizer")
+        self.draft_model = draft_model
+        self.condition_on_previous_text = condition_on_previous_text
+        self.draft_tokens = draft_tokens
+        self.draft_features = None
+        self.proposed_tokens = 0
+        self.accepted_tokens = 0
+        self.target_passes = 0
+
+    def stats(self):
+        """Kennzahlen der Vorschläge (Annahmequote, Tokens je Durchlauf des Modells)"""
+        generated = self.decoded_tokens
+        return {
+            "proposed": self.proposed_tokens,
+            "accepted": self.accepted_tokens,
+            "acceptance_rate": self.accepted_tokens / self.proposed_tokens if self.proposed_tokens else 0.0,
+            "target_passes": self.target_passes,
+            "tokens_per_pass": generated / self.target_passes if self.target_passes else 0.0,
+        }
+
+    def encode(self, chunk, mel=None):
+        with self.timer.stage("mel"):
+            if mel is None:
+                mel = window_mel(chunk, self.model.dims.n_mels, device=self.model.device)
+        features = super().encode(chunk, mel)
+        with self.timer.stage("draft_encoder"):
+            if self.draft_model.dims.n_mels != self.model.dims.n_mels:
+                mel = window_mel(chunk, self.draft_model.dims.n_mels, device=self.draft_model.device)
+            mel = mel.to(self.draft_model.device).unsqueeze(0).to(self.dtype)
+            self.draft_features = self.draft_model.embed_audio(mel)
+        return features
+
+    def prompt_for(self, state):
+        return state.prompt() if self.condition_on_previous_text else None
+
+    def prompt_context(self):
+        return super().prompt_context() if self.condition_on_previous_text else {}
+
+    def run_decoder(self, state, audio_features, temperature, durations=None, prompt=True):
+        if temperature > 0:
+            return super().run_decoder(state, audio_features, temperature, durations, prompt)
+        duration = durations[0] if durations else WINDOW_SECONDS
+        return [self.speculative_decode(state, audio_features, duration, prompt)]
+
+    def speculative_decode(self, state, audio_features, duration=WINDOW_SECONDS, prompt=True):
+        """Greedy-Dekodierung eines Fensters (Temperatur 0) mit Vorschlägen des Entwurfsmodells
+
+        Der DecodeGuard prüft hier nur die angenommenen Tokens, nicht die Vorschläge.
+        """
+        options = whisper.DecodingOptions(
+            task=state.task,
+            language=state.language,
+            temperature=0.0,
+            prompt=self.prompt_for(state) if prompt else None,
+            fp16=self.fp16,
+        )
+        task = whisper.decoding.DecodingTask(self.model, options)
+        tokenizer = task.tokenizer
+        guard = GuardedRow(tokenizer.eot, tokenizer.timestamp_begin, duration)
+        target = IncrementalDecoder(self.model, audio_features)
+        draft = IncrementalDecoder(self.draft_model, self.draft_features)
+        tokens = list(task.initial_tokens)
+        sample_begin = len(tokens)
+        max_length = min(sample_begin + task.sample_len, task.n_ctx)
+
+        # Erster Durchlauf über die Anfangstokens liefert die Wahrscheinlichkeit für "keine Sprache".
+        # Beide Caches enthalten danach alle Tokens bis auf das letzte, das im nächsten Durchlauf
+        # zusammen mit den Vorschlägen gerechnet wird.
+        logits = target.forward(tokens)
+        no_speech_prob = logits[task.sot_index].softmax(dim=-1)[tokenizer.no_speech].item()
+        target.truncate(len(tokens) - 1)
+        self.target_passes += 1
+
+        sum_logprob = 0.0
+        finished = False
+        while not finished and len(tokens) < max_length:
+            draft.truncate(len(tokens) - 1)
+            draft_logits = draft.forward(tokens[draft.length:])[-1]
+            proposals = []
+            while True:
+                token, _ = self.next_token(task, draft_logits, tokens + proposals)
+                proposals.append(token)
+                if token == tokenizer.eot or len(proposals) >= min(self.draft_tokens, max_length - len(tokens)):
+                    break
+                draft_logits = draft.forward([token])[-1]
+
+            # Ein Durchlauf des Modells über das letzte Token und alle Vorschläge
+            logits = target.forward(tokens[target.length:] + proposals)
+            self.target_passes += 1
+            self.proposed_tokens += len(proposals)
+            for index in range(len(proposals) + 1):
+                token, logprob = self.next_token(task, logits[index], tokens)
+                tokens.append(token)
+                sum_logprob += logprob
+                matched = index < len(proposals) and token == proposals[index]
+                self.accepted_tokens += matched
+                if token == tokenizer.eot or len(tokens) >= max_length or guard.feed(token):
+                    finished = True
+                    break
+                if not matched:
+                    break
+            target.truncate(len(tokens) - 1)
+
+        sampled = tokens[sample_begin:]
+        if tokenizer.eot in sampled:
+            sampled = sampled[:sampled.index(tokenizer.eot)]
+        text = tokenizer.decode(sampled).strip()
+        self.decoded_tokens += len(sampled)
+        result = whisper.decoding.DecodingResult(
+            audio_features=audio_features[0],
+            language=state.language,
+            tokens=sampled,
+            text=text,
+            avg_logprob=sum_logprob / (len(sampled) + 1),
+            no_speech_prob=no_speech_prob,
+            temperature=0.0,
+            compression_ratio=whisper.utils.compression_ratio(text),
+        )
+        self.count_guard(apply_guard(result, guard, tokenizer))
+        return result
+
+    @staticmethod
+    def next_token(task, logits, context):
+        """Greedy-Auswahl wie whisper.decoding.GreedyDecoder nach den Logit-Filtern der Aufgabe"""
+        logits = logits.unsqueeze(0).clone()
+        tokens = torch.tensor([context], device=logits.device)
+        for logit_filter in task.logit_filters:
+            logit_filter.apply(logits, tokens)
+        token = int(logits.argmax(dim=-1)[0])
+        return token, logits.log_softmax(dim=-1)[0, token].item()
+
+# Kaskade: das gewählte Modell dekodiert alles, ein großes Modell nur die unsicheren Fenster
+CASCADE_LOGPROB_THRESHOLD = -0.6  # Fenster mit geringerer mittlerer Log-Wahrscheinlichkeit gelten als unsicher ...
+CASCADE_NO_SPEECH_THRESHOLD = 0.4  # ... ebenso Fenster, die das Modell nur knapp von Stille unterscheidet
+
+def cascade_useful(model_id, cascade_id):
+    """Prüft, ob das Kaskadenmodell größer als das Modell ist (sonst bringt die zweite Stufe nichts)"""
+    return model_memory_mb(cascade_id, "cuda") > model_memory_mb(model_id, "cuda")
+
+class CascadeTranscriber:
+    """Dekodiert mit einer schnellen Engine und wiederholt unsichere Fenster mit einem großen Modell
+
+    Nach jedem Fenster werden die Segmente jeder Aufgabe nach mittlerer
+    Log-Wahrscheinlichkeit und No-Speech-Wahrscheinlichkeit bewertet. Ist eine Aufgabe
+    unsicher, dekodiert das große Modell den Bereich, den sie in diesem Fenster
+    verbraucht hat, erneut; seine Segmente ersetzen die der schnellen Engine, bevor das
+    Fenster geschrieben wird. Aufgaben mit demselben Bereich teilen sich den Encoder
+    des großen Modells. Fenster und Audiodauer werden je Aufgabe gezählt. Der Vortext
+    bleibt in den Tokens des schnellen Modells und wird bei anderem Tokenizer
+    (large-v3, turbo) über den Text übertragen.
+    """
+    def __init__(self, engine, cascade_model, device="cpu", precision="fp32", cascade_id=None):
+        self.engine = engine
+        self.timer = engine.timer
+        self.cascade_id = cascade_id
+        # Eigene Stufenzeiten, damit die Fenster des großen Modells nicht doppelt als Encoder-Läufe zählen
+        self.escalation = MultiTaskTranscriber(
+            cascade_model, engine.tasks, device, precision, StageTimer(), engine.word_timestamps
+        )
+        self.same_tokenizer = cascade_model.dims.n_vocab == engine.model.dims.n_vocab
+        self.windows = 0
+        self.escalated_windows = 0
+        self.audio_seconds = 0.0
+        self.escalated_seconds = 0.0
+
+    @property
+    def tasks(self):
+        return self.engine.tasks
+
+    @property
+    def decoded_tokens(self):
+        return self.engine.decoded_tokens + self.escalation.decoded_tokens
+
+    @property
+    def guard_stats(self):
+        stats = self.engine.guard_stats
+        return {reason: count + self.escalation.guard_stats[reason] for reason, count in stats.items()}
+
+    def prompt_context(self):
+        return self.engine.prompt_context()
+
+    def task_positions(self):
+        return self.engine.task_positions()
+
+    def stats(self):
+        """Anteil der Fenster und des Audios, die das große Modell neu dekodiert hat"""
+        return {
+            "cascade_model": self.cascade_id,
+            "windows": self.windows,
+            "escalated_windows": self.escalated_windows,
+            "audio_seconds": round(self.audio_seconds, 2),
+            "escalated_seconds": round(self.escalated_seconds, 2),
+            "escalated_fraction": self.escalated_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+        }
+
+    @staticmethod
+    def uncertain(segments):
+        return any(
+            segment["avg_logprob"] < CASCADE_LOGPROB_THRESHOLD
+            or segment["no_speech_prob"] > CASCADE_NO_SPEECH_THRESHOLD
+            for segment in segments
+        )
+
+    def transcribe(self, audio, is_cancelled=None, on_window=None, resume=None, mel=None):
+        """Wie MultiTaskTranscriber.transcribe; on_window und Ergebnis enthalten die zusammengeführten Segmente"""
+        self.escalation.init_states()
+
+        def window(position, segments):
+            ranges = self.engine.window_ranges
+            self.windows += len(ranges)
+            self.audio_seconds += sum(end - seek for seek, end in ranges.values()) / SAMPLE_RATE
+            uncertain = defaultdict(list)
+            for name, window_range in ranges.items():
+                if self.uncertain(segments[name]):
+                    uncertain[window_range].append(name)
+            if uncertain:
+                segments = dict(segments)
+                with self.timer.stage("cascade"):
+                    for (seek, end), names in uncertain.items():
+                        audio_features = self.escalation.encode(audio[seek:seek + window_samples(end, seek)])
+                        for name in names:
+                            segments[name] = self.escalate(name, segments[name], audio, seek, end, audio_features)
+                        self.escalated_windows += len(names)
+                        self.escalated_seconds += len(names) * (end - seek) / SAMPLE_RATE
+            if on_window:
+                on_window(position, segments)
+
+        return self.engine.transcribe(audio, is_cancelled=is_cancelled, on_window=window, resume=resume, mel=mel)
+
+    def escalate(self, name, replaced, audio, seek, end, audio_features=None):
+        """Dekodiert audio[seek:end] für eine Aufgabe mit dem großen Modell und ersetzt die Segmente replaced
+
+        audio_features kann die Encoder-Ausgabe des großen Modells für das erste Fenster enthalten.
+        """
+        state = self.engine.states[name]
+        target = self.escalation.states[name]
+        # Segmente und Vortext der schnellen Engine für dieses Fenster zurücknehmen
+        del state.segments[len(state.segments) - len(replaced):]
+        del state.all_tokens[len(state.all_tokens) - sum(len(segment["tokens"]) for segment in replaced):]
+        state.prompt_reset_since = min(state.prompt_reset_since, len(state.all_tokens))
+
+        prompt = self.engine.prompt_for(state)
+        if prompt and not self.same_tokenizer:
+            prompt = target.tokenizer.encode(state.tokenizer.decode(prompt))
+        target.segments = []
+        target.all_tokens = list(prompt or [])
+        target.prompt_reset_since = 0
+        target.last_speech_timestamp = seek / SAMPLE_RATE
+        segments = self.escalation.decode_range(target, audio, seek, end, audio_features, prompt=bool(prompt))
+
+        for segment in segments:
+            segment["id"] = len(state.segments)
+            state.segments.append(segment)
+            state.all_tokens.extend(
+                segment["tokens"] if self.same_tokenizer else state.tokenizer.encode(segment["text"])
+            )
+        if any(segment["temperature"] > 0.5 for segment in segments):
+            state.prompt_reset_since = len(state.all_tokens)
+        return segments
+
+def create_transcriber(model, tasks=None, device="cpu", precision="fp32", timer=None,
+                       condition_on_previous_text=False, batch_size=None, batch_memory_mb=None, word_timestamps=True,
+                       draft_model=None, cascade_model=None):
+    """Gebatchte Engine, oder die sequentielle, wenn auf den Vortext konditioniert werden soll
+
+    Mit draft_model (Modellname) wird spekulativ dekodiert, Fenster für Fenster. Mit
+    cascade_model (Modellname) dekodiert dieses Modell die unsicheren Fenster erneut.
+    """
+    if draft_model:
+        engine = SpeculativeTranscriber(
+            model, MODEL_CACHE.get(draft_model, device, precision), tasks, device, precision, timer=timer,
+            word_timestamps=word_timestamps, condition_on_previous_text=condition_on_previous_text
+        )
+    elif condition_on_previous_text:
+        engine = MultiTaskTranscriber(model, tasks, device, precision, timer=timer, word_timestamps=word_timestamps)
+    else:
+        engine = BatchedTranscriber(
+            model, tasks, device, precision, timer=timer, word_timestamps=word_timestamps, batch_size=batch_size,
+            memory_mb=batch_memory_mb
+        )
+    if cascade_model:
+        return CascadeTranscriber(
+            engine, MODEL_CACHE.get(cascade_model, device, precision), device, precision, cascade_id=cascade_model
+        )
+    return engine
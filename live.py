@@ -0,0 +1,220 @@
+"""Live-Modus: laufende Aufnahmen (wachsende Datei oder stdin) mit begrenzter Latenz untertiteln"""
+
+import numpy as np
+import threading
+import time
+import bisect
+import statistics
+from core import READ_CHUNK_BYTES, SAMPLE_RATE, WINDOW_SAMPLES, ffmpeg, torch
+from decoding import MultiTaskTranscriber
+
+LIVE_STEP_SECONDS = 2.0  # Abstand der Dekodierdurchläufe
+LIVE_LOOKAHEAD_SECONDS = 3.0  # Segmente so nah am Ende der Aufnahme werden noch zurückgehalten
+LIVE_IDLE_SECONDS = 10.0  # Wächst die Datei so lange nicht, gilt die Aufnahme als beendet
+
+class LiveAudioStream:
+    """Liest 16-kHz-Mono-Audio fortlaufend über ffmpeg aus einer wachsenden Datei oder stdin
+
+    Ein Thread hängt die Samples an, sobald ffmpeg sie liefert. Für jeden Block wird
+    die Ankunftszeit vermerkt, um die Latenz übernommener Segmente zu messen. Bereits
+    übernommenes Audio wird mit discard verworfen, damit der Speicher nicht mit der
+    Dauer der Aufnahme wächst. Indizes zählen ab Beginn der Aufnahme.
+    """
+    def __init__(self, source, input_options=None, idle_seconds=LIVE_IDLE_SECONDS):
+        self.source = source
+        self.input_options = dict(input_options or {})
+        self.idle_seconds = idle_seconds
+        self.buffer = np.empty(0, dtype=np.int16)
+        self.base = 0  # Index des ersten Samples im Puffer
+        self.total = 0
+        self.arrivals = []  # (Samples bis einschließlich dieses Blocks, Ankunftszeit)
+        self.finished = False
+        self.error = None
+        self.process = None
+        self._lock = threading.Condition()
+
+    def start(self):
+        if self.source == "-":
+            stream = ffmpeg.input("pipe:0", **self.input_options)
+        else:
+            # follow liest am Dateiende weiter; rw_timeout beendet das Lesen, wenn die Datei nicht mehr wächst
+            stream = ffmpeg.input(
+                self.source, follow=1, rw_timeout=int(self.idle_seconds * 1e6), **self.input_options
+            )
+        self.process = (
+            stream.output("pipe:", format="s16le", acodec="pcm_s16le", ar=SAMPLE_RATE, ac=1)
+            .global_args("-loglevel", "error", "-nostats")
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        threading.Thread(target=self._read, daemon=True).start()
+        return self
+
+    def _read(self):
+        stderr = []
+        stderr_reader = threading.Thread(target=lambda: stderr.append(self.process.stderr.read()), daemon=True)
+        stderr_reader.start()
+        remainder = b""
+        while True:
+            # read1 liefert, was ffmpeg bisher geschrieben hat, statt auf einen vollen Block zu warten
+            data = self.process.stdout.read1(READ_CHUNK_BYTES)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 2
+            remainder = data[usable:]
+            self.append(np.frombuffer(data[:usable], dtype=np.int16))
+        self.process.wait()
+        stderr_reader.join()
+        with self._lock:
+            # Ohne jedes Audio ist ein ffmpeg-Fehler ein Fehler, sonst das Ende der Aufnahme (rw_timeout)
+            if self.process.returncode != 0 and self.total == 0:
+                message = stderr[0].decode(errors="replace").strip() if stderr else ""
+                self.error = RuntimeError(f"ffmpeg konnte das Audio nicht lesen: {message}")
+            self.finished = True
+            self._lock.notify_all()
+
+    def append(self, samples):
+        with self._lock:
+            self.buffer = np.concatenate([self.buffer, samples])
+            self.total += len(samples)
+            self.arrivals.append((self.total, time.perf_counter()))
+            self._lock.notify_all()
+
+    def stop(self):
+        """Beendet das Lesen; das bereits gelesene Audio bleibt verfügbar"""
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait_for(self, samples, timeout=None):
+        """Wartet, bis mindestens samples Samples gelesen sind oder die Aufnahme endet"""
+        with self._lock:
+            self._lock.wait_for(lambda: self.total >= samples or self.finished, timeout)
+            if self.error:
+                raise self.error
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(self.total)
+        with self._lock:
+            samples = self.buffer[max(start, self.base) - self.base:max(start, stop) - self.base]
+        return samples.astype(np.float32) / 32768.0
+
+    def arrival_time(self, sample):
+        """Zeitpunkt (perf_counter), zu dem das Sample mit diesem Index gelesen war"""
+        with self._lock:
+            index = bisect.bisect_left(self.arrivals, (sample, float("-inf")))
+            return self.arrivals[min(index, len(self.arrivals) - 1)][1]
+
+    def discard(self, before):
+        """Gibt das Audio vor dem Index before frei"""
+        with self._lock:
+            if before > self.base:
+                self.buffer = self.buffer[before - self.base:].copy()
+                self.base = before
+                index = bisect.bisect_left(self.arrivals, (before, float("-inf")))
+                del self.arrivals[:max(0, index - 1)]
+
+class LiveTranscriber:
+    """Dekodiert einen LiveAudioStream mit gleitendem Fenster und übernimmt nur stabile Segmente
+
+    Alle step Sekunden wird das Audio ab der Übernahmeposition (höchstens ein
+    30-Sekunden-Fenster) neu dekodiert. Segmente, die mindestens lookahead Sekunden
+    vor dem Ende des gelesenen Audios enden, gelten als stabil: Sie werden übernommen
+    (mit Wortzeitstempeln und als Vortext für die folgenden Durchläufe), die
+    Übernahmeposition rückt an ihr Ende. Der Rest wird im nächsten Durchlauf mit mehr
+    Kontext erneut dekodiert. Bei vollem Fenster wird alles bis auf das letzte Segment
+    übernommen. Kleinere Werte senken die Latenz, größere geben dem Modell mehr Kontext.
+    """
+    def __init__(self, model, tasks, device="cpu", precision="fp32", timer=None, word_timestamps=True,
+                 step=LIVE_STEP_SECONDS, lookahead=LIVE_LOOKAHEAD_SECONDS):
+        self.engine = MultiTaskTranscriber(model, tasks, device, precision, timer, word_timestamps)
+        self.name, self.state = next(iter(self.engine.init_states().items()))
+        self.step = round(step * SAMPLE_RATE)
+        self.lookahead = lookahead
+        self.position = 0  # Übernahmeposition in Samples
+        self.latencies = []  # Sekunden vom Eintreffen des Segmentendes bis zur Übernahme
+
+    def run(self, stream, on_commit, is_cancelled=None):
+        """Dekodiert, bis die Aufnahme endet; on_commit(segments, latencies) je übernommener Gruppe
+
+        Nach is_cancelled wird nicht mehr gelesen, das bereits gelesene Audio aber noch übernommen.
+        """
+        decoded = 0  # Ende des zuletzt dekodierten Audios
+        stopped = False
+        with torch.no_grad():
+            while True:
+                if not stopped and is_cancelled and is_cancelled():
+                    stream.stop()
+                    stopped = True
+                stream.wait_for(min(self.position + WINDOW_SAMPLES, decoded + self.step), timeout=1.0)
+                end = min(len(stream), self.position + WINDOW_SAMPLES)
+                final = stream.finished and end == len(stream)
+                if end <= self.position:
+                    if final:
+                        return self.state.result()
+                    continue
+                if not final and end - decoded < self.step and end - self.position < WINDOW_SAMPLES:
+                    continue
+                committed = self.decode(stream, end, final)
+                decoded = end
+                # Latenzen vor dem Verwerfen messen, sonst fehlen die Ankunftszeiten der übernommenen Samples
+                if committed:
+                    now = time.perf_counter()
+                    latencies = [now - stream.arrival_time(round(segment["end"] * SAMPLE_RATE)) for segment in committed]
+                    self.latencies.extend(latencies)
+                stream.discard(self.position)
+                if committed:
+                    on_commit(committed, latencies)
+
+    def decode(self, stream, end, final):
+        """Dekodiert das Audio von der Übernahmeposition bis end und übernimmt die stabilen Segmente"""
+        engine, state = self.engine, self.state
+        seek = self.position
+        chunk = stream[seek:end]
+        time_offset = seek / SAMPLE_RATE
+        duration = len(chunk) / SAMPLE_RATE
+        audio_features = engine.encode(chunk)
+        with engine.timer.stage("decoder"):
+            result = engine.decode_with_fallback(state, audio_features, durations=[duration])
+        segments, consumed = [], len(chunk)
+        if not engine.silent(result):
+            segments, consumed, _ = engine.split_segments(state, result, seek, len(chunk))
+            segments = engine.spoken(segments)
+
+        if final:
+            stable = segments
+        else:
+            limit = time_offset + duration - self.lookahead
+            stable = [segment for segment in segments if segment["end"] <= limit]
+            if not stable and len(chunk) >= WINDOW_SAMPLES:
+                stable = segments[:-1] or segments
+
+        if final:
+            # Ein angeschnittenes letztes Segment wird im nächsten Durchlauf ab seinem Anfang dekodiert
+            self.position = seek + consumed if 0 < consumed <= len(chunk) else end
+        elif stable:
+            self.position = max(seek + 1, round(stable[-1]["end"] * SAMPLE_RATE))
+        elif not segments:
+            # Keine Sprache erkannt: bis auf den zurückgehaltenen Rand weiterrücken
+            self.position = max(seek, end - round(self.lookahead * SAMPLE_RATE))
+
+        if engine.word_timestamps and stable:
+            engine.add_word_timestamps(state, stable, audio_features, len(chunk))
+        for segment in stable:
+            segment["id"] = len(state.segments)
+            state.segments.append(segment)
+            state.all_tokens.extend(segment["tokens"])
+        if stable and result.temperature > 0.5:
+            state.prompt_reset_since = len(state.all_tokens)
+        return stable
+
+def latency_summary(latencies):
+    """Mittelwert, 95. Perzentil und Maximum der Latenzen in Sekunden"""
+    ordered = sorted(latencies)
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "max": round(ordered[-1], 3),
+    }
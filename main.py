@@ -1,67 +1,131 @@
 import sys
 import os
-import whisper
-import ffmpeg
 from datetime import timedelta, datetime
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog, QLineEdit, QMessageBox, QProgressBar,
-    QSlider, QHBoxLayout, QSplitter, QFormLayout, QComboBox, QRadioButton, QButtonGroup, QFrame, QCheckBox
+    QSlider, QHBoxLayout, QSplitter, QFormLayout, QComboBox, QRadioButton, QButtonGroup, QFrame, QCheckBox,
+    QListWidget, QListWidgetItem
 )
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtMultimediaWidgets import QVideoWidget
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QUrl, QRect, QPoint
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, QUrl, QRect, QPoint
 from PyQt6.QtGui import QScreen
-import warnings
-import torch
 import multiprocessing
-import psutil
-
-# Unterdrücke Warnungen
-warnings.filterwarnings("ignore", category=FutureWarning)
-warnings.filterwarnings("ignore", category=UserWarning)
-
-# Verfügbare Whisper-Modelle mit Speicheranforderungen (in MB)
-WHISPER_MODELS = {
-    "Tiny (schnell, niedrige Genauigkeit)": {"name": "tiny", "memory": 72},
-    "Base (ausgewogen)": {"name": "base", "memory": 139},
-    "Small (gut)": {"name": "small", "memory": 461},
-    "Medium (sehr gut)": {"name": "medium", "memory": 1420},
-    "Turbo (sehr schnell, eventuell ungenau)": {"name": "turbo", "memory": 1510},
-    "Large (beste Qualität)": {"name": "large", "memory": 2880},
-    "Large V2 (beste Qualität, neu)": {"name": "large-v2", "memory": 2870},
-    "Large V3 (beste Qualität, neueste)": {"name": "large-v3", "memory": 2880}
-}
-
-def check_cuda_availability():
-    """Überprüft die Verfügbarkeit von CUDA und gibt Details zurück"""
-    if torch.cuda.is_available():
-        return {
-            "available": True,
-            "device_count": torch.cuda.device_count(),
-            "device_name": torch.cuda.get_device_name(0),
-            "memory_allocated": torch.cuda.memory_allocated(0) / 1024**2,  # In MB
-            "memory_total": torch.cuda.get_device_properties(0).total_memory / 1024**2  # In MB
-        }
-    return {"available": False}
+import numpy as np
+import threading
+import gc
+import tempfile
+import wave
+import argparse
+import glob
+import queue
+import time
+import json
+from collections import defaultdict
+from contextlib import contextmanager, closing, ExitStack
+import platform
+import heapq
+import itertools
+import subprocess
+import signal
+import statistics
+from http.server import ThreadingHTTPServer
+from core import (
+    AUDIO_CACHE_MAX_MB, CHECKPOINT_SUFFIX, DEFAULT_TASKS, OUTPUT_SUFFIXES, PRECISION_MODES, RESULT_CACHE_MAX_MB,
+    SAMPLE_RATE, SOURCE_LANGUAGES, SUBTITLE_FORMATS, VIDEO_EXTENSIONS, WHISPER_MODELS, WINDOW_SAMPLES,
+    check_cuda_availability, cpu_supports_bf16, DeviceManager, extract_audio, job_tasks, language_code, load_model,
+    model_label, model_memory_mb, model_n_mels, output_suffixes, PeakMemorySampler, prefetch_mel, probe_duration,
+    process_rss_mb, psutil, StageTimer, subtitle_suffix, torch, write_pcm_wav,
+)
+from resources import GPU_BUDGET_FRACTION, MEMORY_BUDGET_FRACTION, MODEL_CACHE, RESOURCES, job_memory_mb
+from metrics import METRICS, METRICS_FILE, JobMetrics
+from decoding import (
+    BATCH_MAX_WINDOWS, DECODE_GUARD, SPECULATIVE_DRAFT_TOKENS, BatchedTranscriber, cascade_useful, CascadeTranscriber,
+    create_transcriber, detect_language, draft_compatible, language_probe_chunks, MultiTaskTranscriber,
+    SpeculativeTranscriber,
+)
+from vad import detect_speech, SpeechTimeline
+from parallel import ParallelChunkTranscriber
+from caches import AUDIO_CACHE, RESULT_CACHE, audio_fingerprint, decode_options_key, expected_tasks, JobCheckpoint
+from subtitles import (
+    SUBTITLE_MAX_CPS, SUBTITLE_MAX_LINE_CHARS, SUBTITLE_MAX_LINES, format_timestamp, StreamingWriter, SubtitleLayout,
+)
+from live import (
+    LIVE_IDLE_SECONDS, LIVE_LOOKAHEAD_SECONDS, LIVE_STEP_SECONDS, latency_summary, LiveAudioStream, LiveTranscriber,
+)
+from service import (
+    FINAL_STATES, SERVICE_HOST, SERVICE_PORT, SERVICE_TOKEN_FILE, create_service_token, ServiceClient,
+    ServiceRequestHandler, TranscriptionService,
+)
 
-class DeviceManager:
-    """Verwaltet die Geräteauswahl und -konfiguration"""
-    def __init__(self):
-        self.cuda_info = check_cuda_availability()
-        self.current_device = "cuda" if self.cuda_info["available"] else "cpu"
-        self.cpu_cores = multiprocessing.cpu_count()
-
-    def get_device_info(self):
-        """Gibt Informationen über das aktuelle Gerät zurück"""
-        if self.current_device == "cuda":
-            return f"GPU: {self.cuda_info['device_name']}"
-        return f"CPU: {self.cpu_cores} Kerne verfügbar"
-
-    def set_device(self, device):
-        """Setzt das zu verwendende Gerät"""
-        if device == "cuda" and not self.cuda_info["available"]:
-            raise ValueError("CUDA ist nicht verfügbar")
-        self.current_device = device
+# Zielwert für "benchmark-startup": Sekunden bis das Hauptfenster sichtbar ist
+STARTUP_TARGET_SECONDS = 1.5
+
+# Überlappende Verarbeitung mehrerer Dateien
+PIPELINE_PREFETCH_JOBS = 1  # Vorbereitete Dateien, die auf die Dekodierstufe warten dürfen
+IO_QUEUE_SIZE = 64  # Ausstehende Schreibaufträge
+
+class PreparedJob:
+    """Ergebnis der Vorbereitungsstufe: Audio, Sprachbereiche, Checkpoint und Mel-Fenster
+
+    Bei einem Treffer im Ergebnis-Cache enthält cached die fertigen Ergebnisse.
+    source ist das extrahierte bzw. zwischengespeicherte PcmAudio hinter audio (bei
+    VAD nur dessen Sprachbereiche); close gibt es frei.
+    """
+    def __init__(self, audio=None, fingerprint=None, timeline=None, checkpoint=None, resume=None, mel=None,
+                 cached=None, source=None):
+        self.audio = audio
+        self.fingerprint = fingerprint
+        self.timeline = timeline
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.mel = mel
+        self.cached = cached
+        self.source = source
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+class IOStage:
+    """Führt Schreibaufträge nacheinander in einem eigenen Thread aus
+
+    Fehler werden gesammelt und beim nächsten flush() im aufrufenden Thread ausgelöst.
+    """
+    def __init__(self, maxsize=IO_QUEUE_SIZE):
+        self.tasks = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None:
+                    return
+                fn, args = task
+                fn(*args)
+            except Exception as e:
+                if self.error is None:
+                    self.error = e
+            finally:
+                self.tasks.task_done()
+
+    def submit(self, fn, *args):
+        self.tasks.put((fn, args))
+
+    def flush(self):
+        """Wartet, bis alle Aufträge geschrieben sind"""
+        self.tasks.join()
+        error, self.error = self.error, None
+        if error:
+            raise error
+
+    def close(self):
+        self.tasks.put(None)
+        self._thread.join()
 
 class TranscriptionWorker(QThread):
     progress_signal = pyqtSignal(int)
@@ -69,8 +133,12 @@ class TranscriptionWorker(QThread):
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     time_estimate_signal = pyqtSignal(str)
+    segments_signal = pyqtSignal(object)  # neue Segmente je Aufgabe
 
-    def __init__(self, video_path, base_filename, model_name, device_type, keep_wav=False, num_cores_to_use=None):
+    def __init__(self, video_path, base_filename, model_name, device_type, keep_wav=False, num_cores_to_use=None,
+                 parallel=False, vad=False, precision="fp32", condition_on_previous_text=False, batch_size=None,
+                 batch_memory_mb=None, word_timestamps=True, subtitle_formats=SUBTITLE_FORMATS, subtitle_layout=None,
+                 draft_model=None, language=None, cascade_model=None):
         super().__init__()
         self.video_path = video_path
         self.base_filename = base_filename
@@ -78,137 +146,1673 @@ class TranscriptionWorker(QThread):
         self.device_type = device_type
         self.num_cores_to_use = num_cores_to_use
         self.keep_wav = keep_wav
+        # Das Kaskadenmodell läuft nur im Hauptprozess, je Worker-Prozess wäre es eine weitere große Modellkopie
+        self.parallel = parallel and device_type == "cpu" and not cascade_model
+        self.vad = vad
+        # Reduzierte Genauigkeit gibt es nur auf der CPU
+        self.precision = precision if device_type == "cpu" else "fp32"
+        # Fenster werden gebatcht dekodiert, außer es wird auf den Vortext konditioniert
+        self.decoding = {
+            "condition_on_previous_text": condition_on_previous_text,
+            "batch_size": batch_size,
+            "batch_memory_mb": batch_memory_mb,
+            "word_timestamps": word_timestamps,
+            # Ändert das Ergebnis nicht (Greedy-Dekodierung des Modells), daher nicht in self.options
+            "draft_model": draft_model,
+        }
+        self.subtitle_formats = subtitle_formats
+        self.subtitle_layout = subtitle_layout or SubtitleLayout()
+        self.language = language  # None: Quellsprache erkennen
+        self.model_id = WHISPER_MODELS[model_name]["name"]
+        self.cascade_model = cascade_model  # Großes Modell für unsichere Fenster (siehe CascadeTranscriber)
+        self.options = decode_options_key(
+            self.vad, self.precision, condition_on_previous_text, word_timestamps, cascade_model
+        )
+        self.max_workers = None  # Obergrenze für Worker-Prozesse (siehe ResourceScheduler.plan)
         self.is_cancelled = False
         self.start_time = None
+        self.decode_start_time = None
+        self.resumed_seconds = 0.0
         self.model = None
+        self.audio_duration = None
+        self.results = None
+        self.metrics = None
+
+        # Dateipfade; die Ausgabedateien stehen erst mit der Quellsprache fest (siehe set_tasks)
+        self.audio_file = f"{base_filename}.wav"
+        self.checkpoint_file = f"{base_filename}{CHECKPOINT_SUFFIX}"
+        self.tasks = None
+        self.detection = None
+        self.text_files = {}
+        self.subtitle_files = {}
+        if language:
+            self.set_tasks(job_tasks(language), {"language": language, "probability": None, "source": "vorgegeben"})
+
+    def set_tasks(self, tasks, detection):
+        """Legt Aufgaben und Ausgabedateien fest, sobald die Quellsprache bekannt ist"""
+        self.tasks = tasks
+        self.detection = detection
+        self.text_files = {name: f"{self.base_filename}_{name}.txt" for name in tasks}
+        self.subtitle_files = {
+            name: {fmt: self.base_filename + subtitle_suffix(name, fmt) for fmt in self.subtitle_formats} for name in tasks
+        }
+
+    def cached_language(self, fingerprint):
+        """Übernimmt die zwischengespeicherte Spracherkennung; gibt False zurück, wenn sie noch fehlt"""
+        if self.tasks is None:
+            detection = RESULT_CACHE.lookup_language(fingerprint, self.model_id)
+            if detection is None:
+                return False
+            self.set_tasks(job_tasks(detection["language"]), dict(detection, source="cache"))
+        return True
+
+    def detect_tasks(self, audio, fingerprint, detect, timer):
+        """Erkennt die Quellsprache auf einigen Fenstern und legt damit die Aufgaben fest"""
+        self.status_signal.emit("Erkenne Sprache...")
+        with timer.stage("language"):
+            detection = detect(language_probe_chunks(audio))
+        RESULT_CACHE.remember_language(fingerprint, self.model_id, detection)
+        self.set_tasks(job_tasks(detection["language"]), dict(detection, source="erkannt"))
+        self.status_signal.emit(
+            f"Erkannte Sprache: {detection['language']} ({detection['probability'] * 100:.0f} %)"
+            + (", keine Übersetzung nötig" if len(self.tasks) == 1 else "")
+        )
+
+    def apply_resources(self, model_id=None, precision=None, cascade=True):
+        """Übernimmt ein kleineres Modell, eine reduzierte Genauigkeit oder verzichtet auf die Kaskade
+
+        Siehe ResourceScheduler.plan.
+        """
+        if model_id:
+            self.model_id = model_id
+            self.model_name = model_label(model_id)
+            draft_model = self.decoding["draft_model"]
+            if draft_model and (
+                not draft_compatible(model_id, draft_model)
+                or model_memory_mb(draft_model, "cuda") >= model_memory_mb(model_id, "cuda")
+            ):
+                self.decoding["draft_model"] = None
+        if precision:
+            self.precision = precision
+        if not cascade:
+            self.cascade_model = None
+        self.options = decode_options_key(
+            self.vad, self.precision, self.decoding["condition_on_previous_text"], self.decoding["word_timestamps"],
+            self.cascade_model
+        )
+        self.metrics.info.update(model=self.model_id, precision=self.precision)
+
+    def plan_resources(self):
+        """Stuft den Job herab, falls er nicht ins Speicherbudget passt; gibt zurück, ob sich etwas geändert hat"""
+        changes = RESOURCES.plan(self)
+        self.metrics.info["parallel"] = self.parallel
+        self.metrics.admission = {"waited_seconds": 0.0, "changes": changes}
+        if changes:
+            self.status_signal.emit(f"Für das Speicherbudget angepasst: {', '.join(changes)}")
+        return bool(changes)
+
+    @contextmanager
+    def admission(self, prepared, timer):
+        """Hält den Speicher des Jobs während der Dekodierung reserviert; wartet vorher bei Bedarf"""
+        if prepared.cached:
+            yield
+            return
+        started = time.perf_counter()
+
+        def on_wait(needed_mb, free_mb):
+            self.status_signal.emit(
+                f"Warte auf freien Arbeitsspeicher ({needed_mb:.0f} MB benötigt, {max(0.0, free_mb):.0f} MB frei)..."
+            )
+
+        with RESOURCES.admit(self, timer, on_wait):
+            if self.metrics.admission is not None:
+                self.metrics.admission["waited_seconds"] = round(time.perf_counter() - started, 3)
+            yield
 
     def cancel(self):
         self.is_cancelled = True
         self.status_signal.emit("Transkription wird abgebrochen...")
 
-    def estimate_remaining_time(self, progress):
-        if self.start_time and progress > 0:
-            elapsed_time = datetime.now() - self.start_time
-            estimated_total_time = elapsed_time / (progress / 100)
-            remaining_time = estimated_total_time - elapsed_time
-            return str(remaining_time).split('.')[0]
+    def estimate_remaining_time(self, decoded_seconds, total_seconds):
+        """Schätzt die Restzeit aus dem gemessenen Echtzeitfaktor der Dekodierung"""
+        # Aus einem Checkpoint übernommene Audiozeit zählt nicht zur gemessenen Geschwindigkeit
+        decoded_now = decoded_seconds - self.resumed_seconds
+        if self.decode_start_time and decoded_now > 0:
+            elapsed = (datetime.now() - self.decode_start_time).total_seconds()
+            speed = decoded_now / max(elapsed, 1e-6)  # Audio-Sekunden pro Sekunde
+            remaining_time = timedelta(seconds=(total_seconds - decoded_seconds) / speed)
+            return f"{str(remaining_time).split('.')[0]} ({speed:.2f}x Echtzeit)"
         return "Wird berechnet..."
 
+    def report_progress(self, decoded_seconds, total_seconds):
+        """Meldet Fortschritt (dekodierte Position / Audiodauer) und Restzeit"""
+        fraction = min(1.0, decoded_seconds / total_seconds) if total_seconds else 1.0
+        self.progress_signal.emit(10 + int(fraction * 89))
+        self.time_estimate_signal.emit(self.estimate_remaining_time(decoded_seconds, total_seconds))
+
     def run(self):
         try:
+            self.finished_signal.emit(self.process())
+        except InterruptedError as e:
+            self.error_signal.emit(str(e))
+        except Exception as e:
+            self.error_signal.emit(f"Fehler: {str(e)}")
+
+    def process(self, io_stage=None):
+        """Führt die komplette Pipeline aus und gibt die Abschlussmeldung zurück
+
+        Wird vom Thread (GUI) und direkt vom Batch-Modus (ohne GUI) aufgerufen. Die
+        TranscriptionPipeline ruft prepare und decode stattdessen in getrennten Stufen auf.
+        """
+        return self.decode(self.prepare(), io_stage)
+
+    @contextmanager
+    def job_phase(self, final):
+        """Misst eine Phase des Jobs; nach der letzten Phase oder einem Fehler gehen die Metriken an METRICS"""
+        if self.metrics is None:
+            self.metrics = JobMetrics(
+                self.video_path,
+                self.model_id,
+                self.device_type,
+                self.precision,
+                parallel=self.parallel,
+                vad=self.vad,
+            ).start()
+        try:
+            yield self.metrics.timer
+        except BaseException as e:
+            self.finish_metrics(type(e))
+            raise
+        if final:
+            self.finish_metrics(None)
+
+    def finish_metrics(self, exc_type):
+        self.metrics.audio_seconds = self.audio_duration
+        self.metrics.language = self.detection
+        self.metrics.stop(exc_type)
+        record = self.metrics.record()
+        METRICS.record(record)
+        RESOURCES.learn(record)
+
+    def runs_parallel(self, audio):
+        return self.parallel and len(audio) > 2 * WINDOW_SAMPLES
+
+    def cached_results(self, fingerprint):
+        """Ergebnisse aller Aufgaben aus dem RESULT_CACHE und die dort vermerkte Audiodauer
+
+        Gibt (None, None) zurück, wenn eine Aufgabe fehlt; die Dauer ist None bei
+        Einträgen, die noch ohne sie gespeichert wurden.
+        """
+        if not self.cached_language(fingerprint):
+            return None, None
+        results = {}
+        audio_seconds = None
+        for name, config in self.tasks.items():
+            entry = RESULT_CACHE.get_entry(RESULT_CACHE.key(fingerprint, self.model_id, config, self.options))
+            if entry is None:
+                return None, None
+            results[name] = entry["result"]
+            audio_seconds = entry["meta"].get("audio_seconds", audio_seconds)
+        return results, audio_seconds
+
+    def prepare(self, prefetch=False):
+        """Vorbereitungsstufe ohne Modell: Cache-Abfrage, Audioextraktion, VAD und Checkpoint
+
+        Mit prefetch werden zusätzlich die Mel-Spektrogramme der Fenster vorab berechnet,
+        damit die Dekodierstufe direkt mit dem Encoder beginnen kann.
+        """
+        with self.job_phase(final=False) as timer, ExitStack() as cleanup:
             self.start_time = datetime.now()
             self.status_signal.emit("Initialisiere...")
 
-            # Dateipfade erstellen
             output_dir = os.path.dirname(self.base_filename)
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
 
-            audio_file = f"{self.base_filename}.wav"
-            transcription_file_de = f"{self.base_filename}_de.txt"
-            transcription_file_en = f"{self.base_filename}_en.txt"
-            subtitle_file = f"{self.base_filename}.srt"
-
-            # Audio extrahieren
-            self.status_signal.emit("Extrahiere Audio...")
-            self.progress_signal.emit(10)
+            # Unveränderte Quelldatei mit bekanntem Ergebnis: ohne Extraktion und Modell ausgeben
+            fingerprint = RESULT_CACHE.lookup_source(self.video_path)
+            if fingerprint and not self.keep_wav:
+                results, audio_seconds = self.cached_results(fingerprint)
+                if results:
+                    # Ältere Einträge ohne Dauer: Ende des letzten Segments als Näherung
+                    self.audio_duration = audio_seconds if audio_seconds is not None else max(
+                        (s["end"] for r in results.values() for s in r["segments"]), default=0.0
+                    )
+                    self.metrics.result_cache_hit = True
+                    return PreparedJob(cached=results)
 
             if self.is_cancelled:
                 raise InterruptedError("Transkription wurde abgebrochen")
 
-            ffmpeg.input(self.video_path).output(
-                audio_file, acodec="pcm_s16le", ar=16000, ac=1
-            ).run(overwrite_output=True, quiet=True)
+            # Bereits extrahiertes Audio derselben Quelldatei (auch von anderen Modellen) wiederverwenden
+            audio = AUDIO_CACHE.open(fingerprint) if fingerprint else None
+            if audio is not None:
+                # Bis zur Übergabe an PreparedJob schließt cleanup das Audio (Fehler, Cache-Treffer)
+                cleanup.callback(audio.close)
+                self.status_signal.emit("Verwende zwischengespeichertes Audio")
+                self.metrics.audio_cache_hit = True
+                if self.keep_wav:
+                    with timer.stage("extraction"):
+                        write_pcm_wav(self.audio_file, audio)
+            else:
+                self.status_signal.emit("Extrahiere Audio...")
+                self.progress_signal.emit(5)
+                with timer.stage("extraction"):
+                    audio = extract_audio(
+                        self.video_path,
+                        wav_path=self.audio_file if self.keep_wav else None,
+                        is_cancelled=lambda: self.is_cancelled,
+                    )
+                cleanup.callback(audio.close)
+                with timer.stage("fingerprint"):
+                    fingerprint = audio_fingerprint(audio)
+                RESULT_CACHE.remember_source(self.video_path, fingerprint)
+                with timer.stage("audio_cache"):
+                    AUDIO_CACHE.put(fingerprint, audio)
+            self.audio_duration = len(audio) / SAMPLE_RATE
+            source = audio
+
+            results, _ = self.cached_results(fingerprint)
+            # Ein herabgestufter Job kann mit dem kleineren Modell bereits im Cache liegen
+            if not results and self.plan_resources():
+                results, _ = self.cached_results(fingerprint)
+            if results:
+                self.metrics.result_cache_hit = True
+                return PreparedJob(cached=results)
+
+            # Stille überspringen: nur Sprachbereiche an das Modell geben
+            timeline = None
+            if self.vad:
+                self.status_signal.emit("Erkenne Sprachbereiche...")
+                with timer.stage("vad"):
+                    timeline = SpeechTimeline(detect_speech(audio), len(audio))
+                    audio = timeline.compact(audio)
+                self.status_signal.emit(
+                    f"Stille übersprungen: {timeline.skipped_fraction() * 100:.0f} % "
+                    f"({(timeline.total_samples - timeline.speech_samples) / SAMPLE_RATE:.0f} s)"
+                )
 
-            # Gerätekonfiguration
-            if self.device_type == "cpu" and self.num_cores_to_use is not None:
-                torch.set_num_threads(self.num_cores_to_use)
-                self.status_signal.emit(f"Verwende {self.num_cores_to_use} CPU-Kerne")
+            # Checkpoint eines abgebrochenen Laufs desselben Jobs suchen
+            # Mit derselben Vorgabe ergibt die Spracherkennung dieselben Aufgaben
+            checkpoint = JobCheckpoint(self.checkpoint_file, {
+                "audio": fingerprint,
+                "model": self.model_id,
+                "language": self.language,
+                "vad": self.vad,
+                "precision": self.precision,
+                "condition_on_previous_text": self.decoding["condition_on_previous_text"],
+                "word_timestamps": self.decoding["word_timestamps"],
+                "decode_guard": DECODE_GUARD,
+                "window_seek": "timestamps",
+                "cascade_model": self.cascade_model,
+            })
+            resume = checkpoint.load()
+
+            mel = None
+            if prefetch and not self.runs_parallel(audio):
+                start = round(resume["position"] * SAMPLE_RATE) if resume else 0
+                n_mels = model_n_mels(self.model_id)
+                # Zwischengespeichert werden nur die Fenster ab Beginn der unveränderten Aufnahme
+                cacheable = start == 0 and timeline is None
+                mel = AUDIO_CACHE.load_mel(fingerprint, n_mels) if cacheable else None
+                if mel is None:
+                    with timer.stage("mel_prefetch"):
+                        mel = prefetch_mel(audio, n_mels, start, is_cancelled=lambda: self.is_cancelled)
+                    if cacheable:
+                        AUDIO_CACHE.put_mel(fingerprint, n_mels, mel)
+            cleanup.pop_all()  # Ab hier gibt PreparedJob.close das Audio frei
+            return PreparedJob(audio, fingerprint, timeline, checkpoint, resume, mel, source=source)
+
+    def decode(self, prepared, io_stage=None):
+        """Dekodierstufe: transkribiert das vorbereitete Audio und schreibt die Ausgaben
+
+        Mit io_stage (siehe IOStage) laufen die Schreibzugriffe in einem eigenen Thread.
+        """
+        submit = io_stage.submit if io_stage else (lambda fn, *args: fn(*args))
+        with closing(prepared), self.job_phase(final=True) as timer, self.admission(prepared, timer):
+            if prepared.cached:
+                return self.write_cached(prepared.cached)
+
+            audio = prepared.audio
+            timeline = prepared.timeline
+            checkpoint = prepared.checkpoint
+            resume = prepared.resume
+            self.resumed_seconds = resume["position"] if resume else 0.0
+            if resume:
+                self.status_signal.emit(
+                    f"Setze Transkription bei {str(timedelta(seconds=int(resume['position'])))} fort"
+                )
+            checkpoint.start(resume)
+            total_seconds = len(audio) / SAMPLE_RATE
+
+            def write(segments):
+                with timer.stage("write"):
+                    writer.write(segments)
+
+            def write_segments(segments):
+                if timeline:
+                    segments = {
+                        name: timeline.remap_segments([dict(segment) for segment in task_segments])
+                        for name, task_segments in segments.items()
+                    }
+                submit(write, segments)
+                self.segments_signal.emit(segments)
+
+            def on_window(position, segments):
+                checkpoint.save(position, segments, transcriber.prompt_context(), transcriber.task_positions())
+                write_segments(segments)
+                self.report_progress(position, total_seconds)
+
+            transcriber = None
+            writer = None
+            try:
+                if self.runs_parallel(audio):
+                    # Abschnitte parallel in Worker-Prozessen mit eigenen Modellkopien transkribieren
+                    transcriber = ParallelChunkTranscriber(
+                        self.model_id, self.num_cores_to_use or multiprocessing.cpu_count(), self.tasks,
+                        precision=self.precision, timer=timer, max_workers=self.max_workers, **self.decoding
+                    )
+                    if self.tasks is None:
+                        self.detect_tasks(audio, prepared.fingerprint, transcriber.detect_language, timer)
+                        transcriber.tasks = self.tasks
+                    self.status_signal.emit(
+                        f"Parallele Transkription: {transcriber.workers} Prozesse à {transcriber.threads} Threads"
+                    )
+                else:
+                    # Gerätekonfiguration
+                    if self.device_type == "cpu" and self.num_cores_to_use is not None:
+                        torch.set_num_threads(self.num_cores_to_use)
+                        self.status_signal.emit(f"Verwende {self.num_cores_to_use} CPU-Kerne")
+
+                    # Modell laden
+                    self.status_signal.emit(f"Lade Whisper-Modell ({self.model_name})...")
+
+                    if self.is_cancelled:
+                        raise InterruptedError("Transkription wurde abgebrochen")
+
+                    if MODEL_CACHE.is_loaded(self.model_id, self.device_type, self.precision):
+                        self.status_signal.emit(f"Verwende bereits geladenes Modell ({self.model_name})")
+                    with timer.stage("model_load"):
+                        self.model = MODEL_CACHE.get(self.model_id, self.device_type, self.precision)
+                    self.progress_signal.emit(10)
+
+                    if self.tasks is None:
+                        self.detect_tasks(
+                            audio, prepared.fingerprint,
+                            lambda chunks: detect_language(self.model, chunks, self.device_type, self.precision),
+                            timer,
+                        )
+
+                    # Transkription und Übersetzung in einem Durchlauf (Encoder nur einmal pro Fenster)
+                    self.status_signal.emit(self.task_description())
+
+                    if self.is_cancelled:
+                        raise InterruptedError("Transkription wurde abgebrochen")
+
+                    if self.cascade_model:
+                        self.status_signal.emit(f"Lade Kaskadenmodell ({self.cascade_model}) für unsichere Fenster...")
+                    transcriber = create_transcriber(
+                        self.model, self.tasks, self.device_type, self.precision, timer=timer,
+                        cascade_model=self.cascade_model, **self.decoding
+                    )
+                    engine = transcriber.engine if isinstance(transcriber, CascadeTranscriber) else transcriber
+                    if isinstance(engine, BatchedTranscriber):
+                        self.status_signal.emit(f"Dekodiere {engine.batch_size} Fenster gleichzeitig")
+                    elif isinstance(engine, SpeculativeTranscriber):
+                        self.status_signal.emit(f"Spekulative Dekodierung mit Entwurfsmodell {self.decoding['draft_model']}")
+
+                # Ausgabedateien werden segmentweise während der Dekodierung geschrieben
+                writer = self.create_writer()
+                if resume:
+                    write_segments(resume["segments"])
+
+                self.decode_start_time = datetime.now()
+                if isinstance(transcriber, ParallelChunkTranscriber):
+                    results = transcriber.transcribe(
+                        audio, is_cancelled=lambda: self.is_cancelled, on_window=on_window, resume=resume
+                    )
+                else:
+                    results = transcriber.transcribe(
+                        audio, is_cancelled=lambda: self.is_cancelled, on_window=on_window, resume=resume,
+                        mel=prepared.mel
+                    )
+            finally:
+                if writer:
+                    submit(writer.close)
+                checkpoint.close()
+                if transcriber:
+                    self.metrics.decoded_tokens = transcriber.decoded_tokens
+                    self.metrics.guard = dict(transcriber.guard_stats)
+                engine = transcriber
+                if isinstance(transcriber, CascadeTranscriber):
+                    self.metrics.cascade = transcriber.stats()
+                    engine = transcriber.engine
+                if isinstance(engine, SpeculativeTranscriber):
+                    self.metrics.speculative = {"draft_model": self.decoding["draft_model"], **engine.stats()}
+                # Ausgaben müssen vollständig sein, bevor der Checkpoint gelöscht wird
+                if io_stage:
+                    io_stage.flush()
+
+            # Job vollständig: Checkpoint wird nicht mehr benötigt
+            checkpoint.remove()
+
+            if timeline:
+                results = timeline.remap(results)
+            self.results = results
+
+            # Ergebnisse für spätere Läufe mit demselben Audio zwischenspeichern
+            for name, config in self.tasks.items():
+                meta = {
+                    "model": self.model_id, **config, "source": os.path.basename(self.video_path),
+                    "audio_seconds": self.audio_duration, "created": time.time(),
+                }
+                key = RESULT_CACHE.key(prepared.fingerprint, self.model_id, config, self.options)
+                RESULT_CACHE.put(key, meta, results[name])
+
+            # WAV-Datei wird nur noch auf Wunsch als Nebenprodukt geschrieben
+            if self.keep_wav:
+                self.status_signal.emit(f"WAV-Datei wurde behalten: {self.audio_file}")
+
+            # Referenz freigeben, das Modell bleibt im MODEL_CACHE erhalten
+            self.model = None
 
-            # Modell laden
-            self.status_signal.emit(f"Lade Whisper-Modell ({self.model_name})...")
-            self.progress_signal.emit(30)
+            self.progress_signal.emit(100)
+            message = f"Transkription abgeschlossen!\nDateien gespeichert als:\n{self.output_list()}"
+            if timeline:
+                message += f"\nStille übersprungen: {timeline.skipped_fraction() * 100:.0f} %"
+            if self.metrics.cascade:
+                message += (
+                    f"\nMit {self.cascade_model} neu dekodiert: "
+                    f"{self.metrics.cascade['escalated_fraction'] * 100:.0f} % des Audios"
+                )
+            return message
+
+    def task_description(self):
+        """Statusmeldung zu den Aufgaben des Jobs"""
+        source = self.detection["language"]
+        if len(self.tasks) == 1:
+            return f"Erstelle Transkription ({source})..."
+        return f"Erstelle Transkription ({source}) und englische Übersetzung..."
+
+    def create_writer(self):
+        return StreamingWriter(self.text_files, self.subtitle_files, self.subtitle_layout)
+
+    def output_list(self):
+        paths = list(self.text_files.values())
+        paths += [path for files in self.subtitle_files.values() for path in files.values()]
+        return "\n".join(f"- {path}" for path in paths)
+
+    def write_cached(self, results):
+        writer = self.create_writer()
+        segments = {name: result["segments"] for name, result in results.items()}
+        try:
+            writer.write(segments)
+        finally:
+            writer.close()
+        self.segments_signal.emit(segments)
+        self.results = results
+        self.progress_signal.emit(100)
+        return f"Transkription aus dem Cache übernommen!\nDateien gespeichert als:\n{self.output_list()}"
+
+class TranscriptionPipeline:
+    """Verarbeitet mehrere Dateien in drei überlappenden Stufen
+
+    1. Vorbereitung (eigener Thread): ffmpeg-Extraktion, VAD und Mel-Spektrogramme
+    2. Dekodierung (aufrufender Thread): Modell
+    3. Schreiben (IOStage): Ausgabedateien
+
+    Während Datei N dekodiert wird, bereitet Stufe 1 bereits Datei N+1 vor. Die
+    Warteschlange zwischen Stufe 1 und 2 ist begrenzt, damit höchstens
+    PIPELINE_PREFETCH_JOBS vorbereitete Dateien im Speicher warten. Wartende Jobs
+    werden nach Priorität (kleinere Zahl zuerst), dann in Eingangsreihenfolge vorbereitet.
+    on_state(worker, status, message) meldet jeden Statuswechsel eines Jobs.
+
+    Ohne persistent endet run(), sobald keine Jobs mehr warten; mit persistent
+    wartet die Pipeline auf neue Jobs, bis close() aufgerufen wird.
+    """
+    def __init__(self, on_state=None, prefetch=PIPELINE_PREFETCH_JOBS, persistent=False):
+        self.on_state = on_state or (lambda worker, status, message: None)
+        self.prepared = queue.Queue(maxsize=prefetch)
+        self.persistent = persistent
+        self._inputs = []  # Heap aus (Priorität, Eingangsnummer, Worker)
+        self._counter = itertools.count()
+        self._lock = threading.Condition()
+        self._closed = False
+        self._cancelled = False
+        self._workers = set()
+
+    def submit(self, worker, priority=0):
+        """Hängt einen Job an; gibt False zurück, wenn die Pipeline keine Jobs mehr annimmt"""
+        with self._lock:
+            if self._closed or self._cancelled:
+                return False
+            heapq.heappush(self._inputs, (priority, next(self._counter), worker))
+            self._workers.add(worker)
+            self._lock.notify()
+        self.on_state(worker, "wartend", "")
+        return True
+
+    def close(self):
+        """Nimmt keine neuen Jobs mehr an; run() endet nach den bereits angenommenen"""
+        with self._lock:
+            self.persistent = False
+            self._lock.notify_all()
 
-            if self.is_cancelled:
-                raise InterruptedError("Transkription wurde abgebrochen")
+    def cancel(self):
+        """Bricht den laufenden Job ab und verwirft alle wartenden"""
+        with self._lock:
+            self._cancelled = True
+            pending = [worker for _, _, worker in self._inputs]
+            self._inputs.clear()
+            workers = list(self._workers)
+            self._workers.difference_update(pending)
+            self._lock.notify_all()
+        for worker in workers:
+            worker.is_cancelled = True
+        for worker in pending:
+            self.on_state(worker, "abgebrochen", "Transkription wurde abgebrochen")
+
+    def cancel_worker(self, worker):
+        """Bricht einen einzelnen Job ab (wartend oder in Bearbeitung)"""
+        with self._lock:
+            pending = [entry for entry in self._inputs if entry[2] is worker]
+            for entry in pending:
+                self._inputs.remove(entry)
+            heapq.heapify(self._inputs)
+            if pending:
+                self._workers.discard(worker)
+        worker.is_cancelled = True
+        if pending:
+            self.on_state(worker, "abgebrochen", "Transkription wurde abgebrochen")
+
+    def _next_input(self):
+        with self._lock:
+            while self.persistent and not self._inputs and not self._cancelled:
+                self._lock.wait()
+            if self._inputs and not self._cancelled:
+                return heapq.heappop(self._inputs)[2]
+            self._closed = True
+            return None
+
+    def _produce(self):
+        while True:
+            worker = self._next_input()
+            if worker is None:
+                break
+            self.on_state(worker, "vorbereitung", "")
+            try:
+                prepared = worker.prepare(prefetch=True)
+            except Exception as e:
+                prepared = e
+            self.prepared.put((worker, prepared, time.perf_counter()))
+        self.prepared.put(None)
 
-            self.model = whisper.load_model(
-                WHISPER_MODELS[self.model_name]["name"],
-                device=self.device_type
+    def run(self):
+        """Arbeitet alle Jobs ab und gibt eine Liste von (worker, status, message) zurück"""
+        io_stage = IOStage()
+        producer = threading.Thread(target=self._produce, daemon=True)
+        producer.start()
+        finished = []
+        try:
+            while True:
+                item = self.prepared.get()
+                if item is None:
+                    break
+                worker, prepared, prepared_at = item
+                try:
+                    if isinstance(prepared, Exception):
+                        raise prepared
+                    worker.metrics.queued_seconds += time.perf_counter() - prepared_at
+                    if worker.is_cancelled:
+                        # Vorbereitet, aber nie gestartet: Ausgabedateien nicht anrühren
+                        prepared.close()
+                        worker.finish_metrics(InterruptedError)
+                        raise InterruptedError("Transkription wurde abgebrochen")
+                    self.on_state(worker, "läuft", "")
+                    status, message = "fertig", worker.decode(prepared, io_stage)
+                except InterruptedError as e:
+                    status, message = "abgebrochen", str(e)
+                except Exception as e:
+                    status, message = "fehler", f"Fehler: {str(e)}"
+                if not self.persistent:  # Im Dauerbetrieb wächst die Liste sonst unbegrenzt
+                    finished.append((worker, status, message))
+                with self._lock:
+                    self._workers.discard(worker)
+                self.on_state(worker, status, message)
+        finally:
+            if producer.is_alive():
+                # Abbruch durch eine Ausnahme: Vorbereitungsstufe beenden und vorbereitete Jobs verwerfen
+                self.cancel()
+                while producer.is_alive() or not self.prepared.empty():
+                    try:
+                        item = self.prepared.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item and isinstance(item[1], PreparedJob):
+                        item[1].close()
+                        item[0].finish_metrics(InterruptedError)
+            io_stage.close()
+        return finished
+
+def collect_inputs(patterns):
+    """Expandiert Dateien, Glob-Muster und Verzeichnisse zu einer Liste von Videodateien"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.extend(
+                    os.path.join(root, name) for name in sorted(names)
+                    if name.lower().endswith(VIDEO_EXTENSIONS)
+                )
+        elif os.path.isfile(pattern):
+            files.append(pattern)
+        else:
+            files.extend(
+                path for path in sorted(glob.glob(pattern, recursive=True))
+                if path.lower().endswith(VIDEO_EXTENSIONS)
             )
+    # Duplikate entfernen, Reihenfolge beibehalten
+    return list(dict.fromkeys(os.path.abspath(f) for f in files))
+
+def outputs_up_to_date(video_path, output_base, suffixes=OUTPUT_SUFFIXES):
+    """Prüft, ob alle Ausgabedateien existieren und neuer als die Eingabe sind"""
+    if os.path.exists(output_base + CHECKPOINT_SUFFIX):
+        return False  # Unvollständiger Lauf, wird fortgesetzt
+    input_mtime = os.path.getmtime(video_path)
+    for suffix in suffixes:
+        path = output_base + suffix
+        if not os.path.exists(path) or os.path.getmtime(path) < input_mtime:
+            return False
+    return True
+
+class BatchJob:
+    """Ein Eintrag in der Batch-Warteschlange"""
+    def __init__(self, video_path, output_base):
+        self.video_path = video_path
+        self.output_base = output_base
+        self.status = "wartend"
+        self.message = ""
+        self.audio_duration = None
+        self.elapsed = None
+        self.metrics = None
+
+    def throughput(self):
+        """Audio-Sekunden pro Sekunde Laufzeit"""
+        if self.audio_duration and self.elapsed:
+            return self.audio_duration / self.elapsed
+        return None
+
+class BatchQueue:
+    """Arbeitet Transkriptionsjobs ohne GUI nacheinander ab
+
+    Jeder Job läuft durch die Pipeline von TranscriptionWorker. Das Modell wird über
+    den MODEL_CACHE geladen und bleibt für alle weiteren Jobs der Warteschlange im Speicher.
+    """
+    def __init__(self, model_name, device_type, num_cores_to_use=None, keep_wav=False, force=False, parallel=False,
+                 vad=False, precision="fp32", condition_on_previous_text=False, batch_size=None, batch_memory_mb=None,
+                 word_timestamps=True, subtitle_formats=SUBTITLE_FORMATS, subtitle_layout=None, draft_model=None,
+                 language=None, cascade_model=None, log=print):
+        self.model_name = model_name
+        self.device_type = device_type
+        self.num_cores_to_use = num_cores_to_use
+        self.keep_wav = keep_wav
+        self.force = force
+        self.parallel = parallel
+        self.vad = vad
+        self.precision = precision
+        self.decoding = {
+            "condition_on_previous_text": condition_on_previous_text,
+            "batch_size": batch_size,
+            "batch_memory_mb": batch_memory_mb,
+            "word_timestamps": word_timestamps,
+            "draft_model": draft_model,
+        }
+        self.subtitle_formats = subtitle_formats
+        self.subtitle_layout = subtitle_layout
+        self.language = language
+        self.cascade_model = cascade_model
+        self.log = log
+        self.jobs = queue.Queue()
+
+    def submit(self, video_path, output_base):
+        job = BatchJob(video_path, output_base)
+        self.jobs.put(job)
+        return job
 
-            # Transkription auf Deutsch
-            self.status_signal.emit("Erstelle deutsche Transkription...")
-            self.progress_signal.emit(50)
+    def run(self):
+        """Arbeitet die Warteschlange ab und gibt die bearbeiteten Jobs zurück
+
+        Die Jobs laufen durch eine TranscriptionPipeline: Das Audio der nächsten Datei
+        wird extrahiert, während die aktuelle dekodiert wird.
+        """
+        jobs = []
+        while True:
+            try:
+                jobs.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+
+        total = len(jobs)
+        indices = {}
+        pipeline = TranscriptionPipeline(on_state=lambda worker, status, message: self.job_state(
+            worker, status, message, indices
+        ))
+        for index, job in enumerate(jobs, start=1):
+            name = os.path.basename(job.video_path)
+            # Ohne bekannte Quellsprache stehen die Ausgabedateien erst nach der Spracherkennung fest
+            tasks = expected_tasks(job.video_path, WHISPER_MODELS[self.model_name]["name"], self.language)
+            if not self.force and tasks and outputs_up_to_date(
+                job.video_path, job.output_base, output_suffixes(self.subtitle_formats, tasks)
+            ):
+                job.status = "übersprungen"
+                self.log(f"[{index}/{total}] {name}: übersprungen (Ausgaben aktuell)")
+                continue
+            worker = self.create_worker(job)
+            indices[worker] = (index, total, job)
+            pipeline.submit(worker)
+
+        pipeline.run()
+        return jobs
+
+    def create_worker(self, job):
+        name = os.path.basename(job.video_path)
+        worker = TranscriptionWorker(
+            job.video_path,
+            job.output_base,
+            self.model_name,
+            self.device_type,
+            keep_wav=self.keep_wav,
+            num_cores_to_use=self.num_cores_to_use if self.device_type == "cpu" else None,
+            parallel=self.parallel,
+            vad=self.vad,
+            precision=self.precision,
+            subtitle_formats=self.subtitle_formats,
+            subtitle_layout=self.subtitle_layout,
+            language=self.language,
+            cascade_model=self.cascade_model,
+            **self.decoding
+        )
+        # Vorbereitung und Dekodierung verschiedener Dateien überlappen, daher mit Dateinamen.
+        # Ohne Qt-Ereignisschleife müssen die Meldungen direkt im sendenden Thread zugestellt werden.
+        worker.status_signal.connect(
+            lambda message: self.log(f"  [{name}] {message}"), Qt.ConnectionType.DirectConnection
+        )
+        return worker
+
+    def job_state(self, worker, status, message, indices):
+        """Übernimmt einen Statuswechsel aus der Pipeline in den BatchJob"""
+        index, total, job = indices[worker]
+        job.status = status
+        if status == "läuft":
+            self.log(f"[{index}/{total}] {os.path.basename(job.video_path)}")
+        if status not in ("fertig", "fehler", "abgebrochen"):
+            return
 
-            if self.is_cancelled:
-                raise InterruptedError("Transkription wurde abgebrochen")
+        job.message = message
+        job.audio_duration = worker.audio_duration
+        job.metrics = worker.metrics.record() if worker.metrics else None
+        job.elapsed = job.metrics["wall_seconds"] if job.metrics else None
+
+        if status == "fertig":
+            tokens_per_second = job.metrics["tokens_per_second"]
+            # Ohne Audiodauer oder Laufzeit (z. B. leere Aufnahme) gibt es keinen Durchsatz
+            throughput = job.throughput()
+            throughput = f"{throughput:.2f}" if throughput is not None else "–"
+            self.log(
+                f"  {job.audio_duration or 0:.1f} s Audio in {job.elapsed or 0:.1f} s "
+                f"({throughput} s Audio/s"
+                + (f", {tokens_per_second:.1f} Tokens/s" if tokens_per_second else "")
+                + f", Spitze {job.metrics['peak_rss_mb']:.0f} MB)"
+            )
+            speculative = job.metrics["speculative"]
+            if speculative:
+                self.log(
+                    f"  Entwurfsmodell {speculative['draft_model']}: {speculative['acceptance_rate'] * 100:.0f} % "
+                    f"der Vorschläge angenommen, {speculative['tokens_per_pass']:.2f} Tokens je Durchlauf"
+                )
+            cascade = job.metrics["cascade"]
+            if cascade:
+                self.log(
+                    f"  Kaskadenmodell {cascade['cascade_model']}: {cascade['escalated_windows']} von "
+                    f"{cascade['windows']} Fenstern neu dekodiert "
+                    f"({cascade['escalated_fraction'] * 100:.0f} % des Audios)"
+                )
+            guard = job.metrics["guard"]
+            if guard and guard["repetition"] + guard["token_rate"]:
+                self.log(
+                    f"  {guard['repetition']} Wiederholungsschleifen und {guard['token_rate']} zu dichte Fenster "
+                    f"abgebrochen, {guard['unresolved']} davon gekürzt übernommen"
+                )
+            admission = job.metrics["admission"]
+            if admission and admission["waited_seconds"] >= 1:
+                self.log(f"  {admission['waited_seconds']:.0f} s auf freien Arbeitsspeicher gewartet")
+        else:
+            self.log(f"  {os.path.basename(job.video_path)}: {message}")
+
+def run_batch(args):
+    """Einstiegspunkt für den Batch-Modus ohne GUI"""
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("Keine Videodateien gefunden.")
+        return 1
+
+    if args.draft_model and not draft_compatible(args.model, args.draft_model):
+        print(f"Entwurfsmodell {args.draft_model} passt nicht zu {args.model} (anderer Tokenizer)")
+        return 1
+    if args.cascade_model and not cascade_useful(args.model, args.cascade_model):
+        print(f"Kaskadenmodell {args.cascade_model} muss größer als {args.model} sein")
+        return 1
+    try:
+        language = language_code(args.language) if args.language else None
+    except ValueError as e:
+        print(e)
+        return 1
+
+    device_type = args.device or DeviceManager().current_device
+    num_total_cores = multiprocessing.cpu_count()
+    num_cores_to_use = max(1, num_total_cores - args.cores_free)
+
+    if args.memory_budget_mb:
+        RESOURCES.budget_mb = args.memory_budget_mb  # Gilt auch für den Modell-Cache (ModelCache.budget_for)
+    if args.metrics_file:
+        METRICS.path = args.metrics_file
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+        print(f"Metriken: http://127.0.0.1:{args.metrics_port}/metrics")
+
+    batch = BatchQueue(
+        model_label(args.model),
+        device_type,
+        num_cores_to_use=num_cores_to_use,
+        keep_wav=args.keep_wav,
+        force=args.force,
+        parallel=args.parallel,
+        vad=args.vad,
+        precision=args.precision,
+        condition_on_previous_text=args.condition_on_previous_text,
+        batch_size=args.batch_size,
+        batch_memory_mb=args.batch_memory_mb,
+        word_timestamps=not args.no_word_timestamps,
+        subtitle_formats=tuple(args.formats),
+        subtitle_layout=subtitle_layout(args),
+        draft_model=args.draft_model,
+        language=language,
+        cascade_model=args.cascade_model,
+    )
+    for video_path in files:
+        output_dir = args.output_dir or os.path.dirname(video_path)
+        base_name = os.path.splitext(os.path.basename(video_path))[0]
+        batch.submit(video_path, os.path.join(os.path.abspath(output_dir), base_name))
+
+    started = time.perf_counter()
+    try:
+        jobs = batch.run()
+    finally:
+        METRICS.shutdown()
+    # Jobs überlappen in der Pipeline, daher zählt die gesamte Laufzeit statt der Summe je Job
+    elapsed_total = time.perf_counter() - started
+
+    done = [job for job in jobs if job.status == "fertig"]
+    failed = [job for job in jobs if job.status in ("fehler", "abgebrochen")]
+    audio_total = sum(job.audio_duration or 0 for job in done)
+    print(
+        f"Fertig: {len(done)}, übersprungen: {len(jobs) - len(done) - len(failed)}, "
+        f"fehlgeschlagen: {len(failed)}"
+    )
+    if done:
+        print(f"Gesamt: {audio_total:.1f} s Audio in {elapsed_total:.1f} s ({audio_total / elapsed_total:.2f} s Audio/s)")
+    return 1 if failed else 0
+
+def run_live(args):
+    """Einstiegspunkt für "live": eine laufende Aufnahme (wachsende Datei oder stdin) fortlaufend untertiteln"""
+    try:
+        language = language_code(args.language) if args.language else None
+    except ValueError as e:
+        print(e)
+        return 1
+    if args.lookahead < 0 or args.step <= 0:
+        print("--step muss größer als 0 und --lookahead mindestens 0 sein")
+        return 1
+
+    device_type = args.device or DeviceManager().current_device
+    torch.set_num_threads(max(1, multiprocessing.cpu_count() - args.cores_free))
+    model = MODEL_CACHE.get(args.model, device_type, args.precision)
+
+    input_options = {}
+    if args.input == "-":
+        input_options = {"f": args.input_format, "ar": args.input_rate, "ac": args.input_channels}
+    if args.output:
+        output_base = args.output
+    elif args.input == "-":
+        output_base = "live"
+    else:
+        output_base = os.path.splitext(args.input)[0]
+    source = "stdin" if args.input == "-" else args.input
+
+    # Strg+C beendet nur das Lesen; bereits gelesenes Audio wird noch übernommen
+    stopping = threading.Event()
+    stream = LiveAudioStream(args.input, input_options, idle_seconds=args.idle_timeout).start()
+
+    def stop(signum, frame):
+        stopping.set()
+        stream.stop()
+    previous_handler = signal.signal(signal.SIGINT, stop)
+    metrics = JobMetrics(source, args.model, device_type, args.precision).start()
+    live = None
+    writer = None
+    exc_type = None
+    try:
+        if language is None:
+            # Sprache auf dem ersten Fenster erkennen; die Aufgabe bleibt danach fest
+            stream.wait_for(WINDOW_SAMPLES)
+            with metrics.timer.stage("language"):
+                detection = detect_language(model, [stream[0:WINDOW_SAMPLES]], device_type, args.precision)
+            language = detection["language"]
+            metrics.language = dict(detection, source="erkannt")
+            print(f"Erkannte Sprache: {language} ({detection['probability'] * 100:.0f} %)")
+        else:
+            metrics.language = {"language": language, "probability": None, "source": "vorgegeben"}
+        tasks = job_tasks(language)
+        name = "en" if args.translate and language != "en" else language
+        tasks = {name: tasks[name]}
+
+        text_files = {name: f"{output_base}_{name}.txt"}
+        subtitle_files = {name: {fmt: output_base + subtitle_suffix(name, fmt) for fmt in args.formats}}
+        writer = StreamingWriter(text_files, subtitle_files, subtitle_layout(args))
+        live = LiveTranscriber(
+            model, tasks, device_type, args.precision, metrics.timer, not args.no_word_timestamps,
+            step=args.step, lookahead=args.lookahead,
+        )
+        print(f"Live: {source}, Modell {args.model}, Schritt {args.step:g} s, Vorlauf {args.lookahead:g} s (Strg+C beendet)")
+
+        def on_commit(segments, latencies):
+            writer.write({name: segments})
+            for segment, latency in zip(segments, latencies):
+                print(f"[{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}] "
+                      f"(+{latency:.1f} s){segment['text']}", flush=True)
+
+        live.run(stream, on_commit, is_cancelled=stopping.is_set)
+    except Exception as e:
+        exc_type = type(e)
+        print(f"Fehler: {e}")
+        return 1
+    finally:
+        stream.stop()
+        signal.signal(signal.SIGINT, previous_handler)
+        if writer:
+            writer.close()
+        metrics.audio_seconds = len(stream) / SAMPLE_RATE
+        if live:
+            metrics.decoded_tokens = live.engine.decoded_tokens
+            metrics.guard = live.engine.guard_stats
+            metrics.live = {
+                "step": args.step,
+                "lookahead": args.lookahead,
+                "segments": len(live.latencies),
+                "latency": latency_summary(live.latencies) if live.latencies else None,
+            }
+        metrics.stop(exc_type)
+        METRICS.record(metrics.record())
+
+    print(f"Fertig: {metrics.audio_seconds:.1f} s Audio, {len(live.latencies)} Segmente")
+    if live.latencies:
+        summary = metrics.live["latency"]
+        print(f"Latenz: Mittel {summary['mean']:.1f} s, 95 % {summary['p95']:.1f} s, max. {summary['max']:.1f} s")
+    return 0
+
+def subtitle_layout(args):
+    return SubtitleLayout(max_line_chars=args.max_line_chars, max_lines=args.max_lines, max_cps=args.max_cps)
+
+def run_export(args):
+    """Einstiegspunkt für "export": alle Ausgabeformate aus zwischengespeicherten Segmenten neu schreiben
+
+    Das Modell wird nicht geladen. Ist die Quelldatei dem Cache unbekannt (z. B. verschoben),
+    wird nur das Audio extrahiert, um den Audio-Hash zu bestimmen.
+    """
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("Keine Videodateien gefunden.")
+        return 1
+    try:
+        language = language_code(args.language) if args.language else None
+    except ValueError as e:
+        print(e)
+        return 1
+    options = decode_options_key(
+        args.vad, args.precision, args.condition_on_previous_text, not args.no_word_timestamps, args.cascade_model
+    )
+    layout = subtitle_layout(args)
+    failed = 0
+    for video_path in files:
+        name = os.path.basename(video_path)
+        fingerprint = RESULT_CACHE.lookup_source(video_path)
+        if fingerprint is None:
+            with extract_audio(video_path) as audio:
+                fingerprint = audio_fingerprint(audio)
+            RESULT_CACHE.remember_source(video_path, fingerprint)
+        detection = RESULT_CACHE.lookup_language(fingerprint, args.model)
+        source_language = language or (detection["language"] if detection else None)
+        if source_language is None:
+            print(f"{name}: Quellsprache unbekannt, bitte zuerst transkribieren oder --language angeben")
+            failed += 1
+            continue
+        tasks = job_tasks(source_language)
+        results = {
+            task: RESULT_CACHE.get(RESULT_CACHE.key(fingerprint, args.model, config, options))
+            for task, config in tasks.items()
+        }
+        missing = [task for task, result in results.items() if result is None]
+        if missing:
+            print(f"{name}: nicht im Cache ({', '.join(missing)}), bitte zuerst mit denselben Optionen transkribieren")
+            failed += 1
+            continue
+
+        output_dir = args.output_dir or os.path.dirname(video_path)
+        output_base = os.path.join(os.path.abspath(output_dir), os.path.splitext(name)[0])
+        os.makedirs(os.path.dirname(output_base), exist_ok=True)
+        writer = StreamingWriter(
+            {task: f"{output_base}_{task}.txt" for task in tasks},
+            {task: {fmt: output_base + subtitle_suffix(task, fmt) for fmt in args.formats} for task in tasks},
+            layout,
+        )
+        try:
+            writer.write({task: result["segments"] for task, result in results.items()})
+        finally:
+            writer.close()
+        print(f"{name}: {len(tasks) * (len(args.formats) + 1)} Dateien geschrieben ({source_language})")
+    return 1 if failed else 0
+
+def run_cache_command(args):
+    """Einstiegspunkt für "cache": Ergebnis- oder Audio-Cache anzeigen und aufräumen"""
+    if args.audio:
+        return run_audio_cache_command(args)
+    cache = RESULT_CACHE
+    if args.action == "list":
+        entries = cache.entries()
+        for path, size, last_used in entries:
+            meta = cache.read_meta(path)
+            print(
+                f"{os.path.basename(path)[:12]}  {size / 1024:8.1f} KB  "
+                f"{datetime.fromtimestamp(last_used).strftime('%Y-%m-%d %H:%M')}  "
+                f"{meta['model']:<9} {meta['task']:<10} {meta['language']}  {meta['source']}"
+            )
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} Einträge, {total / 1024 / 1024:.1f} MB (Limit: {cache.max_mb} MB) in {cache.directory}")
+    elif args.action == "prune":
+        removed = cache.prune(args.max_mb)
+        print(f"{removed} Einträge gelöscht")
+    elif args.action == "clear":
+        removed = cache.prune(0)
+        print(f"{removed} Einträge gelöscht")
+    return 0
+
+def run_audio_cache_command(args):
+    cache = AUDIO_CACHE
+    if args.action == "list":
+        # Quelldateien je Audio-Hash aus dem Quellindex des Ergebnis-Caches
+        sources = defaultdict(list)
+        for key, fingerprint in RESULT_CACHE.sources().items():
+            sources[fingerprint].append(os.path.basename(key.split("|")[0]))
+        entries = cache.entries()
+        for fingerprint, size, last_used in entries:
+            print(
+                f"{fingerprint[:12]}  {size / 1024 / 1024:8.1f} MB  "
+                f"{datetime.fromtimestamp(last_used).strftime('%Y-%m-%d %H:%M')}  "
+                f"{', '.join(sorted(set(sources[fingerprint]))) or '-'}"
+            )
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} Audios, {total / 1024 / 1024:.1f} MB (Limit: {cache.max_mb} MB) in {cache.directory}")
+    elif args.action == "prune":
+        removed = cache.prune(args.max_mb)
+        print(f"{removed} Audios gelöscht")
+    elif args.action == "clear":
+        removed = cache.prune(0)
+        print(f"{removed} Audios gelöscht")
+    return 0
+
+def word_error_rate(reference, hypothesis):
+    """Wortfehlerrate (Levenshtein-Distanz auf Wortebene / Anzahl Referenzwörter)"""
+    reference, hypothesis = reference.lower().split(), hypothesis.lower().split()
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(reference)
+
+def run_precision_comparison(args):
+    """Einstiegspunkt für "compare-precision": CPU-Modi gegen FP32 auf einem Referenzclip vergleichen"""
+    torch.set_num_threads(max(1, multiprocessing.cpu_count() - args.cores_free))
+    audio = extract_audio(args.clip)
+    if args.max_seconds:
+        audio = audio[:int(args.max_seconds * SAMPLE_RATE)]
+    duration = len(audio) / SAMPLE_RATE
+    tasks = {"de": DEFAULT_TASKS["de"]}
+
+    print(f"Referenzclip: {os.path.basename(args.clip)} ({duration:.1f} s), Modell: {args.model}")
+    print(f"{'Modus':<6} {'Laden':>8} {'Dekodieren':>11} {'Echtzeit':>9} {'Speicher':>10} {'WER vs. FP32':>13}")
+    reference = None
+    for precision in ["fp32"] + [mode for mode in args.modes if mode != "fp32"]:
+        if precision == "bf16" and not cpu_supports_bf16():
+            print(f"{precision:<6} übersprungen (keine BF16-Unterstützung der CPU)")
+            continue
+        # Spitze des RSS über dem Stand vor dem Laden, gemessen über Laden und Dekodieren
+        baseline = process_rss_mb()
+        with PeakMemorySampler() as sampler:
+            started = time.perf_counter()
+            model = load_model(args.model, "cpu", precision)
+            load_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            text = MultiTaskTranscriber(model, tasks, "cpu", precision).transcribe(audio)["de"]["text"]
+            elapsed = time.perf_counter() - started
+        if reference is None:
+            reference = text
+
+        print(
+            f"{precision:<6} {load_time:7.1f}s {elapsed:10.1f}s {duration / elapsed:8.2f}x "
+            f"{sampler.peak_mb - baseline:7.0f} MB {word_error_rate(reference, text) * 100:12.1f} %"
+        )
+        del model
+        gc.collect()
+    return 0
+
+def run_speculative_comparison(args):
+    """Einstiegspunkt für "compare-speculative": Beschleunigung durch Entwurfsmodelle auf einem Clip messen
+
+    Alle Läufe konditionieren auf den Vortext und dekodieren Fenster für Fenster, damit
+    sich die Läufe nur im Entwurfsmodell unterscheiden.
+    """
+    torch.set_num_threads(max(1, multiprocessing.cpu_count() - args.cores_free))
+    audio = extract_audio(args.clip)
+    if args.max_seconds:
+        audio = audio[:int(args.max_seconds * SAMPLE_RATE)]
+    duration = len(audio) / SAMPLE_RATE
+    tasks = {"de": DEFAULT_TASKS["de"]}
+    model = load_model(args.model, "cpu", args.precision)
+
+    print(f"Referenzclip: {os.path.basename(args.clip)} ({duration:.1f} s), Modell: {args.model} ({args.precision})")
+    print(
+        f"{'Entwurf':<9} {'Dekodieren':>11} {'Echtzeit':>9} {'Speedup':>8} {'Annahme':>8} "
+        f"{'Tokens/Durchl.':>15} {'WER':>7}  Identisch"
+    )
+    report = {"model": args.model, "precision": args.precision, "audio_seconds": duration, "runs": []}
+    reference = None
+    for draft_id in [None] + args.drafts:
+        if draft_id and not draft_compatible(args.model, draft_id):
+            print(f"{draft_id:<9} übersprungen (anderer Tokenizer)")
+            continue
+        if draft_id:
+            transcriber = SpeculativeTranscriber(
+                model, load_model(draft_id, "cpu", args.precision), tasks, "cpu", args.precision,
+                word_timestamps=False, condition_on_previous_text=True, draft_tokens=args.draft_tokens
+            )
+        else:
+            transcriber = MultiTaskTranscriber(model, tasks, "cpu", args.precision, word_timestamps=False)
+        started = time.perf_counter()
+        result = transcriber.transcribe(audio)["de"]
+        elapsed = time.perf_counter() - started
+        tokens = [token for segment in result["segments"] for token in segment["tokens"]]
+        if reference is None:
+            reference = {"elapsed": elapsed, "text": result["text"], "tokens": tokens}
+        stats = transcriber.stats() if draft_id else None
+        run = {
+            "draft_model": draft_id,
+            "seconds": elapsed,
+            "realtime_factor": duration / elapsed,
+            "speedup": reference["elapsed"] / elapsed,
+            "wer": word_error_rate(reference["text"], result["text"]),
+            "identical": tokens == reference["tokens"],
+            "speculative": stats,
+        }
+        report["runs"].append(run)
+        print(
+            f"{draft_id or '-':<9} {elapsed:10.1f}s {run['realtime_factor']:8.2f}x {run['speedup']:7.2f}x "
+            + (f"{stats['acceptance_rate'] * 100:7.0f}% {stats['tokens_per_pass']:15.2f} " if stats else f"{'':>8} {'':>15} ")
+            + f"{run['wer'] * 100:6.1f}%  {'ja' if run['identical'] else 'nein'}"
+        )
+        del transcriber
+        gc.collect()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Bericht gespeichert: {args.output}")
+    return 0
+
+def synthetic_audio(seconds, seed=0):
+    """Erzeugt reproduzierbares, sprachähnliches Testaudio (Silben aus Obertönen mit Pausen)"""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = 0
+    while position < len(audio):
+        length = int(rng.uniform(0.1, 0.3) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        pitch = rng.uniform(100, 220)
+        syllable = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = np.sin(np.pi * np.arange(length) / length)
+        end = min(len(audio), position + length)
+        audio[position:end] = (0.2 * syllable * envelope)[:end - position]
+        position = end + int(rng.choice([0.05, 0.1, 0.6]) * SAMPLE_RATE)
+    return audio
+
+def write_wav(path, audio):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+
+def benchmark_run(model, audio, precision, timer):
+    """Führt einen gemessenen Durchlauf (Transkription, Übersetzung, Untertitel in allen Formaten) aus"""
+    results = MultiTaskTranscriber(model, DEFAULT_TASKS, "cpu", precision, timer=timer).transcribe(audio)
+    with timer.stage("subtitles"), tempfile.TemporaryDirectory() as directory:
+        writer = StreamingWriter({}, {
+            name: {fmt: os.path.join(directory, f"{name}.{fmt}") for fmt in SUBTITLE_FORMATS} for name in results
+        })
+        writer.write({name: result["segments"] for name, result in results.items()})
+        writer.close()
+    return results
+
+def run_benchmark(args):
+    """Einstiegspunkt für "benchmark": Echtzeitfaktor je Modell, Genauigkeit, Threads und Stufe messen"""
+    with tempfile.TemporaryDirectory() as directory:
+        if args.audio:
+            source = args.audio
+        else:
+            source = os.path.join(directory, "synthetic.wav")
+            write_wav(source, synthetic_audio(args.seconds))
+
+        extraction = StageTimer()
+        with extraction.stage("extraction"):
+            audio = extract_audio(source)
+    if args.seconds and args.audio:
+        audio = audio[:int(args.seconds * SAMPLE_RATE)]
+    duration = len(audio) / SAMPLE_RATE
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": multiprocessing.cpu_count(),
+            "memory_mb": round(psutil.virtual_memory().total / (1024 * 1024)),
+            "torch": torch.__version__,
+            "bf16": cpu_supports_bf16(),
+        },
+        "audio": {"source": args.audio or "synthetic", "seconds": duration},
+        "extraction_seconds": extraction.totals["extraction"],
+        "runs": [],
+    }
+
+    print(f"Audio: {report['audio']['source']} ({duration:.1f} s), Extraktion: {report['extraction_seconds']:.2f} s")
+    print(f"{'Modell':<9} {'Modus':<5} {'Thr':>3} {'Laden':>7} {'Mel':>7} {'Encoder':>8} {'Decoder':>8} "
+          f"{'Untert':>6} {'Echtzeit':>9} {'RSS':>8}")
+    for model_id in args.models:
+        for precision in args.precisions:
+            if precision == "bf16" and not cpu_supports_bf16():
+                continue
+            gc.collect()
+            with PeakMemorySampler() as load_memory:
+                started = time.perf_counter()
+                model = load_model(model_id, "cpu", precision)
+                load_seconds = time.perf_counter() - started
+
+            for threads in args.threads:
+                torch.set_num_threads(threads)
+                best = None
+                for _ in range(args.repeat):
+                    timer = StageTimer()
+                    with PeakMemorySampler() as memory:
+                        started = time.perf_counter()
+                        benchmark_run(model, audio, precision, timer)
+                        total = time.perf_counter() - started
+                    if best is None or total < best["total_seconds"]:
+                        best = {
+                            "model": model_id,
+                            "precision": precision,
+                            "threads": threads,
+                            "load_seconds": load_seconds,
+                            "stages": dict(timer.totals),
+                            "windows": timer.counts.get("encoder", 0),
+                            "total_seconds": total,
+                            "realtime_factor": duration / total,
+                            "peak_rss_mb": max(memory.peak_mb, load_memory.peak_mb),
+                        }
+                report["runs"].append(best)
+                stages = best["stages"]
+                print(
+                    f"{model_id:<9} {precision:<5} {threads:>3} {load_seconds:6.1f}s {stages.get('mel', 0):6.2f}s "
+                    f"{stages.get('encoder', 0):7.2f}s {stages.get('decoder', 0):7.2f}s {stages.get('subtitles', 0):5.3f}s "
+                    f"{best['realtime_factor']:8.2f}x {best['peak_rss_mb']:6.0f}MB"
+                )
+            del model
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Bericht gespeichert: {args.output}")
+    return 0
+
+def run_startup_benchmark(args):
+    """Einstiegspunkt für "benchmark-startup": Zeit bis zum sichtbaren Fenster und bis zur Geräteerkennung"""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # Ein laufender Dienst würde die Geräteerkennung überspringen
+    env["WHISPER_TRANSCRIBE_PORT"] = "1"
+    command = [sys.executable, os.path.abspath(__file__), "--startup-probe"]
+
+    results = {"window": [], "devices": []}
+    for run in range(args.repeat):
+        started = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+        times = {}
+        for line in process.stdout:
+            if line.strip() in results:
+                times[line.strip()] = time.perf_counter() - started
+        process.wait()
+        if process.returncode != 0 or "window" not in times:
+            print(f"Start {run + 1} fehlgeschlagen (Exit-Code {process.returncode})")
+            return 1
+        for key, value in times.items():
+            results[key].append(value)
+        print(f"Start {run + 1}: Fenster {times['window']:.2f} s, Geräte {times.get('devices', float('nan')):.2f} s")
+
+    window = statistics.median(results["window"])
+    devices = statistics.median(results["devices"]) if results["devices"] else float("nan")
+    print(f"Median: Fenster {window:.2f} s, Geräte {devices:.2f} s (Ziel Fenster: {args.target:.2f} s)")
+    if window > args.target:
+        print("Zielwert überschritten")
+        return 1
+    return 0
+
+def create_service_worker(job, options):
+    """TranscriptionWorker für einen Job des Dienstes, seine Signale landen im Ereignisprotokoll des Jobs"""
+    worker = TranscriptionWorker(**options)
+    # Signale kommen aus den Threads der Pipeline und werden direkt ins Ereignisprotokoll übernommen
+    direct = Qt.ConnectionType.DirectConnection
+    worker.status_signal.connect(lambda message: job.add_event({"type": "status", "message": message}), direct)
+    worker.time_estimate_signal.connect(
+        lambda estimate: job.add_event({"type": "time_estimate", "estimate": estimate}), direct
+    )
+    worker.progress_signal.connect(job.set_progress, direct)
+    worker.segments_signal.connect(lambda segments: job.add_event({"type": "segments", "segments": {
+        name: [
+            {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+            for segment in task_segments
+        ]
+        for name, task_segments in segments.items()
+    }}), direct)
+    return worker
+
+def run_service(args):
+    """Einstiegspunkt für "serve": Dienst im Vordergrund betreiben"""
+    if args.memory_budget_mb:
+        RESOURCES.budget_mb = args.memory_budget_mb  # Gilt auch für den Modell-Cache (ModelCache.budget_for)
+    service = TranscriptionService(
+        lambda on_state: TranscriptionPipeline(on_state=on_state, persistent=True), create_service_worker
+    )
+    for model_id in args.preload or []:
+        print(f"Lade Modell vor: {model_id}")
+        MODEL_CACHE.warm_up(model_id, service.device_manager.current_device)
+    token = args.token or create_service_token()
+    service.start()
+
+    handler = type("Handler", (ServiceRequestHandler,), {"service": service, "token": token})
+    server = ThreadingHTTPServer((SERVICE_HOST, args.port), handler)
+    server.daemon_threads = True
+    print(f"Dienst läuft auf http://{SERVICE_HOST}:{args.port} ({service.device_manager.get_device_info()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Beende Dienst...")
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+def service_request(args, video_path, num_cores_to_use):
+    """Baut die Job-Anfrage für den Dienst aus den Argumenten von "submit" """
+    output_dir = args.output_dir or os.path.dirname(video_path)
+    os.makedirs(output_dir, exist_ok=True)  # Der Dienst legt keine Ordner an
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    return {
+        "video": video_path,
+        "output_base": os.path.join(os.path.abspath(output_dir), base_name),
+        "model": args.model,
+        "device": args.device,
+        "precision": args.precision,
+        "vad": args.vad,
+        "parallel": args.parallel,
+        "keep_wav": args.keep_wav,
+        "num_cores": num_cores_to_use,
+        "condition_on_previous_text": args.condition_on_previous_text,
+        "batch_size": args.batch_size,
+        "draft_model": args.draft_model,
+        "cascade_model": args.cascade_model,
+        "language": args.language,
+        "word_timestamps": not args.no_word_timestamps,
+        "formats": args.formats,
+        "subtitles": {"max_line_chars": args.max_line_chars, "max_lines": args.max_lines, "max_cps": args.max_cps},
+        "priority": args.priority,
+    }
+
+def run_service_command(args):
+    """Einstiegspunkt für "submit", "jobs" und "cancel": Client des lokalen Dienstes"""
+    client = ServiceClient(args.port, token=args.token)
+    if not client.available():
+        print(f"Kein Dienst auf {client.base_url} erreichbar (starten mit: python main.py serve)")
+        return 1
+
+    if args.command == "jobs":
+        for job in client.jobs():
+            print(f"{job['id']}  {job['status']:<12} {job['progress']:3d} %  P{job['priority']}  "
+                  f"{job['model']:<9} {os.path.basename(job['video'])}")
+        return 0
+    if args.command == "cancel":
+        print(f"{args.job_id}: {client.cancel(args.job_id)['status']}")
+        return 0
+
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("Keine Videodateien gefunden.")
+        return 1
+    num_cores_to_use = max(1, multiprocessing.cpu_count() - args.cores_free)
+    job_ids = []
+    for video_path in files:
+        job_id = client.submit(service_request(args, video_path, num_cores_to_use))
+        job_ids.append(job_id)
+        print(f"{job_id}  {os.path.basename(video_path)}")
+    if not args.follow:
+        return 0
+
+    failed = 0
+    for job_id in job_ids:
+        for event in client.events(job_id):
+            if event["type"] == "status":
+                print(f"  [{job_id}] {event['message']}")
+            elif event["type"] == "state" and event["status"] in FINAL_STATES:
+                print(f"  [{job_id}] {event['status']}: {event['message']}")
+                failed += event["status"] != "fertig"
+    return 1 if failed else 0
+
+class ModelWarmupWorker(QThread):
+    """Lädt ein Modell im Hintergrund in den MODEL_CACHE"""
+    finished_signal = pyqtSignal(str)
+    error_signal = pyqtSignal(str)
 
-            result_de = self.model.transcribe(audio_file, language="de")
+    def __init__(self, model_name, device_type):
+        super().__init__()
+        self.model_name = model_name
+        self.device_type = device_type
 
-            # Übersetzung ins Englische
-            self.status_signal.emit("Erstelle englische Übersetzung...")
-            self.progress_signal.emit(70)
+    def run(self):
+        try:
+            MODEL_CACHE.warm_up(WHISPER_MODELS[self.model_name]["name"], self.device_type)
+            self.finished_signal.emit(f"Modell vorgeladen: {self.model_name}")
+        except Exception as e:
+            self.error_signal.emit(f"Fehler beim Vorladen: {str(e)}")
 
-            if self.is_cancelled:
-                raise InterruptedError("Transkription wurde abgebrochen")
+class DeviceProbeWorker(QThread):
+    """Importiert torch im Hintergrund und ermittelt die CUDA-Angaben
 
-            # result_en = self.model.transcribe(audio_file, task="translate", language="de")
-            result_en = self.model.transcribe(audio_file, task="translate", language="en")
+    Der Import von torch (und die CUDA-Initialisierung) dauert mehrere Sekunden. Die GUI
+    ist währenddessen schon bedienbar und übernimmt die Angaben über finished_signal.
+    """
+    finished_signal = pyqtSignal(dict)
 
-            # Dateien speichern
-            self.status_signal.emit("Speichere Dateien...")
+    def run(self):
+        try:
+            cuda_info = check_cuda_availability()
+        except Exception:
+            cuda_info = {"available": False}
+        self.finished_signal.emit(cuda_info)
 
-            if self.is_cancelled:
-                raise InterruptedError("Transkription wurde abgebrochen")
+class PipelineWorker(QThread):
+    """Führt die Jobs der GUI-Jobliste über eine TranscriptionPipeline aus"""
+    job_state_signal = pyqtSignal(object, str, str)
 
-            # Transkriptionen speichern
-            with open(transcription_file_de, "w", encoding="utf-8") as f:
-                f.write(result_de["text"])
-            with open(transcription_file_en, "w", encoding="utf-8") as f:
-                f.write(result_en["text"])
+    def __init__(self):
+        super().__init__()
+        self.pipeline = TranscriptionPipeline(on_state=self.job_state_signal.emit)
 
-            # SRT-Datei generieren
-            self.generate_srt(result_en, subtitle_file)
+    def submit(self, worker):
+        return self.pipeline.submit(worker)
 
-            # Temporäre WAV-Datei löschen
-            # Temporäre WAV-Datei behandeln
-            if not self.keep_wav and os.path.exists(audio_file):
-                os.remove(audio_file)
-            elif self.keep_wav:
-                self.status_signal.emit(f"WAV-Datei wurde behalten: {audio_file}")
+    def cancel(self):
+        self.pipeline.cancel()
 
-            self.progress_signal.emit(100)
-            self.finished_signal.emit(
-                f"Transkription abgeschlossen!\nDateien gespeichert als:\n"
-                f"- {transcription_file_de}\n"
-                f"- {transcription_file_en}\n"
-                f"- {subtitle_file}"
-            )
+    def run(self):
+        self.pipeline.run()
 
-        except InterruptedError as e:
-            self.error_signal.emit(str(e))
-        except Exception as e:
-            self.error_signal.emit(f"Fehler: {str(e)}")
+class ServiceJobWorker(QThread):
+    """Übergibt einen Job an den lokalen Dienst und verfolgt seine Ereignisse
 
-    def generate_srt(self, transcription, output_file):
-        with open(output_file, "w", encoding="utf-8") as f:
-            for i, segment in enumerate(transcription["segments"], start=1):
-                if self.is_cancelled:
-                    break
-                start_time = timedelta(seconds=segment["start"])
-                end_time = timedelta(seconds=segment["end"])
-                start_time_str = f"{start_time.seconds//3600:02d}:{(start_time.seconds//60)%60:02d}:{start_time.seconds%60:02d},{start_time.microseconds // 1000:03d}"
-                end_time_str = f"{end_time.seconds//3600:02d}:{(end_time.seconds//60)%60:02d}:{end_time.seconds%60:02d},{end_time.microseconds // 1000:03d}"
-                text = segment["text"].strip()
-                f.write(f"{i}\n{start_time_str} --> {end_time_str}\n{text}\n\n")
+    Stellt dieselben Signale wie TranscriptionWorker bereit, damit die Jobliste der
+    GUI lokale Jobs und Dienst-Jobs gleich behandeln kann.
+    """
+    progress_signal = pyqtSignal(int)
+    status_signal = pyqtSignal(str)
+    time_estimate_signal = pyqtSignal(str)
+    segments_signal = pyqtSignal(object)
+    job_state_signal = pyqtSignal(object, str, str)
+
+    def __init__(self, client, video_path, base_filename, settings):
+        super().__init__()
+        self.client = client
+        self.video_path = video_path
+        self.base_filename = base_filename
+        self.request = {
+            "video": video_path,
+            "output_base": base_filename,
+            "model": WHISPER_MODELS[settings["model_name"]]["name"],
+            "device": settings["device_type"],
+            "num_cores": settings["num_cores_to_use"],
+            "keep_wav": settings["keep_wav"],
+            "parallel": settings["parallel"],
+            "vad": settings["vad"],
+            "precision": settings["precision"],
+            "condition_on_previous_text": settings["condition_on_previous_text"],
+            "draft_model": settings["draft_model"],
+            "cascade_model": settings["cascade_model"],
+            "language": settings["language"],
+        }
+        self.job_id = None
+        self.is_cancelled = False
+        self.detached = False
+
+    def cancel(self):
+        self.is_cancelled = True
+        if self.job_id:
+            try:
+                self.client.cancel(self.job_id)
+            except (OSError, RuntimeError):
+                pass
+
+    def detach(self):
+        """Beendet nur das Verfolgen; der Job läuft im Dienst weiter"""
+        self.detached = True
+
+    def run(self):
+        try:
+            self.job_id = self.client.submit(self.request)
+            if self.is_cancelled:
+                self.client.cancel(self.job_id)
+            for event in self.client.events(self.job_id):
+                if self.detached:
+                    return
+                if event["type"] == "state":
+                    self.job_state_signal.emit(self, event["status"], event["message"])
+                elif event["type"] == "status":
+                    self.status_signal.emit(event["message"])
+                elif event["type"] == "progress":
+                    self.progress_signal.emit(event["value"])
+                elif event["type"] == "time_estimate":
+                    self.time_estimate_signal.emit(event["estimate"])
+                elif event["type"] == "segments":
+                    self.segments_signal.emit(event["segments"])
+        except (OSError, RuntimeError, ValueError) as e:
+            self.job_state_signal.emit(self, "fehler", f"Fehler: Dienst nicht erreichbar ({str(e)})")
 
 class TranscriptionApp(QWidget):
-    def __init__(self):
+    def __init__(self, warmup=False):
         super().__init__()
-        self.device_manager = DeviceManager()
+        # Läuft ein lokaler Dienst, ist die GUI nur dessen Client und importiert kein torch
+        self.service_client = ServiceClient()
+        try:
+            service_info = self.service_client.info() if self.service_client.available() else None
+        except (OSError, RuntimeError, ValueError):
+            service_info = None
+        if service_info is None:
+            self.service_client = None
+        # Ohne Dienst werden torch und CUDA im Hintergrund geprüft, bis dahin gilt nur die CPU
+        self.device_manager = DeviceManager(service_info["cuda"] if service_info else {"available": False})
+        self.devices_ready = service_info is not None
+        self.warmup = warmup
+        self.video_duration = None
         self.init_ui()
         self.center_window()
+        self.warmup_thread = None
+        self.device_probe = None
+        if service_info:
+            self.apply_device_info(service_info["cuda"])
+            self.label_status.setText(f"Verbunden mit Dienst {self.service_client.base_url}")
+        else:
+            self.device_probe = DeviceProbeWorker()
+            self.device_probe.finished_signal.connect(self.device_probe_finished)
+            self.device_probe.start()
+
+    def device_probe_finished(self, cuda_info):
+        self.devices_ready = True
+        self.apply_device_info(cuda_info)
+        if self.warmup:
+            self.warm_up_model()
+
+    def apply_device_info(self, cuda_info):
+        """Übernimmt die CUDA-Angaben in Geräteauswahl und Modellinformationen"""
+        self.device_manager.cuda_info = cuda_info
+        self.device_manager.current_device = "cuda" if cuda_info["available"] else "cpu"
+        self.gpu_radio.setEnabled(cuda_info["available"])
+        if cuda_info["available"]:
+            self.gpu_radio.setChecked(True)
+            self.gpu_info_label.setText(
+                f"GPU: {cuda_info['device_name']}\n"
+                f"Verfügbarer Speicher: "
+                f"{(cuda_info['memory_total'] - cuda_info['memory_allocated']):.0f} MB"
+            )
+            self.gpu_info_label.show()
+        self.update_model_info()
+
+    def warm_up_model(self):
+        """Lädt das gewählte Modell beim Start vor"""
+        device_type = "cuda" if self.gpu_radio.isChecked() and self.device_manager.cuda_info["available"] else "cpu"
+        self.label_status.setText(f"Lade Modell vor ({self.model_combo.currentText()})...")
+        self.warmup_thread = ModelWarmupWorker(self.model_combo.currentText(), device_type)
+        self.warmup_thread.finished_signal.connect(self.update_status)
+        self.warmup_thread.error_signal.connect(self.update_status)
+        self.warmup_thread.start()
 
     def center_window(self):
         # Zentriert das Fenster auf dem Bildschirm
@@ -220,7 +1824,7 @@ class TranscriptionApp(QWidget):
 
     def init_ui(self):
         self.setWindowTitle("Video-Transkription mit Whisper")
-        self.setFixedSize(575, 965)  # Feste Fenstergröße
+        self.setFixedSize(575, 1175)  # Feste Fenstergröße
         self.setAcceptDrops(True)
 
         main_layout = QVBoxLayout()
@@ -284,15 +1888,10 @@ class TranscriptionApp(QWidget):
         self.device_buttons.addButton(self.gpu_radio)
         device_layout.addWidget(self.gpu_radio)
 
-        # GPU Info Label
-        if self.device_manager.cuda_info["available"]:
-            gpu_info = (
-                f"GPU: {self.device_manager.cuda_info['device_name']}\n"
-                f"Verfügbarer Speicher: "
-                f"{(self.device_manager.cuda_info['memory_total'] - self.device_manager.cuda_info['memory_allocated']):.0f} MB"
-            )
-            gpu_info_label = QLabel(gpu_info)
-            device_layout.addWidget(gpu_info_label)
+        # GPU Info Label (wird nach der Geräteerkennung gefüllt)
+        self.gpu_info_label = QLabel()
+        self.gpu_info_label.hide()
+        device_layout.addWidget(self.gpu_info_label)
 
         controls_layout.addWidget(device_group)
 
@@ -319,6 +1918,64 @@ class TranscriptionApp(QWidget):
         model_layout.addWidget(self.model_combo)
         controls_layout.addLayout(model_layout)
 
+        # Quellsprache (bestimmt Transkription und ob übersetzt wird)
+        language_layout = QHBoxLayout()
+        self.label_language = QLabel("Quellsprache:")
+        self.language_combo = QComboBox()
+        for label, code in SOURCE_LANGUAGES.items():
+            self.language_combo.addItem(label, code)
+        self.language_combo.setToolTip(
+            "Automatisch: Die Sprache wird auf einigen Abschnitten der Aufnahme erkannt. "
+            "Englische Aufnahmen werden nur transkribiert, alle anderen zusätzlich ins Englische übersetzt."
+        )
+        language_layout.addWidget(self.label_language)
+        language_layout.addWidget(self.language_combo)
+        controls_layout.addLayout(language_layout)
+
+        # Entwurfsmodell für spekulative Dekodierung
+        draft_layout = QHBoxLayout()
+        self.label_draft = QLabel("Entwurfsmodell:")
+        self.draft_combo = QComboBox()
+        self.draft_combo.addItem("Keins (normale Dekodierung)", None)
+        for label, info in WHISPER_MODELS.items():
+            self.draft_combo.addItem(label, info["name"])
+        self.draft_combo.setToolTip(
+            "Ein kleines Modell schlägt Tokens vor, das gewählte Modell prüft mehrere auf einmal. "
+            "Das Ergebnis bleibt gleich, die Dekodierung wird auf der CPU schneller."
+        )
+        draft_layout.addWidget(self.label_draft)
+        draft_layout.addWidget(self.draft_combo)
+        controls_layout.addLayout(draft_layout)
+
+        # Kaskade: großes Modell für unsichere Fenster
+        cascade_layout = QHBoxLayout()
+        self.label_cascade = QLabel("Kaskadenmodell:")
+        self.cascade_combo = QComboBox()
+        self.cascade_combo.addItem("Keins (nur das gewählte Modell)", None)
+        for label, info in WHISPER_MODELS.items():
+            self.cascade_combo.addItem(label, info["name"])
+        self.cascade_combo.setToolTip(
+            "Das gewählte (schnelle) Modell transkribiert alles. Abschnitte, bei denen es unsicher ist, "
+            "dekodiert dieses größere Modell erneut. Nicht zusammen mit dem Parallelmodus."
+        )
+        cascade_layout.addWidget(self.label_cascade)
+        cascade_layout.addWidget(self.cascade_combo)
+        controls_layout.addLayout(cascade_layout)
+
+        # Rechengenauigkeit (nur CPU)
+        precision_layout = QHBoxLayout()
+        self.label_precision = QLabel("CPU-Genauigkeit:")
+        self.precision_combo = QComboBox()
+        for key, mode in PRECISION_MODES.items():
+            self.precision_combo.addItem(mode["label"], key)
+        if not cpu_supports_bf16():
+            # BF16 ohne Hardwareunterstützung wäre langsamer als FP32
+            self.precision_combo.model().item(list(PRECISION_MODES).index("bf16")).setEnabled(False)
+        self.precision_combo.currentIndexChanged.connect(self.update_model_info)
+        precision_layout.addWidget(self.label_precision)
+        precision_layout.addWidget(self.precision_combo)
+        controls_layout.addLayout(precision_layout)
+
         # Modell-Info Label
         self.model_info_label = QLabel()
         self.update_model_info()
@@ -337,6 +1994,9 @@ class TranscriptionApp(QWidget):
         self.btn_select_file = QPushButton("Video auswählen")
         self.btn_select_file.clicked.connect(self.select_video)
         video_btn_layout.addWidget(self.btn_select_file)
+        self.btn_add_job = QPushButton("Zur Jobliste hinzufügen")
+        self.btn_add_job.clicked.connect(self.add_current_video)
+        video_btn_layout.addWidget(self.btn_add_job)
         file_layout.addLayout(video_btn_layout)
 
         # Ausgabeordner
@@ -366,8 +2026,39 @@ class TranscriptionApp(QWidget):
         self.keep_wav_checkbox = QCheckBox("WAV-Datei behalten")
         self.keep_wav_checkbox.setChecked(False)  # Standardmäßig nicht aktiviert
         wav_layout.addWidget(self.keep_wav_checkbox)
+
+        # Checkbox für parallele Verarbeitung (nur CPU)
+        self.parallel_checkbox = QCheckBox("Parallele Verarbeitung (CPU)")
+        self.parallel_checkbox.setChecked(False)
+        self.parallel_checkbox.setToolTip(
+            "Teilt lange Aufnahmen an stillen Stellen und transkribiert die Abschnitte in mehreren Prozessen"
+        )
+        wav_layout.addWidget(self.parallel_checkbox)
+
+        # Checkbox für Sprachaktivitätserkennung
+        self.vad_checkbox = QCheckBox("Stille überspringen (VAD)")
+        self.vad_checkbox.setChecked(False)
+        self.vad_checkbox.setToolTip("Gibt nur Bereiche mit Sprache an das Modell weiter")
+        wav_layout.addWidget(self.vad_checkbox)
         file_layout.addLayout(wav_layout)
 
+        # Checkbox für Konditionierung auf den Vortext
+        self.condition_checkbox = QCheckBox("Auf Vortext konditionieren (langsamer, Fenster nacheinander)")
+        self.condition_checkbox.setChecked(False)
+        self.condition_checkbox.setToolTip(
+            "Gibt den bisherigen Text als Prompt an das Modell. Ohne diese Option werden mehrere "
+            "Fenster gleichzeitig dekodiert."
+        )
+        file_layout.addWidget(self.condition_checkbox)
+
+        # Jobliste: wartende, laufende und fertige Dateien
+        self.job_list = QListWidget()
+        self.job_list.setFixedHeight(90)
+        file_layout.addWidget(self.job_list)
+        self.btn_clear_jobs = QPushButton("Erledigte Jobs entfernen")
+        self.btn_clear_jobs.clicked.connect(self.clear_finished_jobs)
+        file_layout.addWidget(self.btn_clear_jobs)
+
         # Fortschritt und Status
         progress_section = QFrame()
         progress_layout = QVBoxLayout(progress_section)
@@ -419,6 +2110,10 @@ class TranscriptionApp(QWidget):
 
         # Weitere Initialisierungen
         self.video_path = None
+        self.video_queued = False
+        self.jobs = []  # {"worker", "item", "status", "message", "submitted", "reported"}
+        self.active_worker = None
+        self.cancel_requested = False
         self.transcription_thread = None
         self.start_time = None
         self.end_time = None
@@ -427,49 +2122,73 @@ class TranscriptionApp(QWidget):
         """Aktualisiert die Modellinformationen basierend auf der aktuellen Auswahl"""
         selected_model = WHISPER_MODELS[self.model_combo.currentText()]
         memory_required = selected_model["memory"]
+        # Länge des gewählten Videos für den von der Dauer abhängigen RAM-Anteil
+        audio_info = (
+            f", {str(timedelta(seconds=int(self.video_duration)))} Audio" if self.video_duration else ""
+        )
 
-        if self.gpu_radio.isChecked() and self.device_manager.cuda_info["available"]:
-            available_memory = (
-                self.device_manager.cuda_info["memory_total"] -
-                self.device_manager.cuda_info["memory_allocated"]
+        if not self.devices_ready:
+            self.model_info_label.setText(
+                f"Erforderlicher Speicher: {memory_required} MB\n"
+                f"Geräteerkennung läuft..."
             )
-            memory_ok = available_memory >= memory_required
+        elif self.gpu_radio.isChecked() and self.device_manager.cuda_info["available"]:
+            # Gemessene Werte aus früheren Jobs, sonst Tabellenwerte (siehe ResourceScheduler)
+            estimate = RESOURCES.estimate(selected_model["name"], "cuda", duration=self.video_duration)
+            gpu_budget = self.device_manager.cuda_info["memory_total"] * GPU_BUDGET_FRACTION
+            memory_ok = gpu_budget >= estimate["gpu"]
 
             self.model_info_label.setText(
-                f"Erforderlicher Speicher: {memory_required} MB\n"
-                f"Verfügbarer GPU-Speicher: {available_memory:.0f} MB\n"
-                f"Status: {'✓ Ausreichend' if memory_ok else '⚠ Zu wenig Speicher'}"
+                f"Erforderlicher Speicher: {estimate['gpu']:.0f} MB GPU + {estimate['ram']:.0f} MB RAM{audio_info}\n"
+                f"GPU-Speicherbudget: {gpu_budget:.0f} MB\n"
+                f"Status: {'✓ Ausreichend' if memory_ok else '⚠ Wird herabgestuft'}"
             )
         else:
-            system_ram = psutil.virtual_memory().total / (1024 * 1024)  # MB
-            memory_ok = system_ram >= memory_required * 2  # Doppelter Speicher für CPU
+            precision = self.precision_combo.currentData()
+            memory_required = job_memory_mb(selected_model["name"], "cpu", precision, self.video_duration)
+            memory_ok = RESOURCES.ram_budget() >= memory_required
 
             self.model_info_label.setText(
-                f"Erforderlicher Speicher: {memory_required * 2} MB (CPU)\n"
-                f"Verfügbarer RAM: {system_ram:.0f} MB\n"
-                f"Status: {'✓ Ausreichend' if memory_ok else '⚠ Zu wenig Speicher'}"
+                f"Erforderlicher Speicher: {memory_required:.0f} MB (CPU, {precision.upper()}{audio_info})\n"
+                f"Speicherbudget: {RESOURCES.ram_budget():.0f} MB\n"
+                f"Status: {'✓ Ausreichend' if memory_ok else '⚠ Wird herabgestuft'}"
             )
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
-            url = event.mimeData().urls()[0].toLocalFile()
-            if url.lower().endswith(('.mp4', '.avi', '.mkv', '.mov')):
+            urls = [url.toLocalFile() for url in event.mimeData().urls()]
+            if any(url.lower().endswith(VIDEO_EXTENSIONS) for url in urls):
                 event.acceptProposedAction()
 
     def dropEvent(self, event):
         files = [url.toLocalFile() for url in event.mimeData().urls()]
-        if files:
-            self.load_video(files[0])
+        self.open_files([f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)])
 
     def select_video(self):
-        file_path, _ = QFileDialog.getOpenFileName(
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
             "Video auswählen",
             "",
             "Video-Dateien (*.mp4 *.avi *.mkv *.mov)"
         )
-        if file_path:
-            self.load_video(file_path)
+        self.open_files(file_paths)
+
+    def open_files(self, file_paths):
+        """Lädt die erste Datei in die Vorschau; mehrere Dateien kommen direkt in die Jobliste"""
+        if not file_paths:
+            return
+        self.load_video(file_paths[0])
+        if len(file_paths) > 1:
+            settings = self.job_settings()
+            if settings is None:
+                return
+            for file_path in file_paths:
+                if not self.confirm_job_memory(settings, probe_duration(file_path), file_path):
+                    continue
+                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                output_dir = self.output_path.text() or os.path.dirname(file_path)
+                self.add_job(file_path, os.path.join(output_dir, base_name), settings)
+            self.video_queued = True
 
     def select_output_directory(self):
         directory = QFileDialog.getExistingDirectory(
@@ -486,6 +2205,9 @@ class TranscriptionApp(QWidget):
 
     def load_video(self, file_path):
         self.video_path = file_path
+        self.video_queued = False
+        self.video_duration = probe_duration(file_path)
+        self.update_model_info()
         self.label_video.setText(f"Gewählte Datei: {os.path.basename(file_path)}")
         self.media_player.setSource(QUrl.fromLocalFile(file_path))
         self.btn_play_pause.setEnabled(True)
@@ -515,17 +2237,112 @@ class TranscriptionApp(QWidget):
 
     def update_progress(self, value):
         self.progress_bar.setValue(value)
-        if self.transcription_thread:
-            remaining_time = self.transcription_thread.estimate_remaining_time(value)
-            self.remaining_time_label.setText(remaining_time)
 
     def update_status(self, message):
         self.label_status.setText(message)
 
-    def start_transcription(self):
+    def job_settings(self):
+        """Liest die Einstellungen für neue Jobs aus der Oberfläche (None bei ungültiger Eingabe)"""
+        try:
+            num_cores_to_leave_free = int(self.input_cpu_cores.text())
+            num_total_cores = multiprocessing.cpu_count()
+            if num_cores_to_leave_free >= num_total_cores:
+                QMessageBox.warning(
+                    self,
+                    "Fehler",
+                    f"Die Anzahl der freizulassenden Kerne muss kleiner als die Gesamtzahl ({num_total_cores}) sein."
+                )
+                return None
+            num_cores_to_use = max(1, num_total_cores - num_cores_to_leave_free)
+        except ValueError:
+            QMessageBox.warning(self, "Fehler", "Bitte gib eine gültige Zahl für die freizulassenden CPU-Kerne ein.")
+            return None
+
+        if not self.devices_ready:
+            QMessageBox.information(self, "Bitte warten", "Die Geräteerkennung läuft noch. Bitte einen Moment warten.")
+            return None
+
+        # Device-Typ bestimmen
+        device_type = "cuda" if self.gpu_radio.isChecked() and self.device_manager.cuda_info["available"] else "cpu"
+
+        # Entwurfsmodell prüfen; den Speicher prüft confirm_job_memory je Datei
+        selected_model = WHISPER_MODELS[self.model_combo.currentText()]
+        draft_model = self.draft_combo.currentData()
+        if draft_model and not draft_compatible(selected_model["name"], draft_model):
+            QMessageBox.warning(
+                self,
+                "Fehler",
+                f"Das Entwurfsmodell {draft_model} passt nicht zu {selected_model['name']} (anderer Tokenizer).\n"
+                f"Für Large V3 eignet sich Turbo, für die übrigen Modelle Tiny oder Base."
+            )
+            return None
+        cascade_model = self.cascade_combo.currentData()
+        if cascade_model and not cascade_useful(selected_model["name"], cascade_model):
+            QMessageBox.warning(
+                self,
+                "Fehler",
+                f"Das Kaskadenmodell {cascade_model} muss größer als {selected_model['name']} sein."
+            )
+            return None
+
+        return {
+            "model_name": self.model_combo.currentText(),
+            "device_type": device_type,
+            "num_cores_to_use": num_cores_to_use if device_type == "cpu" else None,
+            "keep_wav": self.keep_wav_checkbox.isChecked(),
+            "parallel": self.parallel_checkbox.isChecked(),
+            "vad": self.vad_checkbox.isChecked(),
+            "precision": self.precision_combo.currentData(),
+            "condition_on_previous_text": self.condition_checkbox.isChecked(),
+            "draft_model": draft_model,
+            "cascade_model": cascade_model,
+            "language": self.language_combo.currentData(),
+        }
+
+    def confirm_job_memory(self, settings, duration, video_path):
+        """Fragt nach, wenn der Job (Modell plus Aufnahmelänge) nicht ins Speicherbudget passt
+
+        Solche Jobs werden bei der Ausführung herabgestuft (siehe ResourceScheduler.plan);
+        passt nicht einmal das kleinste Modell, wird der Job abgelehnt.
+        """
+        model_id = WHISPER_MODELS[settings["model_name"]]["name"]
+        device = settings["device_type"]
+        if device == "cuda":
+            memory, kind, precision = "gpu", "GPU-Speicher", "fp32"
+            budget = self.device_manager.cuda_info["memory_total"] * GPU_BUDGET_FRACTION
+        else:
+            memory, kind, precision = "ram", "RAM", "bf16" if cpu_supports_bf16() else "int8"
+            budget = RESOURCES.ram_budget()
+        memory_required = RESOURCES.estimate(model_id, device, settings["precision"], duration)[memory]
+        if memory_required <= budget:
+            return True
+        name = os.path.basename(video_path) + (f" ({str(timedelta(seconds=int(duration)))})" if duration else "")
+        smallest = min(WHISPER_MODELS.values(), key=lambda info: info["memory"])["name"]
+        if RESOURCES.estimate(smallest, device, precision, duration)[memory] > budget:
+            QMessageBox.warning(
+                self,
+                "Zu wenig Arbeitsspeicher",
+                f"{name} passt auch mit dem kleinsten Modell nicht ins Speicherbudget "
+                f"({budget:.0f} MB {kind})."
+            )
+            return False
+        reply = QMessageBox.question(
+            self,
+            "Zu wenig Arbeitsspeicher",
+            f"{name} benötigt voraussichtlich {memory_required:.0f} MB {kind},\n"
+            f"das Speicherbudget beträgt {budget:.0f} MB.\n\n"
+            f"Der Job wird dafür herabgestuft (weniger Prozesse, geringere Genauigkeit oder kleineres Modell).\n"
+            f"Trotzdem zur Jobliste hinzufügen?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        return reply == QMessageBox.StandardButton.Yes
+
+    def add_current_video(self):
+        """Prüft das gewählte Video und hängt es als wartenden Job an die Jobliste"""
         if not self.video_path:
             QMessageBox.warning(self, "Fehler", "Bitte wähle eine Video-Datei aus.")
-            return
+            return False
 
         # Überprüfen, ob die Videodatei noch existiert
         if not os.path.exists(self.video_path):
@@ -537,38 +2354,25 @@ class TranscriptionApp(QWidget):
             self.video_path = None
             self.label_video.setText("Ziehe eine Video-Datei hierher oder wähle eine aus")
             self.btn_play_pause.setEnabled(False)
-            return
+            return False
 
         if not self.output_path.text():
             QMessageBox.warning(self, "Fehler", "Bitte wähle einen Ausgabeordner.")
-            return
+            return False
 
         base_filename = self.input_filename.text().strip()
         if not base_filename:
             QMessageBox.warning(self, "Fehler", "Bitte gib einen Basisnamen für die Dateien ein.")
-            return
-
-        try:
-            num_cores_to_leave_free = int(self.input_cpu_cores.text())
-            num_total_cores = multiprocessing.cpu_count()
-            if num_cores_to_leave_free >= num_total_cores:
-                QMessageBox.warning(
-                    self,
-                    "Fehler",
-                    f"Die Anzahl der freizulassenden Kerne muss kleiner als die Gesamtzahl ({num_total_cores}) sein."
-                )
-                return
-            num_cores_to_use = max(1, num_total_cores - num_cores_to_leave_free)
-        except ValueError:
-            QMessageBox.warning(self, "Fehler", "Bitte gib eine gültige Zahl für die freizulassenden CPU-Kerne ein.")
-            return
+            return False
 
         # Vollständiger Pfad für die Ausgabedateien
         output_base_path = os.path.join(self.output_path.text(), base_filename)
 
-        # Überprüfen, ob Dateien bereits existieren
+        # Überprüfen, ob Dateien bereits existieren (bei unbekannter Quellsprache die Standardnamen)
+        model_id = WHISPER_MODELS[self.model_combo.currentText()]["name"]
+        tasks = expected_tasks(self.video_path, model_id, self.language_combo.currentData()) or DEFAULT_TASKS
         existing_files = []
-        for ext in ['_de.txt', '_en.txt', '.srt']:
+        for ext in output_suffixes(names=tasks):
             if os.path.exists(output_base_path + ext):
                 existing_files.append(os.path.basename(output_base_path + ext))
 
@@ -581,105 +2385,198 @@ class TranscriptionApp(QWidget):
                 QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.No:
-                return
-
-        # Device-Typ bestimmen
-        device_type = "cuda" if self.gpu_radio.isChecked() and self.device_manager.cuda_info["available"] else "cpu"
+                return False
+
+        settings = self.job_settings()
+        if settings is None:
+            return False
+        if not self.confirm_job_memory(settings, self.video_duration, self.video_path):
+            return False
+        self.add_job(self.video_path, output_base_path, settings)
+        self.video_queued = True
+        return True
+
+    def add_job(self, video_path, output_base_path, settings):
+        if self.service_client:
+            worker = ServiceJobWorker(self.service_client, video_path, output_base_path, settings)
+            worker.job_state_signal.connect(self.job_state_changed)
+            worker.finished.connect(self.service_job_finished)
+        else:
+            worker = TranscriptionWorker(video_path, output_base_path, **settings)
+        worker.status_signal.connect(self.update_status)
+        # Fortschritt nur vom Job in der Dekodierstufe anzeigen
+        worker.progress_signal.connect(
+            lambda value, w=worker: self.update_progress(value) if w is self.active_worker else None
+        )
+        worker.time_estimate_signal.connect(
+            lambda t, w=worker: self.remaining_time_label.setText(f"Verbleibend: {t}")
+            if w is self.active_worker else None
+        )
+        item = QListWidgetItem()
+        self.job_list.addItem(item)
+        self.jobs.append({
+            "worker": worker, "item": item, "status": "wartend", "message": "", "submitted": False, "reported": False
+        })
+        self.job_state_changed(worker, "wartend", "")
+
+    def job_state_changed(self, worker, status, message):
+        """Aktualisiert einen Eintrag der Jobliste"""
+        for job in self.jobs:
+            if job["worker"] is worker:
+                break
+        else:
+            return
+        job["status"] = status
+        job["message"] = message
+        job["item"].setText(f"{status}: {os.path.basename(worker.video_path)}")
+        job["item"].setToolTip(message or worker.base_filename)
+        if status == "läuft":
+            self.active_worker = worker
+            self.progress_bar.setValue(0)
+
+    def run_waiting_jobs(self):
+        """Übergibt alle wartenden Jobs an die laufende oder eine neue Pipeline"""
+        waiting = [job for job in self.jobs if job["status"] == "wartend" and not job["submitted"]]
+        if not waiting:
+            return False
+
+        if self.service_client:
+            # Der Dienst plant die Jobs selbst ein, jeder Job wird einzeln verfolgt
+            if not self.is_busy():
+                self.start_run()
+            for job in waiting:
+                job["submitted"] = True
+                job["worker"].start()
+        elif not (self.transcription_thread and self.transcription_thread.isRunning()):
+            self.transcription_thread = PipelineWorker()
+            self.transcription_thread.job_state_signal.connect(self.job_state_changed)
+            self.transcription_thread.finished.connect(self.pipeline_finished)
+            self.start_run()
+            for job in waiting:
+                job["submitted"] = self.transcription_thread.submit(job["worker"])
+            self.transcription_thread.start()
+        else:
+            # Nimmt die Pipeline keine Jobs mehr an, startet pipeline_finished sie danach neu
+            for job in waiting:
+                job["submitted"] = self.transcription_thread.submit(job["worker"])
 
-        # Modell-Speicheranforderungen prüfen
-        selected_model = WHISPER_MODELS[self.model_combo.currentText()]
-        if device_type == "cuda":
-            available_memory = (
-                self.device_manager.cuda_info["memory_total"] -
-                self.device_manager.cuda_info["memory_allocated"]
-            )
-            if available_memory < selected_model["memory"]:
-                QMessageBox.warning(
-                    self,
-                    "Warnung",
-                    f"Nicht genügend GPU-Speicher verfügbar!\n"
-                    f"Benötigt: {selected_model['memory']} MB\n"
-                    f"Verfügbar: {available_memory:.0f} MB"
-                )
-                return
+        self.btn_cancel.setEnabled(True)
+        return True
 
+    def start_run(self):
+        self.cancel_requested = False
         self.start_time = datetime.now()
         self.start_time_label.setText(f"Startzeit: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         self.end_time_label.setText("Endzeit: --")
         self.duration_label.setText("Dauer: --")
         self.remaining_time_label.setText("Verbleibend: --")
 
-        # Buttons aktualisieren
-        self.btn_start.setEnabled(False)
-        self.btn_cancel.setEnabled(True)
+    def service_workers(self):
+        return [
+            job["worker"] for job in self.jobs
+            if isinstance(job["worker"], ServiceJobWorker) and job["worker"].isRunning()
+        ]
 
-        # Thread starten (nur einmal!)
-        self.transcription_thread = TranscriptionWorker(
-            self.video_path,
-            output_base_path,
-            self.model_combo.currentText(),
-            device_type,
-            num_cores_to_use=num_cores_to_use if device_type == "cpu" else None,
-            keep_wav=self.keep_wav_checkbox.isChecked()
-        )
+    def is_busy(self):
+        pipeline_running = self.transcription_thread is not None and self.transcription_thread.isRunning()
+        return pipeline_running or bool(self.service_workers())
 
-        self.transcription_thread.progress_signal.connect(self.update_progress)
-        self.transcription_thread.status_signal.connect(self.update_status)
-        self.transcription_thread.finished_signal.connect(self.transcription_finished)
-        self.transcription_thread.error_signal.connect(self.transcription_error)
-        self.transcription_thread.time_estimate_signal.connect(
-            lambda t: self.remaining_time_label.setText(f"Verbleibend: {t}")
-        )
+    def service_job_finished(self):
+        if not self.is_busy():
+            self.pipeline_finished()
 
-        self.transcription_thread.start()
+    def start_transcription(self):
+        # Gewähltes Video anhängen, falls es noch nicht in der Jobliste steht
+        if self.video_path and not self.video_queued:
+            if not self.add_current_video():
+                return
+        if not self.run_waiting_jobs():
+            if not self.video_path:
+                QMessageBox.warning(self, "Fehler", "Bitte wähle eine Video-Datei aus.")
+            else:
+                QMessageBox.information(self, "Jobliste", "Es gibt keine wartenden Jobs.")
+
+    def clear_finished_jobs(self):
+        for job in list(self.jobs):
+            if job["status"] in ("fertig", "fehler", "abgebrochen"):
+                self.job_list.takeItem(self.job_list.row(job["item"]))
+                self.jobs.remove(job)
 
     def cancel_transcription(self):
-        if self.transcription_thread and self.transcription_thread.isRunning():
+        if self.is_busy():
             reply = QMessageBox.question(
                 self,
                 "Transkription abbrechen",
-                "Möchten Sie die Transkription wirklich abbrechen?",
+                "Möchten Sie die Transkription und alle wartenden Jobs wirklich abbrechen?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
 
             if reply == QMessageBox.StandardButton.Yes:
-                self.transcription_thread.cancel()
+                self.cancel_requested = True
+                if self.transcription_thread:
+                    self.transcription_thread.cancel()
+                for worker in self.service_workers():
+                    worker.cancel()
+                for job in self.jobs:
+                    if job["status"] == "wartend" and not job["submitted"]:
+                        self.job_state_changed(job["worker"], "abgebrochen", "Transkription wurde abgebrochen")
                 self.btn_cancel.setEnabled(False)
                 self.label_status.setText("Breche Transkription ab...")
 
-    def transcription_finished(self, message):
+    def pipeline_finished(self):
+        # Jobs, die nach dem Schließen der Pipeline hinzugefügt wurden, in einer neuen Pipeline starten
+        if not self.cancel_requested and self.run_waiting_jobs():
+            return
+
+        self.active_worker = None
         self.end_time = datetime.now()
         self.end_time_label.setText(f"Endzeit: {self.end_time.strftime('%Y-%m-%d %H:%M:%S')}")
         duration = self.end_time - self.start_time
         self.duration_label.setText(f"Dauer: {str(duration).split('.')[0]}")
         self.remaining_time_label.setText("Verbleibend: --")
-
-        self.btn_start.setEnabled(True)
         self.btn_cancel.setEnabled(False)
+        self.progress_bar.setValue(0)
+
+        finished = [
+            job for job in self.jobs
+            if job["submitted"] and not job["reported"] and job["status"] in ("fertig", "fehler", "abgebrochen")
+        ]
+        for job in finished:
+            job["reported"] = True
+        if not finished:
+            return
+        failed = [job for job in finished if job["status"] != "fertig"]
+        if len(finished) == 1 and not failed:
+            self.transcription_finished(finished[0]["message"])
+        elif len(finished) == 1:
+            self.transcription_error(finished[0]["message"])
+        elif failed:
+            self.transcription_error(
+                f"{len(finished) - len(failed)} von {len(finished)} Jobs abgeschlossen.\n\n"
+                + "\n".join(f"{os.path.basename(job['worker'].video_path)}: {job['message']}" for job in failed)
+            )
+        else:
+            self.transcription_finished(f"{len(finished)} Jobs abgeschlossen.")
 
+    def transcription_finished(self, message):
         # Erfolgreiche Fertigstellung
         QMessageBox.information(self, "Fertig", message)
         self.label_status.setText("Bereit")
-        self.progress_bar.setValue(0)
 
     def transcription_error(self, error_message):
-        self.end_time = datetime.now()
-        self.end_time_label.setText(f"Endzeit: {self.end_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        duration = self.end_time - self.start_time
-        self.duration_label.setText(f"Dauer: {str(duration).split('.')[0]}")
-        self.remaining_time_label.setText("Verbleibend: --")
-
-        self.btn_start.setEnabled(True)
-        self.btn_cancel.setEnabled(False)
-
         # Fehlermeldung anzeigen
         QMessageBox.critical(self, "Fehler", error_message)
         self.label_status.setText("Fehler aufgetreten")
-        self.progress_bar.setValue(0)
 
     def closeEvent(self, event):
         """Wird aufgerufen, wenn das Fenster geschlossen wird"""
+        if self.device_probe and self.device_probe.isRunning():
+            self.device_probe.wait()
+        # Jobs des Dienstes laufen nach dem Schließen weiter, nur das Verfolgen endet
+        for worker in self.service_workers():
+            worker.detach()
+            worker.wait()
         if self.transcription_thread and self.transcription_thread.isRunning():
             reply = QMessageBox.question(
                 self,
@@ -699,21 +2596,291 @@ class TranscriptionApp(QWidget):
             event.accept()
 
 
+def add_subtitle_arguments(parser):
+    parser.add_argument(
+        "--formats", nargs="+", default=list(SUBTITLE_FORMATS), choices=list(SUBTITLE_FORMATS),
+        help="Untertitelformate je Aufgabe (Standard: alle); die englischen SRT-Untertitel heißen <Name>.srt"
+    )
+    parser.add_argument(
+        "--max-line-chars", type=int, default=SUBTITLE_MAX_LINE_CHARS,
+        help=f"Zeichen pro Untertitelzeile (Standard: {SUBTITLE_MAX_LINE_CHARS})"
+    )
+    parser.add_argument(
+        "--max-lines", type=int, default=SUBTITLE_MAX_LINES, help=f"Zeilen pro Untertitel (Standard: {SUBTITLE_MAX_LINES})"
+    )
+    parser.add_argument(
+        "--max-cps", type=float, default=SUBTITLE_MAX_CPS,
+        help=f"Lesegeschwindigkeit in Zeichen pro Sekunde (Standard: {SUBTITLE_MAX_CPS:g})"
+    )
+    parser.add_argument(
+        "--no-word-timestamps", action="store_true",
+        help="Ohne Wortzeitstempel dekodieren (Untertitel werden dann nach Zeichenanteil aufgeteilt)"
+    )
+
+def add_language_argument(parser):
+    parser.add_argument(
+        "--language",
+        help="Quellsprache als Kürzel, z. B. de (Standard: auf einigen Fenstern erkennen); bei en ohne Übersetzung"
+    )
+
+def add_memory_argument(parser):
+    parser.add_argument(
+        "--memory-budget-mb", type=float,
+        help="RAM-Budget für Jobs in MB; größere Jobs warten oder werden herabgestuft "
+             f"(Standard: WHISPER_TRANSCRIBE_MEMORY_MB oder {MEMORY_BUDGET_FRACTION * 100:.0f} % des RAM)"
+    )
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Video-Transkription mit Whisper")
+    parser.add_argument("--warmup", action="store_true", help="Gewähltes Modell beim Start der GUI vorladen")
+    # Nur für "benchmark-startup": meldet sichtbares Fenster und Geräteerkennung und beendet die GUI
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Dateien ohne GUI transkribieren")
+    batch.add_argument("inputs", nargs="+", help="Videodateien, Glob-Muster oder Verzeichnisse")
+    batch.add_argument("-o", "--output-dir", help="Ausgabeordner (Standard: Ordner des Videos)")
+    batch.add_argument(
+        "--model", default="medium", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Whisper-Modell (Standard: medium)"
+    )
+    batch.add_argument("--device", choices=["cpu", "cuda"], help="Verarbeitungsgerät (Standard: automatisch)")
+    batch.add_argument("--cores-free", type=int, default=2, help="CPU-Kerne freilassen (Standard: 2)")
+    batch.add_argument("--keep-wav", action="store_true", help="WAV-Datei behalten")
+    batch.add_argument("--parallel", action="store_true", help="Lange Dateien in mehreren CPU-Prozessen transkribieren")
+    batch.add_argument(
+        "--precision", default="fp32", choices=list(PRECISION_MODES), help="Rechengenauigkeit auf der CPU"
+    )
+    batch.add_argument("--vad", action="store_true", help="Stille vor der Transkription überspringen")
+    batch.add_argument(
+        "--condition-on-previous-text", action="store_true",
+        help="Auf den Vortext konditionieren (Fenster nacheinander statt gebatcht dekodieren)"
+    )
+    batch.add_argument(
+        "--batch-size", type=int, help=f"Gleichzeitig dekodierte Fenster (Standard: nach Speicher, max. {BATCH_MAX_WINDOWS})"
+    )
+    batch.add_argument("--batch-memory-mb", type=float, help="Speicherbudget für gebatchte Fenster in MB")
+    batch.add_argument(
+        "--draft-model", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Kleines Entwurfsmodell für spekulative Dekodierung (gleiches Ergebnis, weniger Decoder-Durchläufe)"
+    )
+    batch.add_argument(
+        "--cascade-model", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Großes Modell, das unsichere Fenster erneut dekodiert (z. B. --model small --cascade-model large-v3)"
+    )
+    batch.add_argument("--force", action="store_true", help="Auch Dateien mit aktuellen Ausgaben neu transkribieren")
+    batch.add_argument("--metrics-file", help=f"Job-Metriken als JSON Lines (Standard: {METRICS_FILE})")
+    batch.add_argument("--metrics-port", type=int, help="Metriken im Prometheus-Format unter /metrics bereitstellen")
+    add_language_argument(batch)
+    add_memory_argument(batch)
+    add_subtitle_arguments(batch)
+
+    export = subparsers.add_parser(
+        "export", help="Texte und Untertitel aus dem Ergebnis-Cache neu schreiben (ohne Modell)"
+    )
+    export.add_argument("inputs", nargs="+", help="Videodateien, Glob-Muster oder Verzeichnisse")
+    export.add_argument("-o", "--output-dir", help="Ausgabeordner (Standard: Ordner des Videos)")
+    export.add_argument(
+        "--model", default="medium", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Modell der zwischengespeicherten Transkription (Standard: medium)"
+    )
+    export.add_argument("--precision", default="fp32", choices=list(PRECISION_MODES))
+    export.add_argument("--vad", action="store_true")
+    export.add_argument("--condition-on-previous-text", action="store_true")
+    export.add_argument("--cascade-model", choices=[info["name"] for info in WHISPER_MODELS.values()])
+    add_language_argument(export)
+    add_subtitle_arguments(export)
+
+    cache = subparsers.add_parser("cache", help="Ergebnis- oder Audio-Cache anzeigen und aufräumen")
+    cache.add_argument("action", choices=["list", "prune", "clear"])
+    cache.add_argument(
+        "--max-mb", type=float,
+        help="Größenlimit für prune (Standard: %d MB, Audio: %d MB)" % (RESULT_CACHE_MAX_MB, AUDIO_CACHE_MAX_MB)
+    )
+    cache.add_argument("--audio", action="store_true", help="Audio-Cache (extrahiertes PCM) statt Ergebnis-Cache")
+
+    compare = subparsers.add_parser(
+        "compare-precision", help="Genauigkeit und Geschwindigkeit der CPU-Modi mit FP32 vergleichen"
+    )
+    compare.add_argument("clip", help="Referenzclip (Video oder Audio)")
+    compare.add_argument(
+        "--model", default="small", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Whisper-Modell (Standard: small)"
+    )
+    compare.add_argument("--modes", nargs="+", default=list(PRECISION_MODES), choices=list(PRECISION_MODES))
+    compare.add_argument("--max-seconds", type=float, help="Nur den Anfang des Clips verwenden")
+    compare.add_argument("--cores-free", type=int, default=2, help="CPU-Kerne freilassen (Standard: 2)")
+
+    speculative = subparsers.add_parser(
+        "compare-speculative", help="Beschleunigung der spekulativen Dekodierung mit Entwurfsmodellen messen"
+    )
+    speculative.add_argument("clip", help="Referenzclip (Audio oder Video)")
+    speculative.add_argument(
+        "--model", default="large-v2", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Modell, dessen Ergebnis erzeugt wird (Standard: large-v2)"
+    )
+    speculative.add_argument(
+        "--drafts", nargs="+", default=["tiny", "base"], choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Zu vergleichende Entwurfsmodelle (Standard: tiny base)"
+    )
+    speculative.add_argument(
+        "--draft-tokens", type=int, default=SPECULATIVE_DRAFT_TOKENS,
+        help=f"Vorgeschlagene Tokens je Durchlauf (Standard: {SPECULATIVE_DRAFT_TOKENS})"
+    )
+    speculative.add_argument("--precision", default="fp32", choices=list(PRECISION_MODES))
+    speculative.add_argument("--max-seconds", type=float, help="Nur den Anfang des Clips verwenden")
+    speculative.add_argument("--cores-free", type=int, default=2, help="CPU-Kerne freilassen (Standard: 2)")
+    speculative.add_argument("--output", help="Bericht zusätzlich als JSON speichern")
+
+    benchmark = subparsers.add_parser("benchmark", help="Laufzeit je Modell, Thread-Anzahl und Pipeline-Stufe messen")
+    benchmark.add_argument("--audio", help="Eigene Audio-/Videodatei statt synthetischem Testaudio")
+    benchmark.add_argument("--seconds", type=float, default=60, help="Länge des Testaudios (Standard: 60 s)")
+    benchmark.add_argument(
+        "--models", nargs="+", default=["tiny", "base"], choices=[info["name"] for info in WHISPER_MODELS.values()]
+    )
+    benchmark.add_argument("--precisions", nargs="+", default=["fp32"], choices=list(PRECISION_MODES))
+    benchmark.add_argument(
+        "--threads", nargs="+", type=int, default=sorted({1, max(1, multiprocessing.cpu_count() // 2),
+                                                          multiprocessing.cpu_count()})
+    )
+    benchmark.add_argument("--repeat", type=int, default=1, help="Wiederholungen, der schnellste Lauf zählt")
+    benchmark.add_argument("--output", default="benchmark_report.json", help="JSON-Bericht")
+
+    startup = subparsers.add_parser("benchmark-startup", help="Startzeit der GUI messen")
+    startup.add_argument("--repeat", type=int, default=5, help="Anzahl der Starts (Standard: 5)")
+    startup.add_argument(
+        "--target", type=float, default=STARTUP_TARGET_SECONDS,
+        help=f"Zielwert bis zum sichtbaren Fenster in Sekunden (Standard: {STARTUP_TARGET_SECONDS})"
+    )
+
+    serve = subparsers.add_parser("serve", help="Lokalen Transkriptionsdienst starten (hält die Modelle geladen)")
+    serve.add_argument("--port", type=int, default=SERVICE_PORT, help=f"Port auf {SERVICE_HOST} (Standard: {SERVICE_PORT})")
+    serve.add_argument("--token", help=f"Zugriffstoken der Clients (Standard: aus {SERVICE_TOKEN_FILE}, wird angelegt)")
+    serve.add_argument(
+        "--preload", nargs="+", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Modelle beim Start laden"
+    )
+    add_memory_argument(serve)
+
+    submit = subparsers.add_parser("submit", help="Dateien an den lokalen Dienst übergeben")
+    submit.add_argument("inputs", nargs="+", help="Videodateien, Glob-Muster oder Verzeichnisse")
+    submit.add_argument("-o", "--output-dir", help="Ausgabeordner (Standard: Ordner des Videos)")
+    submit.add_argument(
+        "--model", default="medium", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Whisper-Modell (Standard: medium)"
+    )
+    submit.add_argument("--device", choices=["cpu", "cuda"], help="Verarbeitungsgerät (Standard: wie der Dienst)")
+    submit.add_argument("--cores-free", type=int, default=2, help="CPU-Kerne freilassen (Standard: 2)")
+    submit.add_argument("--keep-wav", action="store_true", help="WAV-Datei behalten")
+    submit.add_argument("--parallel", action="store_true", help="Lange Dateien in mehreren CPU-Prozessen transkribieren")
+    submit.add_argument("--precision", default="fp32", choices=list(PRECISION_MODES), help="Rechengenauigkeit auf der CPU")
+    submit.add_argument("--vad", action="store_true", help="Stille vor der Transkription überspringen")
+    submit.add_argument("--condition-on-previous-text", action="store_true", help="Auf den Vortext konditionieren")
+    submit.add_argument("--batch-size", type=int, help="Gleichzeitig dekodierte Fenster")
+    submit.add_argument(
+        "--draft-model", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Entwurfsmodell für spekulative Dekodierung"
+    )
+    submit.add_argument(
+        "--cascade-model", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Großes Modell für unsichere Fenster"
+    )
+    submit.add_argument("--priority", type=int, default=0, help="Kleinere Zahl wird zuerst bearbeitet (Standard: 0)")
+    submit.add_argument("--follow", action="store_true", help="Fortschritt verfolgen, bis alle Jobs fertig sind")
+    submit.add_argument("--port", type=int, default=SERVICE_PORT)
+    submit.add_argument("--token", help=f"Zugriffstoken des Dienstes (Standard: aus {SERVICE_TOKEN_FILE})")
+    add_language_argument(submit)
+    add_subtitle_arguments(submit)
+
+    jobs = subparsers.add_parser("jobs", help="Jobs des lokalen Dienstes anzeigen")
+    jobs.add_argument("--port", type=int, default=SERVICE_PORT)
+    jobs.add_argument("--token", help=f"Zugriffstoken des Dienstes (Standard: aus {SERVICE_TOKEN_FILE})")
+
+    cancel = subparsers.add_parser("cancel", help="Job des lokalen Dienstes abbrechen")
+    cancel.add_argument("job_id")
+    cancel.add_argument("--port", type=int, default=SERVICE_PORT)
+    cancel.add_argument("--token", help=f"Zugriffstoken des Dienstes (Standard: aus {SERVICE_TOKEN_FILE})")
+
+    live = subparsers.add_parser("live", help="Laufende Aufnahme (wachsende Datei oder stdin) fortlaufend untertiteln")
+    live.add_argument("input", help="Wachsende Audio-/Videodatei oder - für rohes PCM auf stdin")
+    live.add_argument("-o", "--output", help="Basisname der Ausgaben (Standard: Eingabe ohne Endung bzw. live)")
+    live.add_argument(
+        "--model", default="small", choices=[info["name"] for info in WHISPER_MODELS.values()],
+        help="Whisper-Modell (Standard: small)"
+    )
+    live.add_argument("--device", choices=["cpu", "cuda"], help="Verarbeitungsgerät (Standard: automatisch)")
+    live.add_argument("--precision", default="fp32", choices=list(PRECISION_MODES), help="Rechengenauigkeit auf der CPU")
+    live.add_argument("--cores-free", type=int, default=2, help="CPU-Kerne freilassen (Standard: 2)")
+    live.add_argument(
+        "--step", type=float, default=LIVE_STEP_SECONDS,
+        help=f"Sekunden neues Audio je Dekodierdurchlauf (Standard: {LIVE_STEP_SECONDS:g})"
+    )
+    live.add_argument(
+        "--lookahead", type=float, default=LIVE_LOOKAHEAD_SECONDS,
+        help="Segmente erst übernehmen, wenn danach so viele Sekunden Audio vorliegen; "
+             f"kleiner = schneller, größer = genauer (Standard: {LIVE_LOOKAHEAD_SECONDS:g})"
+    )
+    live.add_argument("--translate", action="store_true", help="Englische Übersetzung statt Transkription ausgeben")
+    live.add_argument(
+        "--idle-timeout", type=float, default=LIVE_IDLE_SECONDS,
+        help=f"Ende der Aufnahme, wenn die Datei so viele Sekunden nicht wächst (Standard: {LIVE_IDLE_SECONDS:g})"
+    )
+    live.add_argument("--input-format", default="s16le", help="Format von stdin für ffmpeg (Standard: s16le)")
+    live.add_argument("--input-rate", type=int, default=SAMPLE_RATE, help=f"Abtastrate von stdin (Standard: {SAMPLE_RATE})")
+    live.add_argument("--input-channels", type=int, default=1, help="Kanäle von stdin (Standard: 1)")
+    add_language_argument(live)
+    add_subtitle_arguments(live)
+    return parser
+
 def main():
+    args, qt_args = build_arg_parser().parse_known_args()
+    if args.command == "batch":
+        sys.exit(run_batch(args))
+    if args.command == "cache":
+        sys.exit(run_cache_command(args))
+    if args.command == "export":
+        sys.exit(run_export(args))
+    if args.command == "compare-precision":
+        sys.exit(run_precision_comparison(args))
+    if args.command == "compare-speculative":
+        sys.exit(run_speculative_comparison(args))
+    if args.command == "benchmark":
+        sys.exit(run_benchmark(args))
+    if args.command == "benchmark-startup":
+        sys.exit(run_startup_benchmark(args))
+    if args.command == "serve":
+        sys.exit(run_service(args))
+    if args.command in ("submit", "jobs", "cancel"):
+        sys.exit(run_service_command(args))
+    if args.command == "live":
+        sys.exit(run_live(args))
+
     # Hochauflösende Displays unterstützen
     if hasattr(Qt.ApplicationAttribute, 'AA_EnableHighDpiScaling'):
         QApplication.setAttribute(Qt.ApplicationAttribute.AA_EnableHighDpiScaling, True)
     if hasattr(Qt.ApplicationAttribute, 'AA_UseHighDpiPixmaps'):
         QApplication.setAttribute(Qt.ApplicationAttribute.AA_UseHighDpiPixmaps, True)
 
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
 
     # Style für die Anwendung setzen
     app.setStyle('Fusion')
 
-    # Fenster erstellen und anzeigen
-    window = TranscriptionApp()
+    # Fenster erstellen und anzeigen (--warmup lädt das Modell beim Start vor)
+    window = TranscriptionApp(warmup=args.warmup)
     window.show()
+    if args.startup_probe:
+        # Erst nach dem ersten Durchlauf der Ereignisschleife ist das Fenster wirklich sichtbar
+        QTimer.singleShot(0, lambda: print("window", flush=True))
+
+        def devices_ready():
+            print("devices", flush=True)
+            app.quit()
+
+        if window.device_probe:
+            window.device_probe.finished_signal.connect(lambda info: QTimer.singleShot(0, devices_ready))
+        else:
+            QTimer.singleShot(0, devices_ready)
 
     sys.exit(app.exec())
 
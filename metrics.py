@@ -0,0 +1,227 @@
+"""Job-Metriken (JSON Lines, optional als Prometheus-Text über HTTP)"""
+
+import os
+import threading
+import time
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime
+from collections import defaultdict
+from core import CACHE_DIR, PeakMemorySampler, process_rss_mb, StageTimer, torch
+from resources import MODEL_CACHE
+
+METRICS_FILE = os.environ.get("WHISPER_TRANSCRIBE_METRICS", os.path.join(CACHE_DIR, "metrics.jsonl"))
+METRICS_HELP = {
+    "jobs_total": ("counter", "Bearbeitete Jobs nach Status"),
+    "audio_seconds_total": ("counter", "Verarbeitete Audiodauer in Sekunden"),
+    "processing_seconds_total": ("counter", "Laufzeit der Jobs in Sekunden"),
+    "stage_seconds_total": ("counter", "Laufzeit je Pipeline-Stufe in Sekunden"),
+    "decoded_tokens_total": ("counter", "Vom Decoder erzeugte Tokens"),
+    "model_cache_hits_total": ("counter", "Treffer im Modell-Cache"),
+    "model_cache_misses_total": ("counter", "Modell-Ladevorgänge"),
+    "result_cache_hits_total": ("counter", "Jobs, die aus dem Ergebnis-Cache beantwortet wurden"),
+    "audio_cache_hits_total": ("counter", "Jobs, deren Audio aus dem Audio-Cache statt über ffmpeg kam"),
+    "decode_guard_cutoffs_total": ("counter", "Vorzeitig abgebrochene Fenster nach Grund (Schleife, Textdichte)"),
+    "decode_guard_unresolved_total": ("counter", "Fenster, die auch nach dem Fallback gekürzt übernommen wurden"),
+    "source_languages_total": ("counter", "Quellsprache der Jobs nach Herkunft (erkannt, cache, vorgegeben)"),
+    "realtime_factor": ("gauge", "Echtzeitfaktor des letzten Jobs (Audio-Sekunden pro Sekunde)"),
+    "tokens_per_second": ("gauge", "Decoder-Tokens pro Sekunde des letzten Jobs"),
+    "peak_rss_megabytes": ("gauge", "Höchster RSS-Wert des letzten Jobs in MB"),
+    "torch_peak_megabytes": ("gauge", "Höchster von torch belegter GPU-Speicher des letzten Jobs in MB"),
+    "admission_wait_seconds_total": ("counter", "Wartezeit der Jobs auf freien Speicher in Sekunden"),
+    "downgraded_jobs_total": ("counter", "Jobs, die für das Speicherbudget herabgestuft wurden"),
+    "cascade_escalated_seconds_total": ("counter", "Vom Kaskadenmodell neu dekodierte Audiodauer je Aufgabe in Sekunden"),
+}
+
+class JobMetrics:
+    """Misst einen Job: Stufen, Audiodauer, Echtzeitfaktor, Tokens/s, Speicher und Cache-Nutzung"""
+    def __init__(self, video_path, model_id, device, precision, parallel=False, vad=False):
+        self.info = {
+            "video": video_path,
+            "model": model_id,
+            "device": device,
+            "precision": precision,
+            "parallel": parallel,
+            "vad": vad,
+        }
+        self.timer = StageTimer()
+        self.audio_seconds = None
+        self.decoded_tokens = 0
+        self.result_cache_hit = False
+        self.audio_cache_hit = False
+        self.speculative = None  # Kennzahlen des Entwurfsmodells (siehe SpeculativeTranscriber.stats)
+        self.cascade = None  # Vom Kaskadenmodell neu dekodierte Fenster (siehe CascadeTranscriber.stats)
+        self.guard = None  # Vom DecodeGuard abgebrochene Fenster je Grund (siehe MultiTaskTranscriber.guard_stats)
+        self.language = None  # Quellsprache: {"language", "probability", "source"}
+        self.admission = None  # Zulassung: {"waited_seconds", "changes"} (siehe ResourceScheduler)
+        self.memory_start = None  # Speicherstand vor dem Job, Basis für die ResourceProfiles
+        self.live = None  # Live-Modus: übernommene Segmente und Latenz (siehe LiveTranscriber)
+        self.queued_seconds = 0.0  # Wartezeit zwischen Pipeline-Stufen, zählt nicht zur Laufzeit
+        self.status = "läuft"
+        self._memory = PeakMemorySampler()
+        self._started = None
+        self._wall_seconds = None
+        self._cache_counts = None
+
+    def start(self):
+        self._cache_counts = (MODEL_CACHE.hits, MODEL_CACHE.misses)
+        self.memory_start = {"rss_mb": round(process_rss_mb(), 1), "torch_mb": None}
+        if self.info["device"] == "cuda":
+            torch.cuda.reset_peak_memory_stats()
+            self.memory_start["torch_mb"] = round(torch.cuda.memory_allocated() / (1024 * 1024), 1)
+        self._memory.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self, exc_type=None):
+        self._wall_seconds = time.perf_counter() - self._started - self.queued_seconds
+        self._memory.__exit__(exc_type, None, None)
+        if exc_type is None:
+            self.status = "fertig"
+        elif issubclass(exc_type, InterruptedError):
+            self.status = "abgebrochen"
+        else:
+            self.status = "fehler"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(exc_type)
+        return False
+
+    def record(self):
+        """Gibt die Metriken als JSON-fähiges Dict zurück"""
+        decoder_seconds = self.timer.totals.get("decoder", 0.0)
+        torch_peak_mb = None
+        if self.info["device"] == "cuda":
+            torch_peak_mb = torch.cuda.max_memory_allocated() / (1024 * 1024)
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            **self.info,
+            "status": self.status,
+            "audio_seconds": self.audio_seconds,
+            "wall_seconds": self._wall_seconds,
+            "queued_seconds": self.queued_seconds,
+            "realtime_factor": (
+                self.audio_seconds / self._wall_seconds if self.audio_seconds and self._wall_seconds else None
+            ),
+            # Im Parallelmodus sind die Stufenzeiten über alle Worker-Prozesse summiert
+            "stages": {name: round(seconds, 4) for name, seconds in self.timer.totals.items()},
+            "windows": self.timer.counts.get("encoder", 0),
+            "decoded_tokens": self.decoded_tokens,
+            "tokens_per_second": self.decoded_tokens / decoder_seconds if decoder_seconds else None,
+            "peak_rss_mb": round(self._memory.peak_mb, 1),
+            "torch_peak_mb": torch_peak_mb,
+            "memory_start": self.memory_start,
+            "admission": self.admission,
+            "model_cache": {
+                "hits": MODEL_CACHE.hits - self._cache_counts[0],
+                "misses": MODEL_CACHE.misses - self._cache_counts[1],
+            },
+            "result_cache_hit": self.result_cache_hit,
+            "audio_cache_hit": self.audio_cache_hit,
+            "speculative": self.speculative,
+            "cascade": self.cascade,
+            "guard": self.guard,
+            "language": self.language,
+            "live": self.live,
+        }
+
+class MetricsRecorder:
+    """Schreibt Job-Metriken als JSON Lines und summiert sie für den Prometheus-Endpunkt"""
+    def __init__(self, path=None):
+        self.path = path or METRICS_FILE
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)  # (Name, Labels) -> Wert
+        self._server = None
+
+    def record(self, record):
+        with self._lock:
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                except OSError:
+                    pass  # Metriken dürfen einen Job nicht scheitern lassen
+
+            values = self._values
+            values[("jobs_total", (("status", record["status"]),))] += 1
+            values[("audio_seconds_total", ())] += record["audio_seconds"] or 0.0
+            values[("processing_seconds_total", ())] += record["wall_seconds"] or 0.0
+            for stage, seconds in record["stages"].items():
+                values[("stage_seconds_total", (("stage", stage),))] += seconds
+            values[("decoded_tokens_total", ())] += record["decoded_tokens"]
+            values[("model_cache_hits_total", ())] += record["model_cache"]["hits"]
+            values[("model_cache_misses_total", ())] += record["model_cache"]["misses"]
+            values[("result_cache_hits_total", ())] += int(record["result_cache_hit"])
+            values[("audio_cache_hits_total", ())] += int(record["audio_cache_hit"])
+            if record["admission"]:
+                values[("admission_wait_seconds_total", ())] += record["admission"]["waited_seconds"]
+                values[("downgraded_jobs_total", ())] += int(bool(record["admission"]["changes"]))
+            if record["guard"]:
+                for reason in ("repetition", "token_rate"):
+                    values[("decode_guard_cutoffs_total", (("reason", reason),))] += record["guard"][reason]
+                values[("decode_guard_unresolved_total", ())] += record["guard"]["unresolved"]
+            if record["cascade"]:
+                values[("cascade_escalated_seconds_total", ())] += record["cascade"]["escalated_seconds"]
+            if record["language"]:
+                labels = (("language", record["language"]["language"]), ("source", record["language"]["source"]))
+                values[("source_languages_total", labels)] += 1
+            for gauge, key in (
+                ("realtime_factor", "realtime_factor"),
+                ("tokens_per_second", "tokens_per_second"),
+                ("peak_rss_megabytes", "peak_rss_mb"),
+                ("torch_peak_megabytes", "torch_peak_mb"),
+            ):
+                if record[key] is not None:
+                    values[(gauge, ())] = record[key]
+
+    def render(self):
+        """Gibt die summierten Metriken im Prometheus-Textformat zurück"""
+        with self._lock:
+            values = dict(self._values)
+        lines = []
+        for name, (kind, description) in METRICS_HELP.items():
+            samples = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+            if not samples:
+                continue
+            lines.append(f"# HELP whisper_transcribe_{name} {description}")
+            lines.append(f"# TYPE whisper_transcribe_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"whisper_transcribe_{name}{{{label_text}}} {value:g}" if labels
+                             else f"whisper_transcribe_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Stellt /metrics in einem Hintergrund-Thread bereit"""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+METRICS = MetricsRecorder()
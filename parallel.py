@@ -0,0 +1,228 @@
+"""Parallele Abschnittsverarbeitung auf der CPU in eigenen Worker-Prozessen"""
+
+import multiprocessing
+import numpy as np
+import threading
+import concurrent.futures
+from core import (
+    DEFAULT_TASKS, FRAME_SAMPLES, HOP_LENGTH, SAMPLE_RATE, SILENCE_SEARCH_SECONDS, audio_range, frame_energy_db,
+    StageTimer, torch,
+)
+from resources import CHUNK_WORKER_OVERHEAD_MB, MODEL_CACHE, choose_pool_size
+from decoding import create_transcriber, detect_language
+
+CHUNK_MIN_SECONDS = 120
+CHUNK_MAX_SECONDS = 600
+CHUNK_IN_FLIGHT_EXTRA = 2  # Eingereichte Abschnitte über die Zahl der Worker hinaus
+
+def split_at_silence(audio, chunk_seconds):
+    """Teilt Audio in Abschnitte von ca. chunk_seconds, geschnitten an der leisesten Stelle
+
+    Gibt eine Liste von (Start, Ende) in Samples zurück.
+    """
+    total = len(audio)
+    chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk_samples * 1.5:
+        return [(0, total)]
+
+    energy = frame_energy_db(audio)
+    search_frames = int(SILENCE_SEARCH_SECONDS * SAMPLE_RATE) // FRAME_SAMPLES
+    bounds = [0]
+    position = chunk_samples
+    while position < total - chunk_samples // 2:
+        center = position // FRAME_SAMPLES
+        first = max(0, center - search_frames)
+        last = min(len(energy), center + search_frames)
+        cut = (first + int(np.argmin(energy[first:last]))) * FRAME_SAMPLES if last > first else position
+        bounds.append(cut)
+        position = cut + chunk_samples
+    bounds.append(total)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def offset_results(results, offset, merged=None):
+    """Verschiebt die Segmente eines Abschnitts um offset Sekunden und hängt sie an merged an"""
+    merged = merged if merged is not None else {}
+    for name, result in results.items():
+        target = merged.setdefault(name, {"text": "", "segments": [], "language": result["language"]})
+        for segment in result["segments"]:
+            shifted = dict(
+                segment,
+                id=len(target["segments"]),
+                seek=segment["seek"] + round(offset * SAMPLE_RATE) // HOP_LENGTH,
+                start=segment["start"] + offset,
+                end=segment["end"] + offset,
+            )
+            if "words" in segment:
+                shifted["words"] = [
+                    dict(word, start=word["start"] + offset, end=word["end"] + offset) for word in segment["words"]
+                ]
+            target["segments"].append(shifted)
+        target["text"] += result["text"]
+    return merged
+
+# Zustand eines Worker-Prozesses (eigene Modellkopie)
+_CHUNK_WORKER = {}
+
+def _init_chunk_worker(model_id, num_threads, precision, cancel):
+    torch.set_num_threads(num_threads)
+    _CHUNK_WORKER["model"] = MODEL_CACHE.get(model_id, "cpu", precision)
+    _CHUNK_WORKER["precision"] = precision
+    _CHUNK_WORKER["cancel"] = cancel
+
+def _transcribe_chunk(audio, tasks, decoding):
+    transcriber = create_transcriber(_CHUNK_WORKER["model"], tasks, "cpu", _CHUNK_WORKER["precision"], **decoding)
+    results = transcriber.transcribe(audio, is_cancelled=_CHUNK_WORKER["cancel"].is_set)
+    return (
+        results, transcriber.timer.totals, transcriber.timer.counts, transcriber.decoded_tokens,
+        transcriber.guard_stats
+    )
+
+def _detect_chunk_language(chunks):
+    return detect_language(_CHUNK_WORKER["model"], chunks, "cpu", _CHUNK_WORKER["precision"])
+
+class ChunkPool:
+    """Hält einen Prozesspool mit geladenen Modellen über mehrere Jobs hinweg
+
+    Abgebrochen wird über ein gemeinsames Event, das die Worker zwischen zwei Fenstern
+    prüfen; so bleiben Prozesse und Modelle für den nächsten Job erhalten.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._pool = None
+        self._cancel = None
+
+    def get(self, model_id, workers, threads, precision="fp32"):
+        with self._lock:
+            key = (model_id, workers, threads, precision)
+            if self._key != key:
+                self._shutdown()
+                context = multiprocessing.get_context("spawn")
+                self._cancel = context.Event()
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=context,
+                    initializer=_init_chunk_worker,
+                    initargs=(model_id, threads, precision, self._cancel),
+                )
+                self._key = key
+            return self._pool
+
+    def cancel(self, futures):
+        """Bricht eingereichte Abschnitte ab und wartet, bis laufende nach ihrem aktuellen Fenster enden"""
+        with self._lock:
+            for future in futures:
+                future.cancel()
+            if self._cancel is None:
+                return
+            self._cancel.set()
+            try:
+                concurrent.futures.wait(futures)
+            finally:
+                self._cancel.clear()
+
+    def _shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._key = None
+        self._cancel = None
+
+CHUNK_POOL = ChunkPool()
+
+class ParallelChunkTranscriber:
+    """Transkribiert lange Aufnahmen abschnittsweise in mehreren CPU-Prozessen
+
+    Das Audio wird an stillen Stellen in unabhängige Abschnitte geteilt. Jeder
+    Worker-Prozess hält eine eigene Modellkopie und nutzt eine begrenzte Anzahl
+    Threads. Die Ergebnisse werden mit korrekt verschobenen Zeitstempeln in
+    ursprünglicher Reihenfolge zusammengesetzt.
+    """
+    def __init__(self, model_id, num_cores, tasks=None, precision="fp32", timer=None,
+                 condition_on_previous_text=False, batch_size=None, batch_memory_mb=None, word_timestamps=True,
+                 draft_model=None, max_workers=None):
+        self.model_id = model_id
+        self.tasks = tasks or DEFAULT_TASKS
+        self.precision = precision
+        # Ohne eigenes Budget bekommt jeder Worker-Prozess den für ihn reservierten Zusatzspeicher
+        self.decoding = {
+            "condition_on_previous_text": condition_on_previous_text,
+            "batch_size": batch_size,
+            "batch_memory_mb": batch_memory_mb or CHUNK_WORKER_OVERHEAD_MB,
+            "word_timestamps": word_timestamps,
+            "draft_model": draft_model,
+        }
+        self.timer = timer or StageTimer()
+        self.decoded_tokens = 0
+        self.guard_stats = {"repetition": 0, "token_rate": 0, "unresolved": 0}
+        self.workers, self.threads = choose_pool_size(model_id, num_cores, precision, max_workers)
+
+    def detect_language(self, chunks):
+        """Spracherkennung (siehe detect_language) in einem Worker-Prozess, ohne Modellkopie im Hauptprozess"""
+        pool = CHUNK_POOL.get(self.model_id, self.workers, self.threads, self.precision)
+        return pool.submit(_detect_chunk_language, [np.array(chunk, dtype=np.float32) for chunk in chunks]).result()
+
+    def transcribe(self, audio, is_cancelled=None, on_window=None, resume=None):
+        """Wie MultiTaskTranscriber.transcribe; on_window wird je fertigem Abschnitt in Reihenfolge aufgerufen"""
+        start_sample = round(resume["position"] * SAMPLE_RATE) if resume else 0
+        duration = (len(audio) - start_sample) / SAMPLE_RATE
+        chunk_seconds = min(CHUNK_MAX_SECONDS, max(CHUNK_MIN_SECONDS, duration / (2 * self.workers)))
+        chunks = [
+            (start + start_sample, end + start_sample)
+            for start, end in split_at_silence(audio_range(audio, start_sample), chunk_seconds)
+        ]
+
+        pool = CHUNK_POOL.get(self.model_id, self.workers, self.threads, self.precision)
+        futures = {}  # laufende Abschnitte -> Index
+        submitted = 0
+        chunk_results = [None] * len(chunks)
+        merged = {}
+        if resume:
+            for name, config in self.tasks.items():
+                segments = list(resume["segments"].get(name, []))
+                merged[name] = {
+                    "text": "".join(segment["text"] for segment in segments),
+                    "segments": segments,
+                    "language": config["language"],
+                }
+        flushed = 0
+        while flushed < len(chunks):
+            if is_cancelled and is_cancelled():
+                CHUNK_POOL.cancel(futures)
+                raise InterruptedError("Transkription wurde abgebrochen")
+            # Abschnitte erst kurz vor dem Einreichen lesen, damit nur die laufenden im Speicher liegen
+            while submitted < len(chunks) and len(futures) < self.workers + CHUNK_IN_FLIGHT_EXTRA:
+                start, end = chunks[submitted]
+                chunk = np.array(audio[start:end], dtype=np.float32)
+                futures[pool.submit(_transcribe_chunk, chunk, self.tasks, self.decoding)] = submitted
+                submitted += 1
+            done, _ = concurrent.futures.wait(futures, timeout=0.5, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                results, totals, counts, tokens, guard_stats = future.result()
+                chunk_results[futures.pop(future)] = results
+                for stage, seconds in totals.items():
+                    self.timer.totals[stage] = self.timer.totals.get(stage, 0.0) + seconds
+                    self.timer.counts[stage] = self.timer.counts.get(stage, 0) + counts[stage]
+                self.decoded_tokens += tokens
+                for reason, count in guard_stats.items():
+                    self.guard_stats[reason] += count
+
+            # Fertige Abschnitte in Reihenfolge übernehmen
+            while flushed < len(chunks) and chunk_results[flushed] is not None:
+                start, end = chunks[flushed]
+                counts = {name: len(result["segments"]) for name, result in merged.items()}
+                offset_results(chunk_results[flushed], start / SAMPLE_RATE, merged)
+                if on_window:
+                    on_window(end / SAMPLE_RATE, {
+                        name: result["segments"][counts.get(name, 0):] for name, result in merged.items()
+                    })
+                flushed += 1
+        return merged
+
+    def prompt_context(self):
+        # Abschnitte werden unabhängig dekodiert, es gibt keinen fortlaufenden Prompt
+        return {}
+
+    def task_positions(self):
+        # Alle Aufgaben stehen nach einem Abschnitt an dessen Ende (position)
+        return {}
@@ -0,0 +1,460 @@
+"""Modell-Cache, Speicherschätzung und Ressourcenplanung für Jobs"""
+
+import os
+import multiprocessing
+import threading
+import concurrent.futures
+import gc
+import json
+from collections import OrderedDict
+from contextlib import contextmanager
+from core import (
+    CACHE_DIR, DEFAULT_TASKS, MEL_PREFETCH_MAX_WINDOWS, N_FRAMES, PCM_FILE_THRESHOLD_SECONDS, SAMPLE_RATE,
+    WHISPER_MODELS, WINDOW_SAMPLES, WINDOW_SECONDS, cpu_supports_bf16, load_model, loaded_model_mb, model_memory_mb,
+    model_n_mels, process_rss_mb, psutil, torch,
+)
+
+class ModelCache:
+    """Hält geladene Whisper-Modelle prozessweit vor, damit Jobs sie wiederverwenden
+
+    Die Modelle werden nach (Modellname, Gerät, Datentyp) abgelegt. Überschreitet ein
+    neues Modell das Speicherbudget des Geräts, werden die am längsten ungenutzten
+    Modelle verworfen (LRU). Geladen wird außerhalb der globalen Sperre: Jobs mit
+    anderen Modellen greifen währenddessen weiter auf den Cache zu, Jobs mit demselben
+    Modell warten auf den laufenden Ladevorgang statt es ein zweites Mal zu laden.
+    """
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb
+        self._models = OrderedDict()  # (name, device, dtype) -> (model, memory_mb)
+        self._loading = {}  # (name, device, dtype) -> (Future, geschätzte MB) während des Ladens
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def budget_for(self, device):
+        """Gibt das Speicherbudget (in MB) für ein Gerät zurück
+
+        Ohne eigenes Budget dasselbe wie bei der Zulassung der Jobs (RESOURCES), damit
+        ein zugelassener Job mit mehreren Modellen (Kaskade, Entwurfsmodell) seine
+        Modelle nicht gegenseitig aus dem Cache verdrängt.
+        """
+        if self.budget_mb is not None:
+            return self.budget_mb
+        if device == "cuda":
+            return RESOURCES.gpu_budget()
+        return RESOURCES.ram_budget()
+
+    def is_loaded(self, model_name, device, dtype="fp32"):
+        with self._lock:
+            return (model_name, device, dtype) in self._models
+
+    def get(self, model_name, device, dtype="fp32"):
+        """Gibt das Modell aus dem Cache zurück oder lädt es bei Bedarf"""
+        key = (model_name, device, dtype)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key][0]
+            if key in self._loading:
+                # Ein anderer Job lädt dasselbe Modell bereits
+                self.hits += 1
+                return_when_loaded = self._loading[key][0]
+            else:
+                self.misses += 1
+                memory = RESOURCES.profiles.get(model_name, device, dtype).get("model_mb")
+                memory = memory or model_memory_mb(model_name, device, dtype)
+                self._evict(device, memory)
+                loading = concurrent.futures.Future()
+                self._loading[key] = (loading, memory)
+                return_when_loaded = None
+        if return_when_loaded is not None:
+            return return_when_loaded.result()
+        return self._load(key, loading)
+
+    def _load(self, key, loading):
+        model_name, device, dtype = key
+        try:
+            model = load_model(model_name, device, dtype)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+        # Gemessene Größe der Gewichte; der Tabellenwert gilt nur bis zur ersten Messung
+        memory = loaded_model_mb(model)
+        RESOURCES.profiles.record_model(model_name, device, dtype, memory)
+        with self._lock:
+            del self._loading[key]
+            self._models[key] = (model, memory)
+        loading.set_result(model)
+        return model
+
+    def release_others(self, keep):
+        """Verwirft alle Modelle außer den Schlüsseln in keep; gibt zurück, ob etwas freigegeben wurde"""
+        with self._lock:
+            keys = [key for key in self._models if key not in keep]
+            for key in keys:
+                del self._models[key]
+        if keys:
+            self._release_memory()
+        return bool(keys)
+
+    def loaded(self):
+        """Schlüssel (Modell, Gerät, Genauigkeit) der geladenen Modelle"""
+        with self._lock:
+            return list(self._models)
+
+    def warm_up(self, model_name, device, dtype="fp32"):
+        """Lädt ein Modell vorab, damit der erste Job nicht darauf warten muss"""
+        self.get(model_name, device, dtype)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        self._release_memory()
+
+    def _evict(self, device, memory_needed):
+        """Verwirft die am längsten ungenutzten Modelle, bis das neue Modell ins Budget passt"""
+        budget = self.budget_for(device)
+        used = sum(mem for (_, dev, _), (_, mem) in self._models.items() if dev == device)
+        used += sum(mem for (_, dev, _), (_, mem) in self._loading.items() if dev == device)
+        evicted = False
+        for key in list(self._models):
+            if used + memory_needed <= budget:
+                break
+            if key[1] != device:
+                continue
+            _, mem = self._models.pop(key)
+            used -= mem
+            evicted = True
+        if evicted:
+            self._release_memory()
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+MODEL_CACHE = ModelCache()
+
+# Speicher der Ergebnisse (Segmente, Wörter mit Zeitstempeln) je Stunde Audio und Aufgabe
+RESULT_MB_PER_HOUR = 15
+
+def audio_memory_mb(model_id, duration=None):
+    """Von der Aufnahmelänge abhängiger RAM-Anteil eines Jobs (Tabellenwert)
+
+    Das Audio wird fensterweise gelesen, daher wächst nur der kleine Rest mit der Dauer:
+    int16-PCM kurzer Aufnahmen im RAM, vorab berechnete Mel-Fenster und die Ergebnisse.
+    """
+    if not duration:
+        return 0.0
+    memory = 0.0
+    if duration < PCM_FILE_THRESHOLD_SECONDS:
+        memory += duration * SAMPLE_RATE * 2 / (1024 * 1024)
+    windows = min(MEL_PREFETCH_MAX_WINDOWS, int(-(-duration // WINDOW_SECONDS)))
+    memory += windows * model_n_mels(model_id) * N_FRAMES * 4 / (1024 * 1024)
+    memory += duration / 3600 * RESULT_MB_PER_HOUR * len(DEFAULT_TASKS)
+    return memory
+
+def job_memory_mb(model_id, device, precision="fp32", duration=None):
+    """Schätzt den RAM-Bedarf eines Jobs (Modell und Job), gemessen oder aus Tabellenwerten"""
+    return RESOURCES.estimate(model_id, device, precision, duration)["ram"]
+
+# Speicherbudget für Jobs: WHISPER_TRANSCRIBE_MEMORY_MB oder ein Anteil des physischen RAM
+MEMORY_BUDGET_MB = float(os.environ.get("WHISPER_TRANSCRIBE_MEMORY_MB") or 0) or None
+MEMORY_BUDGET_FRACTION = 0.85
+GPU_BUDGET_FRACTION = 0.9
+PROFILE_FILE = os.path.join(CACHE_DIR, "profiles.json")
+PROFILE_MAX_SAMPLES = 20  # Gemerkte Jobs je Profil
+PROFILE_SAFETY_FACTOR = 1.15  # Aufschlag auf gemessene Werte
+JOB_FALLBACK_MB = 500  # Job-Anteil ohne Messung (Aktivierungen, Batch, Decoder-Caches)
+MODEL_DOWNGRADE_FACTOR = 0.75  # Ein kleineres Modell muss spürbar weniger Speicher brauchen
+ADMISSION_POLL_SECONDS = 1.0
+
+class ResourceProfiles:
+    """Gemessener Speicherbedarf je (Modell, Gerät, Genauigkeit), gespeichert als JSON
+
+    model_mb ist die Größe der geladenen Gewichte (Parameter und Puffer, siehe
+    loaded_model_mb), samples enthält für die letzten Jobs (Audiostunden, Spitze über dem Stand vor dem
+    Job ohne Modell) in MB. Mehrere Prozesse teilen sich die Datei; sie wird bei jedem
+    Zugriff neu gelesen und atomar ersetzt.
+    """
+    def __init__(self, path=PROFILE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_id, device, precision):
+        return f"{model_id}|{device}|{precision}"
+
+    def get(self, model_id, device, precision):
+        with self._lock:
+            return self._load().get(self.key(model_id, device, precision), {})
+
+    def record_model(self, model_id, device, precision, memory_mb):
+        def update(profile):
+            profile["model_mb"] = round(memory_mb, 1)
+        self._update(self.key(model_id, device, precision), update)
+
+    def record_job(self, model_id, device, precision, hours, memory_mb):
+        def update(profile):
+            samples = profile.setdefault("samples", [])
+            samples.append([round(hours, 4), round(memory_mb, 1)])
+            del samples[:-PROFILE_MAX_SAMPLES]
+        self._update(self.key(model_id, device, precision), update)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update(self, key, change):
+        with self._lock:
+            profiles = self._load()
+            change(profiles.setdefault(key, {}))
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                temporary = f"{self.path}.{os.getpid()}.tmp"
+                with open(temporary, "w", encoding="utf-8") as f:
+                    json.dump(profiles, f, indent=1)
+                os.replace(temporary, self.path)
+            except OSError:
+                pass  # Profile dürfen einen Job nicht scheitern lassen
+
+def job_estimate_mb(samples, hours, fallback_mb, per_hour_mb):
+    """Schätzt den Job-Anteil (ohne Modell) als Sockel + Audiostunden * Zuwachs aus gemessenen Jobs
+
+    Der Zuwachs ist die Steigung der Messwerte (mindestens per_hour_mb), der Sockel der
+    größte Messwert abzüglich seines Stundenanteils. Ohne Messung gilt fallback_mb.
+    """
+    if not samples:
+        return fallback_mb + hours * per_hour_mb
+    slope = per_hour_mb
+    xs = [x for x, _ in samples]
+    if len(samples) >= 2 and max(xs) - min(xs) > 0.1:
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(y for _, y in samples) / len(samples)
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in samples)
+        slope = max(slope, covariance / sum((x - mean_x) ** 2 for x in xs))
+    base = max(y - slope * x for x, y in samples)
+    return (max(0.0, base) + hours * slope) * PROFILE_SAFETY_FACTOR
+
+class ResourceScheduler:
+    """Lässt Jobs nur zu, wenn ihr Speicherbedarf in das Budget passt
+
+    Der Bedarf kommt aus den ResourceProfiles (beim ersten Einsatz eines Modells
+    gemessen, vorher aus Tabellenwerten). Übersteigt ein Job das Budget auch ohne
+    andere Jobs, wird er vor der Dekodierung herabgestuft (plan): weniger
+    Worker-Prozesse, reduzierte CPU-Genauigkeit, ohne Kaskade, kleineres Modell. Passt er nur
+    gerade nicht, weil andere Jobs oder Prozesse Speicher belegen, wartet er (admit).
+    """
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, profiles=None):
+        self.budget_mb = budget_mb
+        self.profiles = profiles or ResourceProfiles()
+        self._lock = threading.Condition()
+        self._reserved = {}  # Worker -> (RAM-MB, GPU-MB)
+
+    def ram_budget(self):
+        if self.budget_mb is not None:
+            return self.budget_mb
+        return psutil.virtual_memory().total / (1024 * 1024) * MEMORY_BUDGET_FRACTION
+
+    @staticmethod
+    def gpu_budget():
+        return torch.cuda.get_device_properties(0).total_memory / (1024 * 1024) * GPU_BUDGET_FRACTION
+
+    def estimate(self, model_id, device, precision="fp32", duration=None, workers=1):
+        """Geschätzter Spitzenbedarf eines Jobs in MB: {"ram", "gpu", "model"}
+
+        Im Parallelmodus hält jeder der workers Prozesse eine eigene Modellkopie.
+        """
+        profile = self.profiles.get(model_id, device, precision)
+        model_mb = profile.get("model_mb")
+        model_mb = model_mb * PROFILE_SAFETY_FACTOR if model_mb else model_memory_mb(model_id, device, precision)
+        hours = (duration or 0) / 3600
+        if device == "cuda":
+            # Auf der GPU liegen Modell und Aktivierungen, im RAM nur Audio und Ergebnisse
+            job_gpu = job_estimate_mb(profile.get("samples"), hours, JOB_FALLBACK_MB, 0.0)
+            return {"ram": audio_memory_mb(model_id, duration), "gpu": model_mb + job_gpu, "model": model_mb}
+        per_hour = RESULT_MB_PER_HOUR * len(DEFAULT_TASKS)
+        fallback = JOB_FALLBACK_MB + audio_memory_mb(model_id, duration) - hours * per_hour
+        job_ram = job_estimate_mb(profile.get("samples"), hours, fallback, per_hour)
+        if workers > 1:
+            return {"ram": workers * (model_mb + CHUNK_WORKER_OVERHEAD_MB) + job_ram, "gpu": 0.0, "model": 0.0}
+        return {"ram": model_mb + job_ram, "gpu": 0.0, "model": model_mb}
+
+    def worker_estimate(self, worker):
+        duration = worker.audio_duration
+        workers = 1
+        if worker.parallel and duration and duration * SAMPLE_RATE > 2 * WINDOW_SAMPLES:
+            workers, _ = choose_pool_size(
+                worker.model_id, worker.num_cores_to_use or multiprocessing.cpu_count(), worker.precision,
+                worker.max_workers
+            )
+        estimate = self.estimate(worker.model_id, worker.device_type, worker.precision, duration, workers)
+        for extra_model in (worker.decoding["draft_model"], worker.cascade_model):
+            if extra_model and workers == 1:
+                # Entwurfs- und Kaskadenmodell liegen zusätzlich im Speicher
+                extra_mb = self.estimate(extra_model, worker.device_type, worker.precision)["model"]
+                device = "gpu" if worker.device_type == "cuda" else "ram"
+                estimate = dict(estimate, model=estimate["model"] + extra_mb)
+                estimate[device] += extra_mb
+        return estimate, workers
+
+    def fits_budget(self, estimate):
+        return estimate["ram"] <= self.ram_budget() and (estimate["gpu"] == 0 or estimate["gpu"] <= self.gpu_budget())
+
+    def plan(self, worker):
+        """Stuft einen Job herab, bis er ins Budget passt; gibt die Änderungen als Texte zurück
+
+        RuntimeError, wenn selbst das kleinste Modell nicht passt.
+        """
+        changes = []
+        while True:
+            estimate, workers = self.worker_estimate(worker)
+            if self.fits_budget(estimate):
+                return changes
+            if workers > 1:
+                # Weniger Worker-Prozesse, zuletzt ohne Parallelmodus
+                if workers > 2:
+                    worker.max_workers = workers - 1
+                    changes.append(f"{workers - 1} Worker-Prozesse")
+                else:
+                    worker.parallel = False
+                    changes.append("ohne Parallelmodus")
+                continue
+            if worker.device_type == "cpu" and worker.precision == "fp32":
+                precision = "bf16" if cpu_supports_bf16() else "int8"
+                worker.apply_resources(precision=precision)
+                changes.append(f"CPU-Genauigkeit {precision.upper()}")
+                continue
+            if worker.cascade_model:
+                worker.apply_resources(cascade=False)
+                changes.append("ohne Kaskade")
+                continue
+            smaller = [
+                info["name"] for info in sorted(WHISPER_MODELS.values(), key=lambda info: info["memory"])
+                if info["memory"] < model_memory_mb(worker.model_id, "cuda") * MODEL_DOWNGRADE_FACTOR
+            ]
+            if not smaller:
+                raise RuntimeError(
+                    f"Der Job passt auch herabgestuft nicht ins Speicherbudget "
+                    f"({estimate['ram']:.0f} MB benötigt, Budget {self.ram_budget():.0f} MB)"
+                )
+            worker.apply_resources(model_id=smaller[-1])
+            changes.append(f"Modell {smaller[-1]}")
+
+    @contextmanager
+    def admit(self, worker, timer, on_wait=None):
+        """Wartet, bis der Job neben den laufenden Jobs in den freien Speicher passt, und reserviert ihn
+
+        Der freie Speicher ist das Minimum aus Budget abzüglich RSS des Prozesses und
+        dem verfügbaren RAM des Systems, jeweils abzüglich der Reservierungen anderer
+        Jobs. Ein bereits geladenes Modell zählt nicht zum Bedarf. Wartet sonst kein Job
+        dieses Prozesses, werden andere zwischengespeicherte Modelle freigegeben.
+        Nicht benötigter Platz geht als Speicherbudget an das Batching.
+        """
+        estimate, workers = self.worker_estimate(worker)
+        loaded = 0.0
+        if workers == 1:
+            for model_id in (worker.model_id, worker.decoding["draft_model"], worker.cascade_model):
+                if model_id and MODEL_CACHE.is_loaded(model_id, worker.device_type, worker.precision):
+                    loaded += self.estimate(model_id, worker.device_type, worker.precision)["model"]
+        ram = estimate["ram"] - (loaded if worker.device_type == "cpu" else 0)
+        gpu = estimate["gpu"] - (loaded if worker.device_type == "cuda" else 0)
+        keep = {(worker.model_id, worker.device_type, worker.precision),
+                (worker.decoding["draft_model"], worker.device_type, worker.precision),
+                (worker.cascade_model, worker.device_type, worker.precision)}
+        waited = False
+        with timer.stage("admission"), self._lock:
+            while True:
+                budget_ram, system_ram, budget_gpu, system_gpu = self.free_memory(worker.device_type)
+                if ram <= min(budget_ram, system_ram) and gpu <= min(budget_gpu, system_gpu):
+                    break
+                if not self._reserved:
+                    if MODEL_CACHE.release_others(keep):
+                        continue
+                    # Allein im Prozess hilft Warten nur, wenn andere Prozesse Speicher freigeben
+                    if ram <= system_ram and gpu <= system_gpu:
+                        break
+                if worker.is_cancelled:
+                    raise InterruptedError("Transkription wurde abgebrochen")
+                if on_wait and not waited:
+                    if worker.device_type == "cuda" and gpu > min(budget_gpu, system_gpu):
+                        on_wait(gpu, min(budget_gpu, system_gpu))
+                    else:
+                        on_wait(ram, min(budget_ram, system_ram))
+                waited = True
+                self._lock.wait(ADMISSION_POLL_SECONDS)
+            self._reserved[worker] = (ram, gpu)
+            if worker.device_type == "cuda":
+                spare = min(budget_gpu, system_gpu) - gpu
+            else:
+                spare = min(budget_ram, system_ram) - ram
+            if worker.decoding["batch_memory_mb"] is None and workers == 1:
+                worker.decoding["batch_memory_mb"] = max(0.0, spare) * BATCH_MEMORY_FRACTION
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._reserved[worker]
+                self._lock.notify_all()
+
+    def free_memory(self, device):
+        """Freier Speicher nach Abzug der Reservierungen: RAM im Budget und im System, dasselbe für die GPU
+
+        Das Budget zählt den RSS dieses Prozesses, das System auch den Speicher anderer Prozesse.
+        """
+        reserved_ram = sum(ram for ram, _ in self._reserved.values())
+        reserved_gpu = sum(gpu for _, gpu in self._reserved.values())
+        budget_ram = self.ram_budget() - process_rss_mb() - reserved_ram
+        system_ram = psutil.virtual_memory().available / (1024 * 1024) - reserved_ram
+        budget_gpu = system_gpu = float("inf")
+        if device == "cuda":
+            free, _ = torch.cuda.mem_get_info()
+            budget_gpu = self.gpu_budget() - torch.cuda.memory_allocated() / (1024 * 1024) - reserved_gpu
+            system_gpu = free / (1024 * 1024) - reserved_gpu
+        return budget_ram, system_ram, budget_gpu, system_gpu
+
+    def learn(self, record):
+        """Übernimmt den gemessenen Spitzenbedarf eines fertigen Jobs (siehe JobMetrics.record) ins Profil
+
+        Parallel-, Cache- und spekulative Jobs zählen nicht: ihr Speicher liegt in anderen
+        Prozessen, fällt gar nicht an bzw. enthält ein zweites Modell. Wurde das Modell im
+        Job geladen, wird es abgezogen.
+        """
+        if record["status"] != "fertig" or record["parallel"] or record["result_cache_hit"] or record["speculative"]:
+            return
+        model_id, device, precision = record["model"], record["device"], record["precision"]
+        model_loaded = record["model_cache"]["misses"] > 0
+        model_mb = self.profiles.get(model_id, device, precision).get("model_mb", 0.0) if model_loaded else 0.0
+        if device == "cuda":
+            if record["torch_peak_mb"] is None:
+                return
+            memory = record["torch_peak_mb"] - record["memory_start"]["torch_mb"] - model_mb
+        else:
+            memory = record["peak_rss_mb"] - record["memory_start"]["rss_mb"] - model_mb
+        self.profiles.record_job(model_id, device, precision, (record["audio_seconds"] or 0) / 3600, max(0.0, memory))
+
+RESOURCES = ResourceScheduler()
+
+# Gebatchte Dekodierung und parallele Abschnittsverarbeitung auf der CPU
+BATCH_MEMORY_FRACTION = 0.5  # Anteil des freien (GPU-)Speichers für den Batch
+CHUNK_WORKER_THREADS = 4  # Richtwert für Threads pro Worker-Prozess
+CHUNK_WORKER_OVERHEAD_MB = 500  # Zusätzlicher Speicher pro Worker-Prozess
+
+def choose_pool_size(model_id, num_cores, precision="fp32", max_workers=None):
+    """Wählt Anzahl der Worker-Prozesse und Threads pro Worker nach Kernen und freiem RAM
+
+    max_workers begrenzt die Prozesse zusätzlich (vom ResourceScheduler herabgestuft).
+    """
+    per_worker_mb = RESOURCES.estimate(model_id, "cpu", precision)["model"] + CHUNK_WORKER_OVERHEAD_MB
+    available_mb = psutil.virtual_memory().available / (1024 * 1024)
+    workers_by_ram = int(available_mb * 0.8 // per_worker_mb)
+    workers_by_cores = num_cores // CHUNK_WORKER_THREADS
+    workers = max(1, min(workers_by_ram, workers_by_cores, max_workers or workers_by_cores))
+    return workers, max(1, num_cores // workers)
@@ -0,0 +1,399 @@
+"""Lokaler Transkriptionsdienst (HTTP auf localhost) und sein Client"""
+
+import os
+import threading
+import time
+import json
+import uuid
+import hmac
+import secrets
+import urllib.request
+import urllib.error
+import urllib.parse
+from http.server import BaseHTTPRequestHandler
+from collections import OrderedDict
+from core import (
+    CACHE_DIR, PRECISION_MODES, SUBTITLE_FORMATS, WHISPER_MODELS, cpu_supports_bf16, DeviceManager, language_code,
+    model_label,
+)
+from resources import MODEL_CACHE
+from metrics import METRICS
+from decoding import cascade_useful, draft_compatible
+from subtitles import SubtitleLayout
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = int(os.environ.get("WHISPER_TRANSCRIBE_PORT", "8765"))
+SERVICE_HEARTBEAT_SECONDS = 1.0  # Lebenszeichen im Ereignisstrom, wenn nichts passiert
+SERVICE_JOB_HISTORY = 200  # Abgeschlossene Jobs, die abrufbar bleiben
+FINAL_STATES = ("fertig", "fehler", "abgebrochen")
+SERVICE_TOKEN_FILE = os.path.join(CACHE_DIR, "service.token")
+SERVICE_MAX_BODY_BYTES = 1024 * 1024
+
+def read_service_token(path=SERVICE_TOKEN_FILE):
+    """Liest das Zugriffstoken des Dienstes; None, wenn die Datei fehlt
+
+    Eine Datei, die andere Benutzer lesen oder schreiben dürfen, wird abgelehnt (PermissionError).
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            stat = os.fstat(f.fileno())
+            if os.name != "nt" and (stat.st_uid != os.getuid() or stat.st_mode & 0o077):
+                raise PermissionError(f"{path} darf nur für den eigenen Benutzer lesbar sein (chmod 600)")
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def create_service_token(path=SERVICE_TOKEN_FILE):
+    """Gibt das vorhandene Zugriffstoken zurück oder legt ein neues mit Rechten 0600 an"""
+    token = read_service_token(path)
+    if token:
+        return token
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+def request_field(request, name, kinds, default=None):
+    """Feld einer Job-Anfrage mit Typprüfung (ValueError bei falschem Typ)"""
+    value = request.get(name)
+    if value is None:
+        return default
+    kinds = kinds if isinstance(kinds, tuple) else (kinds,)
+    # bool ist eine Unterklasse von int, zählt aber nicht als Zahl
+    if not isinstance(value, kinds) or (isinstance(value, bool) and bool not in kinds):
+        raise ValueError(f"Ungültiger Wert für {name}: {value!r}")
+    return value
+
+class ServiceJob:
+    """Ein Job des Dienstes mit seinem Ereignisprotokoll für die Clients"""
+    def __init__(self, job_id, request, priority):
+        self.id = job_id
+        self.request = request
+        self.worker = None
+        self.priority = priority
+        self.status = "wartend"
+        self.message = ""
+        self.progress = 0
+        self.created = time.time()
+        self.events = []
+        self.changed = threading.Condition()
+
+    def add_event(self, event):
+        with self.changed:
+            self.events.append(event)
+            self.changed.notify_all()
+
+    def set_progress(self, value):
+        self.progress = value
+        self.add_event({"type": "progress", "value": value})
+
+    def set_state(self, status, message):
+        # Status und Ereignis gemeinsam setzen, damit der Ereignisstrom das letzte Ereignis nicht verpasst
+        with self.changed:
+            self.status = status
+            self.message = message
+            self.events.append({"type": "state", "status": status, "message": message})
+            self.changed.notify_all()
+
+    def finished(self):
+        return self.status in FINAL_STATES
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "video": self.worker.video_path,
+            "output_base": self.worker.base_filename,
+            "model": self.worker.model_id,
+            "priority": self.priority,
+            "status": self.status,
+            "message": self.message,
+            "progress": self.progress,
+            "created": self.created,
+        }
+
+class TranscriptionService:
+    """Langlebiger Dienst: hält den MODEL_CACHE und arbeitet Jobs nach Priorität ab
+
+    Alle Clients (GUI, CLI) teilen sich dieselben geladenen Modelle. Die Jobs laufen
+    durch eine dauerhaft laufende Pipeline: create_pipeline(on_state) erzeugt sie,
+    create_worker(job, options) den Worker eines Jobs aus den geprüften Optionen.
+    """
+    def __init__(self, create_pipeline, create_worker):
+        self.device_manager = DeviceManager()
+        self.jobs = OrderedDict()
+        self._by_worker = {}
+        self._lock = threading.Lock()
+        self.pipeline = create_pipeline(self.job_state)
+        self.create_worker = create_worker
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.pipeline.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.pipeline.cancel()
+        self.pipeline.close()
+        self._thread.join()
+
+    def info(self):
+        return {
+            "cuda": self.device_manager.cuda_info,
+            "device": self.device_manager.current_device,
+            "cpu_cores": self.device_manager.cpu_cores,
+            "bf16": cpu_supports_bf16(),
+            "models": [f"{name} ({device}, {dtype})" for name, device, dtype in MODEL_CACHE.loaded()],
+        }
+
+    def submit(self, request):
+        """Legt einen Job aus einer Client-Anfrage an (ValueError bei ungültiger Anfrage)"""
+        if not isinstance(request, dict):
+            raise ValueError("Die Anfrage muss ein JSON-Objekt sein")
+        video_path = request_field(request, "video", str)
+        if not video_path or not os.path.isfile(video_path):
+            raise ValueError(f"Videodatei nicht gefunden: {video_path}")
+        output_base = request_field(request, "output_base", str) or os.path.splitext(video_path)[0]
+        if not os.path.isdir(os.path.dirname(os.path.abspath(output_base))):
+            raise ValueError(f"Ausgabeordner nicht gefunden: {os.path.dirname(output_base)}")
+        device = request_field(request, "device", str) or self.device_manager.current_device
+        if device not in ("cpu", "cuda"):
+            raise ValueError(f"Unbekanntes Gerät: {device}")
+        if device == "cuda" and not self.device_manager.cuda_info["available"]:
+            raise ValueError("CUDA ist nicht verfügbar")
+        precision = request_field(request, "precision", str, "fp32")
+        if precision not in PRECISION_MODES:
+            raise ValueError(f"Unbekannte Genauigkeit: {precision}")
+        formats = tuple(request_field(request, "formats", list) or SUBTITLE_FORMATS)
+        unknown = [fmt for fmt in formats if fmt not in SUBTITLE_FORMATS]
+        if unknown:
+            raise ValueError(f"Unbekanntes Untertitelformat: {', '.join(map(str, unknown))}")
+        subtitles = request_field(request, "subtitles", dict, {})
+        for name in subtitles:
+            request_field(subtitles, name, (int, float))
+        try:
+            layout = SubtitleLayout(**subtitles)
+        except TypeError as e:
+            raise ValueError(f"Ungültige Untertitel-Einstellungen: {e}")
+        model_name = model_label(request_field(request, "model", str, "medium"))
+        draft_model = request_field(request, "draft_model", str)
+        if draft_model:
+            model_label(draft_model)  # ValueError bei unbekanntem Modell
+        if draft_model and not draft_compatible(WHISPER_MODELS[model_name]["name"], draft_model):
+            raise ValueError(f"Entwurfsmodell {draft_model} passt nicht zum Modell")
+        cascade_model = request_field(request, "cascade_model", str)
+        if cascade_model:
+            model_label(cascade_model)  # ValueError bei unbekanntem Modell
+        if cascade_model and not cascade_useful(WHISPER_MODELS[model_name]["name"], cascade_model):
+            raise ValueError(f"Kaskadenmodell {cascade_model} muss größer als das Modell sein")
+        language = request_field(request, "language", str)
+        language = language_code(language) if language else None
+
+        options = {
+            "video_path": video_path,
+            "base_filename": output_base,
+            "model_name": model_name,
+            "device_type": device,
+            "keep_wav": request_field(request, "keep_wav", bool, False),
+            "num_cores_to_use": request_field(request, "num_cores", int) if device == "cpu" else None,
+            "parallel": request_field(request, "parallel", bool, False),
+            "vad": request_field(request, "vad", bool, False),
+            "precision": precision,
+            "condition_on_previous_text": request_field(request, "condition_on_previous_text", bool, False),
+            "batch_size": request_field(request, "batch_size", int),
+            "batch_memory_mb": request_field(request, "batch_memory_mb", (int, float)),
+            "word_timestamps": request_field(request, "word_timestamps", bool, True),
+            "subtitle_formats": formats,
+            "subtitle_layout": layout,
+            "draft_model": draft_model,
+            "language": language,
+            "cascade_model": cascade_model,
+        }
+        job = ServiceJob(uuid.uuid4().hex[:12], request, request_field(request, "priority", int, 0))
+        job.worker = worker = self.create_worker(job, options)
+
+        with self._lock:
+            self.jobs[job.id] = job
+            self._by_worker[worker] = job
+            self._trim_history()
+        self.pipeline.submit(worker, job.priority)
+        return job
+
+    def job_state(self, worker, status, message):
+        with self._lock:
+            job = self._by_worker.get(worker)
+            if job and status in FINAL_STATES:
+                del self._by_worker[worker]
+        if job:
+            job.set_state(status, message)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if not job.finished():
+            self.pipeline.cancel_worker(job.worker)
+        return job
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished()]
+        for job_id in finished[:max(0, len(finished) - SERVICE_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP-Schnittstelle des Dienstes
+
+    GET  /health, /info, /metrics, /jobs, /jobs/<id>, /jobs/<id>/events?from=N
+    POST /jobs (JSON-Anfrage), /jobs/<id>/cancel
+
+    Außer /health verlangen alle Pfade das Token des Dienstes (Authorization: Bearer <Token>),
+    POST-Anfragen zusätzlich Content-Type application/json. Ohne JSON-Pflicht könnte jede
+    Webseite im Browser des Benutzers Jobs anlegen.
+    """
+    service = None
+    token = None
+
+    def authorized(self):
+        expected = f"Bearer {self.token}".encode("utf-8")
+        return hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["health"]:
+            return self.send_json(200, {"status": "ok"})
+        if not self.authorized():
+            return self.send_json(401, {"error": "Token fehlt oder ist falsch"})
+        if parts == ["info"]:
+            return self.send_json(200, self.service.info())
+        if parts == ["metrics"]:
+            body = METRICS.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if parts == ["jobs"]:
+            return self.send_json(200, [job.summary() for job in list(self.service.jobs.values())])
+        job = self.service.jobs.get(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+        if job is None:
+            return self.send_json(404, {"error": "Nicht gefunden"})
+        if len(parts) == 2:
+            return self.send_json(200, job.summary())
+        if parts[2] == "events":
+            start = urllib.parse.parse_qs(url.query).get("from", ["0"])[0]
+            if not start.isdigit():
+                return self.send_json(400, {"error": f"Ungültiger Wert für from: {start}"})
+            return self.stream_events(job, int(start))
+        return self.send_json(404, {"error": "Nicht gefunden"})
+
+    def do_POST(self):
+        parts = [part for part in urllib.parse.urlsplit(self.path).path.split("/") if part]
+        if not self.authorized():
+            return self.send_json(401, {"error": "Token fehlt oder ist falsch"})
+        if self.headers.get_content_type() != "application/json":
+            return self.send_json(415, {"error": "Content-Type muss application/json sein"})
+        try:
+            if parts == ["jobs"]:
+                length = int(self.headers.get("Content-Length", 0))
+                if length > SERVICE_MAX_BODY_BYTES:
+                    return self.send_json(413, {"error": "Anfrage zu groß"})
+                request = json.loads(self.rfile.read(length) or b"{}")
+                job = self.service.submit(request)
+                return self.send_json(202, {"id": job.id})
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                return self.send_json(200, self.service.cancel(parts[1]).summary())
+        except KeyError:
+            return self.send_json(404, {"error": "Job nicht gefunden"})
+        except ValueError as e:
+            return self.send_json(400, {"error": str(e)})
+        return self.send_json(404, {"error": "Nicht gefunden"})
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, job, start):
+        """Sendet die Ereignisse eines Jobs als JSON Lines, bis der Job abgeschlossen ist"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.end_headers()
+        index = start
+        try:
+            while True:
+                with job.changed:
+                    job.changed.wait_for(lambda: len(job.events) > index, timeout=SERVICE_HEARTBEAT_SECONDS)
+                    events = job.events[index:]
+                    done = job.finished()
+                index += len(events)
+                lines = [json.dumps(event, ensure_ascii=False) for event in events] or ['{"type": "ping"}']
+                self.wfile.write(("\n".join(lines) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                if done and index == len(job.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client hat die Verbindung getrennt, der Job läuft weiter
+
+    def log_message(self, format, *args):
+        pass
+
+class ServiceClient:
+    """Schlanker Client für den lokalen Dienst (nur Standardbibliothek, ohne torch)
+
+    Ohne token wird das Token aus SERVICE_TOKEN_FILE gelesen, das der Dienst beim Start anlegt;
+    erst bei der ersten Anfrage, damit ein fehlender Dienst nicht schon den Client scheitern lässt.
+    """
+    def __init__(self, port=SERVICE_PORT, timeout=5.0, token=None):
+        self.base_url = f"http://{SERVICE_HOST}:{port}"
+        self.timeout = timeout
+        self.token = token
+
+    def headers(self):
+        if self.token is None:
+            self.token = read_service_token() or ""
+        return {"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+
+    def request(self, method, path, data=None, timeout=None):
+        body = json.dumps(data).encode("utf-8") if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=self.headers())
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read() or b"{}").get("error", str(e))) from None
+
+    def available(self):
+        """Prüft, ob ein Dienst läuft"""
+        try:
+            return self.request("GET", "/health", timeout=0.5)["status"] == "ok"
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+    def info(self):
+        return self.request("GET", "/info")
+
+    def submit(self, request):
+        """Übergibt einen Job und gibt sofort seine ID zurück"""
+        return self.request("POST", "/jobs", request)["id"]
+
+    def job(self, job_id):
+        return self.request("GET", f"/jobs/{job_id}")
+
+    def jobs(self):
+        return self.request("GET", "/jobs")
+
+    def cancel(self, job_id):
+        return self.request("POST", f"/jobs/{job_id}/cancel")
+
+    def events(self, job_id, start=0):
+        """Liefert die Ereignisse eines Jobs (Status, Fortschritt, Segmente), bis er abgeschlossen ist"""
+        request = urllib.request.Request(f"{self.base_url}/jobs/{job_id}/events?from={start}", headers=self.headers())
+        with urllib.request.urlopen(request, timeout=SERVICE_HEARTBEAT_SECONDS * 10) as response:
+            for line in response:
+                yield json.loads(line)
@@ -0,0 +1,239 @@
+"""Untertitel: Neuaufteilung der Segmente anhand der Wortzeitstempel und Ausgabeformate"""
+
+import re
+import json
+
+SUBTITLE_MAX_LINE_CHARS = 42
+SUBTITLE_MAX_LINES = 2
+SUBTITLE_MAX_CPS = 17.0  # Lesegeschwindigkeit in Zeichen pro Sekunde
+SUBTITLE_MIN_SECONDS = 1.0
+SUBTITLE_MAX_SECONDS = 7.0
+SUBTITLE_MAX_GAP_SECONDS = 1.0  # Längere Pausen zwischen Wörtern beginnen einen neuen Untertitel
+SUBTITLE_CUE_GAP_SECONDS = 0.05  # Mindestabstand beim Verlängern bis zum nächsten Untertitel
+SENTENCE_ENDINGS = (".", "!", "?", "…", "。", "！", "？")
+
+class SubtitleLayout:
+    """Grenzen für die Aufteilung der Untertitel (Zeichen pro Zeile, Zeilen, Lesegeschwindigkeit)"""
+    def __init__(self, max_line_chars=SUBTITLE_MAX_LINE_CHARS, max_lines=SUBTITLE_MAX_LINES,
+                 max_cps=SUBTITLE_MAX_CPS, min_seconds=SUBTITLE_MIN_SECONDS, max_seconds=SUBTITLE_MAX_SECONDS,
+                 max_gap_seconds=SUBTITLE_MAX_GAP_SECONDS):
+        self.max_line_chars = max_line_chars
+        self.max_lines = max_lines
+        self.max_cps = max_cps
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.max_gap_seconds = max_gap_seconds
+
+    def fits(self, text):
+        return len(wrap_tokens(text.split(), self.max_line_chars)) <= self.max_lines
+
+    def wrap(self, text):
+        """Bricht text in möglichst gleich lange Zeilen um (None, wenn er nicht in max_lines passt)"""
+        tokens = text.split()
+        lines = wrap_tokens(tokens, self.max_line_chars)
+        if len(lines) > self.max_lines:
+            return None
+        # Kleinste Zeilenbreite mit derselben Zeilenzahl suchen, damit die Zeilen ausgeglichen sind
+        for width in range(-(-len(text) // len(lines)), self.max_line_chars):
+            balanced = wrap_tokens(tokens, width)
+            if len(balanced) <= len(lines):
+                return balanced
+        return lines
+
+def wrap_tokens(tokens, width):
+    lines = []
+    for token in tokens:
+        if lines and len(lines[-1]) + 1 + len(token) <= width:
+            lines[-1] += " " + token
+        else:
+            lines.append(token)
+    return lines or [""]
+
+def segment_words(segment):
+    """Wörter eines Segments mit Zeitstempeln
+
+    Segmente ohne Wortzeitstempel (ältere Cache-Einträge, --no-word-timestamps) werden
+    nach Zeichenanteil gleichmäßig über die Segmentdauer verteilt.
+    """
+    if segment.get("words"):
+        return segment["words"]
+    parts = re.findall(r"\s*\S+", segment["text"])
+    total = sum(len(part.strip()) for part in parts)
+    words = []
+    position = segment["start"]
+    seconds_per_char = (segment["end"] - segment["start"]) / total if total else 0.0
+    for part in parts:
+        end = position + len(part.strip()) * seconds_per_char
+        words.append({"word": part, "start": position, "end": end})
+        position = end
+    return words
+
+class SubtitleSegmenter:
+    """Teilt Wörter fortlaufend in Untertitel auf
+
+    Ein Untertitel endet vor einer langen Pause, wenn die maximale Dauer oder die
+    Zeilen überschritten würden, oder nach einem Satzende, sobald er eine Zeile füllt.
+    Ein fertiger Untertitel wird erst ausgegeben, wenn der nächste beginnt: Bis dahin
+    kann sein Ende für die Lesegeschwindigkeit in die folgende Pause verlängert werden.
+    """
+    def __init__(self, layout=None):
+        self.layout = layout or SubtitleLayout()
+        self.words = []
+        self.pending = None
+
+    def add(self, segments):
+        """Nimmt neue Segmente auf und gibt die dadurch abgeschlossenen Untertitel zurück"""
+        cues = []
+        for segment in segments:
+            for word in segment_words(segment):
+                if not word["word"].strip():
+                    continue
+                if self.words and self.breaks_before(word):
+                    cues.extend(self.close_cue())
+                self.words.append(word)
+        return cues
+
+    def finish(self):
+        cues = self.close_cue()
+        if self.pending:
+            cues.append(self.extend(self.pending, None))
+            self.pending = None
+        return cues
+
+    def breaks_before(self, word):
+        layout = self.layout
+        previous = self.words[-1]
+        if word["start"] - previous["end"] > layout.max_gap_seconds:
+            return True
+        if word["end"] - self.words[0]["start"] > layout.max_seconds:
+            return True
+        text = self.text()
+        if not layout.fits(text + word["word"]):
+            return True
+        return previous["word"].strip().endswith(SENTENCE_ENDINGS) and len(text.strip()) >= layout.max_line_chars
+
+    def text(self):
+        return "".join(word["word"] for word in self.words)
+
+    def close_cue(self):
+        if not self.words:
+            return []
+        text = self.text().strip()
+        cue = {
+            "start": self.words[0]["start"],
+            "end": self.words[-1]["end"],
+            "text": text,
+            "lines": self.layout.wrap(text) or [text],
+        }
+        self.words = []
+        cues = [self.extend(self.pending, cue["start"])] if self.pending else []
+        self.pending = cue
+        return cues
+
+    def extend(self, cue, next_start):
+        """Verlängert einen Untertitel auf Mindestdauer und Lesezeit, höchstens bis zum nächsten"""
+        layout = self.layout
+        needed = max(layout.min_seconds, len(cue["text"]) / layout.max_cps)
+        end = max(cue["end"], cue["start"] + needed)
+        if next_start is not None:
+            end = min(end, next_start - SUBTITLE_CUE_GAP_SECONDS)
+        cue["end"] = max(cue["end"], end)
+        return cue
+
+def format_timestamp(seconds, separator=","):
+    """Formatiert Sekunden als HH:MM:SS,mmm (SRT) bzw. HH:MM:SS.mmm (WebVTT)"""
+    milliseconds = max(0, round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+def srt_cue(index, cue):
+    lines = "\n".join(cue["lines"])
+    return f"{index}\n{format_timestamp(cue['start'])} --> {format_timestamp(cue['end'])}\n{lines}\n\n"
+
+def vtt_cue(index, cue):
+    lines = "\n".join(cue["lines"])
+    return f"{format_timestamp(cue['start'], '.')} --> {format_timestamp(cue['end'], '.')}\n{lines}\n\n"
+
+SUBTITLE_RENDERERS = {"srt": srt_cue, "vtt": vtt_cue}
+SUBTITLE_HEADERS = {"srt": "", "vtt": "WEBVTT\n\n"}
+
+class SubtitleOutput:
+    """Schreibt die Untertitel einer Aufgabe in alle gewünschten Formate
+
+    SRT und WebVTT werden fortlaufend geschrieben, JSON (Segmente mit Wörtern und
+    Untertitel) beim Schließen aus denselben Daten im Speicher.
+    """
+    def __init__(self, files, layout=None, language=None):
+        self.segmenter = SubtitleSegmenter(layout)
+        self.language = language
+        self.streams = {}
+        for fmt, path in files.items():
+            if fmt in SUBTITLE_RENDERERS:
+                self.streams[fmt] = open(path, "w", encoding="utf-8")
+                self.streams[fmt].write(SUBTITLE_HEADERS[fmt])
+        self.json_file = files.get("json")
+        self.segments = []
+        self.cues = []
+
+    def write(self, segments):
+        self.segments.extend(segments)
+        self.emit(self.segmenter.add(segments))
+
+    def emit(self, cues):
+        for cue in cues:
+            self.cues.append(cue)
+            for fmt, stream in self.streams.items():
+                stream.write(SUBTITLE_RENDERERS[fmt](len(self.cues), cue))
+
+    def flush(self):
+        for stream in self.streams.values():
+            stream.flush()
+
+    def close(self):
+        self.emit(self.segmenter.finish())
+        for stream in self.streams.values():
+            stream.close()
+        if self.json_file:
+            with open(self.json_file, "w", encoding="utf-8") as f:
+                json.dump({
+                    "language": self.language,
+                    "segments": [
+                        {key: segment[key] for key in ("start", "end", "text", "words") if key in segment}
+                        for segment in self.segments
+                    ],
+                    "cues": self.cues,
+                }, f, ensure_ascii=False)
+
+class StreamingWriter:
+    """Schreibt Segmente direkt nach dem Dekodieren in die Ausgabedateien
+
+    Bei Abbruch oder Absturz bleibt so die bis dahin dekodierte Ausgabe erhalten.
+    subtitle_files bildet jede Aufgabe auf {Format: Pfad} ab (siehe SUBTITLE_FORMATS); der
+    Name der Aufgabe ist die Sprache ihrer Ausgabe (siehe job_tasks).
+    """
+    def __init__(self, text_files, subtitle_files, layout=None):
+        self.text_files = {name: open(path, "w", encoding="utf-8") for name, path in text_files.items()}
+        self.subtitles = {
+            name: SubtitleOutput(files, layout, name)
+            for name, files in subtitle_files.items()
+        }
+
+    def write(self, segments_by_task):
+        for name, segments in segments_by_task.items():
+            text_file = self.text_files.get(name)
+            if text_file:
+                text_file.write("".join(segment["text"] for segment in segments))
+            if name in self.subtitles:
+                self.subtitles[name].write(segments)
+        for f in self.text_files.values():
+            f.flush()
+        for subtitle in self.subtitles.values():
+            subtitle.flush()
+
+    def close(self):
+        for f in self.text_files.values():
+            f.close()
+        for subtitle in self.subtitles.values():
+            subtitle.close()
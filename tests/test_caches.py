@@ -0,0 +1,119 @@
+import json
+
+import numpy as np
+
+from core import PcmAudio
+from caches import AudioCache, JobCheckpoint, ResultCache, decode_options_key
+
+
+def pcm_audio(samples):
+    audio = PcmAudio(use_file=False, capacity=len(samples))
+    audio.append(samples)
+    return audio
+
+
+def test_decode_options_key_covers_result_affecting_options():
+    base = decode_options_key()
+    assert decode_options_key() == base
+    for options in ({"vad": True}, {"precision": "int8"}, {"condition_on_previous_text": True},
+                    {"word_timestamps": False}, {"cascade_model": "large-v3"}):
+        assert decode_options_key(**options) != base, options
+    # Ohne Kaskade bleibt der Schlüssel bisheriger Ergebnisse unverändert
+    assert "cascade" not in base
+    json.dumps(base)  # Muss als Cache-Schlüssel serialisierbar sein
+
+
+def test_result_cache_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = cache.key("abc", "small", "de", decode_options_key())
+    assert cache.key("abc", "small", "de", decode_options_key(vad=True)) != key
+    assert cache.get(key) is None
+
+    result = {"text": "Hallo Welt", "segments": [{"start": 0.0, "end": 1.5, "text": "Hallo Welt"}]}
+    cache.put(key, {"model": "small", "audio_seconds": 12.5}, result)
+    assert cache.get(key) == result
+    assert cache.get_entry(key) == {"meta": {"model": "small", "audio_seconds": 12.5}, "result": result}
+    (path, _, _), = cache.entries()
+    assert cache.read_meta(path)["audio_seconds"] == 12.5
+
+
+def test_result_cache_source_and_language_index(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"video")
+    assert cache.lookup_source(str(video)) is None
+    cache.remember_source(str(video), "abc")
+    assert cache.lookup_source(str(video)) == "abc"
+    cache.remember_language("abc", "small", {"language": "en", "probability": 0.9})
+    assert cache.lookup_language("abc", "small")["language"] == "en"
+    assert cache.lookup_language("abc", "base") is None
+
+    # Eine veränderte Quelldatei ist nicht mehr bekannt
+    video.write_bytes(b"anderes video")
+    assert cache.lookup_source(str(video)) is None
+
+
+def test_result_cache_prune_removes_oldest(tmp_path):
+    cache = ResultCache(str(tmp_path), max_mb=1000)
+    for index in range(3):
+        cache.put(f"key{index}", {}, {"text": "x" * 1000})
+    assert cache.prune(max_mb=0) == 3
+    assert cache.entries() == []
+
+
+def test_audio_cache_round_trip(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    samples = (np.sin(np.arange(16000) / 10) * 20000).astype(np.int16)
+    assert cache.open("abc") is None
+    cache.put("abc", pcm_audio(samples))
+
+    audio = cache.open("abc")
+    try:
+        assert len(audio) == len(samples)
+        np.testing.assert_array_equal(audio[100:200], samples[100:200].astype(np.float32) / 32768.0)
+    finally:
+        audio.close()
+    (fingerprint, size, _), = cache.entries()
+    assert fingerprint == "abc" and size == len(samples) * 2
+    assert cache.prune(max_mb=0) == 1
+    assert cache.open("abc") is None
+
+
+def test_audio_cache_disabled(tmp_path):
+    cache = AudioCache(str(tmp_path), max_mb=0)
+    cache.put("abc", pcm_audio(np.zeros(100, dtype=np.int16)))
+    assert cache.open("abc") is None
+
+
+def test_job_checkpoint_resume(tmp_path):
+    path = str(tmp_path / "video.checkpoint.jsonl")
+    key = {"audio": "abc", "model": "small"}
+    checkpoint = JobCheckpoint(path, key)
+    assert checkpoint.load() is None
+
+    checkpoint.start()
+    checkpoint.save(30.0, {"de": [{"start": 0.0, "end": 2.0, "text": "eins"}], "en": []}, {"de": [1, 2]})
+    checkpoint.save(60.0, {"de": [{"start": 31.0, "end": 33.0, "text": "zwei"}]}, {"de": [3]}, {"de": 64.2, "en": 60.0})
+    checkpoint.close()
+    with open(path, "ab") as f:
+        f.write(b'{"position": 90.0, "segm')  # Absturz mitten im Schreiben
+
+    resume = JobCheckpoint(path, key).load()
+    assert resume["position"] == 60.0
+    assert resume["positions"] == {"de": 64.2, "en": 60.0}
+    assert resume["prompt"] == {"de": [3]}
+    assert [segment["text"] for segment in resume["segments"]["de"]] == ["eins", "zwei"]
+
+    # Fortsetzen entfernt die abgeschnittene Zeile und hängt weitere Fenster an
+    checkpoint = JobCheckpoint(path, key)
+    checkpoint.start(resume)
+    checkpoint.save(90.0, {"de": [{"start": 61.0, "end": 62.0, "text": "drei"}]}, {"de": [4]})
+    checkpoint.close()
+    resume = JobCheckpoint(path, key).load()
+    assert resume["position"] == 90.0
+    assert len(resume["segments"]["de"]) == 3
+
+    # Ein anderer Schlüssel (z. B. anderes Modell) verwirft den Checkpoint
+    assert JobCheckpoint(path, {"audio": "abc", "model": "base"}).load() is None
+    checkpoint.remove()
+    assert JobCheckpoint(path, key).load() is None
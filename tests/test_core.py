@@ -0,0 +1,30 @@
+import numpy as np
+
+from core import PcmAudio, output_suffixes
+
+
+def test_pcm_audio_reads_and_closes_file(tmp_path):
+    path = tmp_path / "audio.pcm"
+    path.write_bytes(np.array([0, 16384, -16384, 32767], dtype=np.int16).tobytes())
+    with PcmAudio.open(str(path)) as audio:
+        assert len(audio) == 4
+        np.testing.assert_allclose(audio[1:3], [0.5, -0.5])
+        range_ = audio.range(2)
+        range_.close()  # Eine Sicht schließt die Quelle nicht
+        assert not audio.file.closed
+    assert audio.file.closed
+
+
+def test_pcm_audio_in_memory_grows(tmp_path):
+    with PcmAudio(use_file=False, capacity=2) as audio:
+        audio.append(np.array([1, 2, 3], dtype=np.int16))
+        audio.append(np.array([4], dtype=np.int16))
+        np.testing.assert_array_equal(audio[:] * 32768, [1, 2, 3, 4])
+        audio.save(str(tmp_path / "copy.pcm"))
+    assert (tmp_path / "copy.pcm").read_bytes() == np.array([1, 2, 3, 4], dtype=np.int16).tobytes()
+
+
+def test_english_srt_keeps_base_name():
+    assert output_suffixes(("srt", "vtt"), ("de", "en")) == (
+        "_de.txt", "_en.txt", "_de.srt", "_de.vtt", ".srt", "_en.vtt"
+    )
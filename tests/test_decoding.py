@@ -0,0 +1,136 @@
+import os
+import types
+
+import numpy as np
+import pytest
+
+from core import FRAME_SAMPLES, SAMPLE_RATE, TIME_PRECISION, WINDOW_SAMPLES, prefetch_mel
+from decoding import BatchedTranscriber, GuardedRow, MultiTaskTranscriber, window_samples
+
+EOT = 50257
+TIMESTAMP_BEGIN = 50364
+
+
+def timestamp(seconds):
+    return TIMESTAMP_BEGIN + round(seconds / TIME_PRECISION)
+
+
+def feed(row, tokens):
+    for token in tokens:
+        row.feed(token)
+    return row
+
+
+def test_guard_accepts_plausible_speech():
+    row = GuardedRow(EOT, TIMESTAMP_BEGIN, 30.0)
+    tokens = []
+    for segment in range(5):
+        tokens += [timestamp(segment * 5.0)] + list(range(100 + segment * 20, 120 + segment * 20))
+        tokens += [timestamp(segment * 5.0 + 4.0)]
+    feed(row, tokens + [EOT])
+    assert row.cut is None
+
+
+def test_guard_cuts_repetition_loop_after_first_copy():
+    row = feed(GuardedRow(EOT, TIMESTAMP_BEGIN, 30.0), [timestamp(0.0)] + [1, 2, 3] * 5)
+    assert row.cut == "repetition"
+    assert row.tokens[:row.keep] == [timestamp(0.0), 1, 2, 3]
+
+
+def test_guard_cuts_dense_closed_segment():
+    tokens = [timestamp(0.0)] + list(range(100, 130)) + [timestamp(1.0)]
+    row = feed(GuardedRow(EOT, TIMESTAMP_BEGIN, 30.0), tokens)
+    assert row.cut == "token_rate"
+    assert row.keep == 0
+
+
+def test_guard_cuts_open_segment_that_cannot_fit_window():
+    row = GuardedRow(EOT, TIMESTAMP_BEGIN, 30.0)
+    feed(row, [timestamp(0.0)] + list(range(100, 110)) + [timestamp(2.0), timestamp(29.5)])
+    for count, token in enumerate(range(200, 240), 1):
+        if row.feed(token):
+            break
+    # 15 Tokens pro Sekunde für die halbe Sekunde bis zum Fensterende plus 8 Tokens Spielraum
+    assert row.cut == "token_rate" and count == 16
+    assert row.tokens[:row.keep] == [timestamp(0.0)] + list(range(100, 110)) + [timestamp(2.0)]
+    assert row.feed(EOT) == "token_rate"
+
+
+def split(tokens, seek=0, samples=WINDOW_SAMPLES):
+    tokenizer = types.SimpleNamespace(
+        timestamp_begin=TIMESTAMP_BEGIN, eot=EOT, decode=lambda tokens: " ".join(map(str, tokens))
+    )
+    result = types.SimpleNamespace(
+        tokens=tokens, temperature=0.0, avg_logprob=-0.2, compression_ratio=1.2, no_speech_prob=0.1
+    )
+    return MultiTaskTranscriber.split_segments(types.SimpleNamespace(tokenizer=tokenizer), result, seek, samples)
+
+
+def test_split_segments_stops_at_last_complete_segment():
+    # Das dritte Segment wird am Fensterende angeschnitten und beginnt im nächsten Fenster neu
+    tokens = [timestamp(0.0), 100, 101, timestamp(3.0), timestamp(3.0), 102, timestamp(29.5), timestamp(29.5), 103]
+    segments, consumed, single_timestamp_ending = split(tokens, seek=10 * SAMPLE_RATE)
+    assert [(segment["start"], segment["end"], segment["text"]) for segment in segments] == [
+        (10.0, 13.0, "100 101"), (13.0, 39.5, "102"),
+    ]
+    assert consumed == round(29.5 * SAMPLE_RATE) and not single_timestamp_ending
+
+    tokens = [timestamp(0.0), 100, timestamp(3.0), timestamp(4.0), 101, 102]
+    segments, consumed, _ = split(tokens)
+    assert [segment["end"] for segment in segments] == [3.0]
+    assert consumed == 3 * SAMPLE_RATE
+
+
+def test_split_segments_single_timestamp_ending_consumes_window():
+    tokens = [timestamp(0.0), 100, timestamp(3.0), timestamp(3.0), 101, timestamp(7.0)]
+    segments, consumed, single_timestamp_ending = split(tokens, samples=20 * SAMPLE_RATE)
+    assert [(segment["start"], segment["end"]) for segment in segments] == [(0.0, 3.0), (3.0, 7.0)]
+    assert consumed == 20 * SAMPLE_RATE and single_timestamp_ending
+
+
+def test_split_segments_without_timestamp_pair():
+    segments, consumed, _ = split([timestamp(0.0), 100, 101, timestamp(4.0)], samples=20 * SAMPLE_RATE)
+    assert [(segment["start"], segment["end"]) for segment in segments] == [(0.0, 4.0)]
+    assert consumed == 20 * SAMPLE_RATE
+
+    # Ohne Endzeitstempel reicht das einzige Segment bis zum Fensterende, wie in whisper.transcribe
+    segments, _, _ = split([timestamp(0.0), 100, 101], samples=20 * SAMPLE_RATE)
+    assert [(segment["start"], segment["end"]) for segment in segments] == [(0.0, 20.0)]
+
+
+def test_window_samples_is_whole_frames_up_to_30_seconds():
+    assert window_samples(100 * SAMPLE_RATE, 0) == WINDOW_SAMPLES
+    assert window_samples(100 * SAMPLE_RATE + 100, 90 * SAMPLE_RATE) == 10 * SAMPLE_RATE
+    assert window_samples(100, 0) == 0
+
+
+def test_batched_window_ends_in_quietest_frame():
+    audio = np.full(70 * SAMPLE_RATE, 0.3, dtype=np.float32)
+    audio[27 * SAMPLE_RATE:27 * SAMPLE_RATE + FRAME_SAMPLES] = 0.0
+    assert BatchedTranscriber.window_end(audio, len(audio), 0) == 27 * SAMPLE_RATE
+    assert BatchedTranscriber.window_end(audio, len(audio), 50 * SAMPLE_RATE) == len(audio)
+
+
+@pytest.mark.skipif(
+    not os.environ.get("WHISPER_TRANSCRIBE_TEST_CLIP"),
+    reason="WHISPER_TRANSCRIBE_TEST_CLIP (Aufnahme mit Sprache über die 30-Sekunden-Grenze) nicht gesetzt",
+)
+def test_sequential_engine_matches_whisper_transcribe():
+    whisper = pytest.importorskip("whisper")
+    model = whisper.load_model(os.environ.get("WHISPER_TRANSCRIBE_TEST_MODEL", "tiny"), device="cpu")
+    language = os.environ.get("WHISPER_TRANSCRIBE_TEST_LANGUAGE", "en")
+    audio = whisper.load_audio(os.environ["WHISPER_TRANSCRIBE_TEST_CLIP"])
+
+    expected = model.transcribe(
+        audio, language=language, word_timestamps=True, condition_on_previous_text=True, fp16=False
+    )
+    engine = MultiTaskTranscriber(model, {language: {"task": "transcribe", "language": language}})
+    result = engine.transcribe(audio, mel=prefetch_mel(audio, model.dims.n_mels))[language]
+
+    def spans(segments):
+        return [
+            (round(segment["start"], 2), round(segment["end"], 2), segment["text"].strip())
+            for segment in segments if segment["text"].strip()
+        ]
+    assert any(segment["start"] < 30.0 < segment["end"] for segment in expected["segments"])
+    assert spans(result["segments"]) == spans(expected["segments"])
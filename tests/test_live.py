@@ -0,0 +1,54 @@
+import contextlib
+import types
+
+import numpy as np
+import pytest
+
+import live
+from core import SAMPLE_RATE
+from live import LiveAudioStream, LiveTranscriber
+
+
+class ScriptedTranscriber(LiveTranscriber):
+    """LiveTranscriber ohne Modell: decode übernimmt vorgegebene Segmente"""
+    def __init__(self, commits):
+        self.step = SAMPLE_RATE
+        self.position = 0
+        self.latencies = []
+        self.commits = list(commits)
+        self.state = types.SimpleNamespace(result=lambda: {})
+
+    def decode(self, stream, end, final):
+        segments = self.commits.pop(0) if self.commits else []
+        self.position = round(segments[-1]["end"] * SAMPLE_RATE) if segments else end
+        return segments
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(live, "time", types.SimpleNamespace(perf_counter=lambda: now[0]))
+    monkeypatch.setattr(live, "torch", types.SimpleNamespace(no_grad=contextlib.nullcontext))
+    return now
+
+
+def test_latencies_use_arrival_of_committed_audio(clock):
+    stream = LiveAudioStream("-")
+    for second in range(10):
+        clock[0] = float(second)  # Sekunde n ist zum Zeitpunkt n vollständig gelesen
+        stream.append(np.zeros(SAMPLE_RATE, dtype=np.int16))
+    stream.finished = True
+    clock[0] = 100.0
+
+    segments = [{"start": 0.0, "end": end, "text": "x"} for end in (1.0, 5.0, 9.0)]
+    commits = []
+    ScriptedTranscriber([segments]).run(stream, lambda committed, latencies: commits.append(latencies))
+    assert commits == [[100.0, 96.0, 92.0]]
+
+
+def test_discard_keeps_later_samples(clock):
+    stream = LiveAudioStream("-")
+    stream.append(np.arange(3 * SAMPLE_RATE, dtype=np.int16))
+    stream.discard(SAMPLE_RATE)
+    assert len(stream) == 3 * SAMPLE_RATE
+    np.testing.assert_array_equal(stream[SAMPLE_RATE:SAMPLE_RATE + 2] * 32768.0, [SAMPLE_RATE, SAMPLE_RATE + 1])
@@ -0,0 +1,93 @@
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import parallel
+from core import SAMPLE_RATE
+from parallel import ParallelChunkTranscriber
+
+
+class RecordingAudio:
+    """Audio, das festhält, welche Abschnitte gelesen wurden"""
+    def __init__(self, seconds):
+        self.samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+        self.reads = []
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        if index.start:
+            self.reads.append(index.start)
+        return self.samples[index]
+
+
+class ThreadPool:
+    """Ersatz für den Prozesspool: führt die Abschnitte in Threads aus, sobald release gesetzt ist"""
+    def __init__(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+        self.release = threading.Event()
+
+    def submit(self, function, chunk, tasks, decoding):
+        def run():
+            self.release.wait(5)
+            return function(chunk, tasks, decoding)
+        return self.executor.submit(run)
+
+
+def transcribe_chunk(audio, tasks, decoding):
+    segment = {"seek": 0, "start": 0.0, "end": len(audio) / SAMPLE_RATE, "text": " x"}
+    return {"de": {"text": " x", "segments": [segment], "language": "de"}}, {}, {}, 1, {}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ThreadPool()
+    monkeypatch.setattr(parallel, "choose_pool_size", lambda model_id, cores, precision, max_workers: (4, 1))
+    monkeypatch.setattr(parallel.CHUNK_POOL, "get", lambda *args: pool)
+    monkeypatch.setattr(parallel, "_transcribe_chunk", transcribe_chunk)
+    yield pool
+    pool.release.set()
+    pool.executor.shutdown()
+
+
+def test_chunks_are_read_and_submitted_lazily(pool):
+    audio = RecordingAudio(20 * 60)
+    transcriber = ParallelChunkTranscriber("tiny", 4, tasks={"de": {"task": "transcribe", "language": "de"}})
+    results = []
+    thread = threading.Thread(target=lambda: results.append(transcriber.transcribe(audio)))
+    thread.start()
+    time.sleep(0.3)
+    # Vier Worker plus Vorlauf; der erste Abschnitt beginnt bei 0 und wird nicht gezählt
+    assert len(audio.reads) == 4 + parallel.CHUNK_IN_FLIGHT_EXTRA - 1
+    pool.release.set()
+    thread.join(5)
+    segments = results[0]["de"]["segments"]
+    assert len(segments) == 8
+    assert [segment["start"] for segment in segments] == sorted(segment["start"] for segment in segments)
+    assert segments[-1]["end"] == pytest.approx(20 * 60)
+
+
+def test_cancel_stops_running_chunks_and_keeps_pool():
+    chunk_pool = parallel.ChunkPool()
+    chunk_pool._cancel = threading.Event()
+    started = threading.Event()
+
+    def decode():
+        # Wie MultiTaskTranscriber.transcribe: Abbruch zwischen zwei Fenstern
+        started.set()
+        while not chunk_pool._cancel.wait(0.01):
+            pass
+        raise InterruptedError("Transkription wurde abgebrochen")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        running = executor.submit(decode)
+        queued = executor.submit(decode)
+        started.wait(5)
+        chunk_pool.cancel([running, queued])
+        assert queued.cancelled()
+        assert isinstance(running.exception(), InterruptedError)
+        assert not chunk_pool._cancel.is_set()
@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+import resources
+from resources import ModelCache, ResourceProfiles, ResourceScheduler
+
+
+class PlannedWorker:
+    """Die Attribute eines TranscriptionWorker, die ResourceScheduler.plan liest und ändert"""
+    def __init__(self, model_id, precision="fp32", cascade_model=None, parallel=False, audio_duration=None):
+        self.model_id = model_id
+        self.device_type = "cpu"
+        self.precision = precision
+        self.cascade_model = cascade_model
+        self.parallel = parallel
+        self.audio_duration = audio_duration
+        self.num_cores_to_use = 16
+        self.max_workers = None
+        self.decoding = {"draft_model": None, "batch_memory_mb": None}
+
+    def apply_resources(self, model_id=None, precision=None, cascade=True):
+        if model_id:
+            self.model_id = model_id
+        if precision:
+            self.precision = precision
+        if not cascade:
+            self.cascade_model = None
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, "cpu_supports_bf16", lambda: False)
+    return ResourceScheduler(profiles=ResourceProfiles(str(tmp_path / "profiles.json")))
+
+
+def test_plan_keeps_fitting_job(scheduler):
+    scheduler.budget_mb = 100000
+    worker = PlannedWorker("medium")
+    assert scheduler.plan(worker) == []
+    assert (worker.model_id, worker.precision) == ("medium", "fp32")
+
+
+def test_plan_reduces_precision_first(scheduler):
+    scheduler.budget_mb = 2000
+    worker = PlannedWorker("medium")
+    assert scheduler.plan(worker) == ["CPU-Genauigkeit INT8"]
+    assert (worker.model_id, worker.precision) == ("medium", "int8")
+
+
+def test_plan_drops_cascade_before_model(scheduler):
+    scheduler.budget_mb = 2000
+    worker = PlannedWorker("medium", cascade_model="large-v3")
+    assert scheduler.plan(worker) == ["CPU-Genauigkeit INT8", "ohne Kaskade"]
+    assert worker.model_id == "medium" and worker.cascade_model is None
+
+
+def test_plan_falls_back_to_smaller_model(scheduler):
+    scheduler.budget_mb = 1000
+    worker = PlannedWorker("medium")
+    assert scheduler.plan(worker) == ["CPU-Genauigkeit INT8", "Modell small"]
+    assert worker.model_id == "small"
+
+
+def test_plan_reduces_workers_before_precision(scheduler, monkeypatch):
+    monkeypatch.setattr(
+        resources, "choose_pool_size", lambda model_id, cores, precision, max_workers: (min(4, max_workers or 4), 4)
+    )
+    scheduler.budget_mb = 1000
+    worker = PlannedWorker("tiny", parallel=True, audio_duration=3600)
+    assert scheduler.plan(worker) == ["3 Worker-Prozesse", "2 Worker-Prozesse", "ohne Parallelmodus"]
+    assert worker.precision == "fp32" and not worker.parallel
+
+
+def test_plan_fails_when_nothing_fits(scheduler):
+    scheduler.budget_mb = 100
+    with pytest.raises(RuntimeError):
+        scheduler.plan(PlannedWorker("small"))
+
+
+def test_measured_profile_replaces_table_values(scheduler):
+    estimate = scheduler.estimate("small", "cpu")
+    scheduler.profiles.record_model("small", "cpu", "fp32", 100.0)
+    assert scheduler.estimate("small", "cpu")["model"] == pytest.approx(100.0 * resources.PROFILE_SAFETY_FACTOR)
+    assert scheduler.estimate("small", "cpu")["ram"] < estimate["ram"]
+
+
+def test_model_cache_loads_outside_global_lock(tmp_path, monkeypatch):
+    release = threading.Event()
+    loads = []
+
+    def load_model(model_name, device, dtype):
+        loads.append(model_name)
+        if model_name == "medium":
+            release.wait(5)
+        return f"{model_name}-model"
+
+    monkeypatch.setattr(resources, "load_model", load_model)
+    monkeypatch.setattr(resources, "loaded_model_mb", lambda model: 10.0)
+    monkeypatch.setattr(resources.RESOURCES, "profiles", ResourceProfiles(str(tmp_path / "profiles.json")))
+    cache = ModelCache(budget_mb=100000)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("medium", "cpu"))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    # Ein anderes Modell wartet nicht auf den laufenden Ladevorgang
+    assert cache.get("tiny", "cpu") == "tiny-model"
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["medium-model", "medium-model"]
+    assert loads.count("medium") == 1
+    assert resources.RESOURCES.profiles.get("medium", "cpu", "fp32")["model_mb"] == 10.0
+
+
+def test_model_cache_keeps_models_the_scheduler_admitted(tmp_path, monkeypatch):
+    # 16 GB RAM: Modell und Kaskadenmodell (ca. 8,6 GB) passen ins Budget der Zulassung (85 %)
+    total = 16 * 1024**3
+    monkeypatch.setattr(resources, "psutil", type("psutil", (), {
+        "virtual_memory": staticmethod(lambda: type("memory", (), {"total": total})()),
+    }))
+    monkeypatch.setattr(resources, "load_model", lambda model_name, device, dtype: model_name)
+    monkeypatch.setattr(resources, "loaded_model_mb", lambda model: resources.model_memory_mb(model, "cpu"))
+    monkeypatch.setattr(resources, "RESOURCES", ResourceScheduler(
+        budget_mb=None, profiles=ResourceProfiles(str(tmp_path / "profiles.json"))
+    ))
+    cache = ModelCache()
+    monkeypatch.setattr(cache, "_release_memory", lambda: None)
+    cache.get("medium", "cpu")
+    cache.get("large-v3", "cpu")
+    assert cache.loaded() == [("medium", "cpu", "fp32"), ("large-v3", "cpu", "fp32")]
+
+    # --memory-budget-mb begrenzt auch den Modell-Cache
+    resources.RESOURCES.budget_mb = 6000
+    cache.get("small", "cpu")
+    assert cache.loaded() == [("small", "cpu", "fp32")]
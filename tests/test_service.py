@@ -0,0 +1,121 @@
+import http.client
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import service
+from service import ServiceRequestHandler, TranscriptionService, create_service_token, read_service_token
+
+
+class FakeDeviceManager:
+    cuda_info = {"available": False}
+    current_device = "cpu"
+
+
+class FakeWorker:
+    """Nimmt die geprüften Optionen entgegen wie TranscriptionWorker"""
+    def __init__(self, job, options):
+        self.options = options
+        self.video_path = options["video_path"]
+        self.base_filename = options["base_filename"]
+        self.model_id = options["model_name"]
+
+
+class FakePipeline:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, worker, priority):
+        self.submitted.append((worker, priority))
+
+
+@pytest.fixture
+def transcription_service(monkeypatch):
+    monkeypatch.setattr(service, "DeviceManager", FakeDeviceManager)
+    return TranscriptionService(lambda on_state: FakePipeline(), FakeWorker)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "talk.mp4"
+    path.write_bytes(b"")
+    return str(path)
+
+
+@pytest.fixture
+def server(transcription_service):
+    handler = type("Handler", (ServiceRequestHandler,), {"service": transcription_service, "token": "geheim"})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def send(server, method, path, body=None, token="geheim", content_type="application/json"):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    headers = {"Content-Type": content_type}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    status, data = response.status, json.loads(response.read())
+    connection.close()
+    return status, data
+
+
+def test_token_file_is_private(tmp_path):
+    path = str(tmp_path / "service" / "service.token")
+    token = create_service_token(path)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert read_service_token(path) == token == create_service_token(path)
+    if os.name != "nt":
+        os.chmod(path, 0o644)
+        with pytest.raises(PermissionError):
+            read_service_token(path)
+
+
+def test_requests_need_token_and_json(server, video):
+    body = json.dumps({"video": video})
+    assert send(server, "GET", "/health", token=None)[0] == 200
+    assert send(server, "GET", "/jobs", token=None)[0] == 401
+    assert send(server, "GET", "/jobs", token="falsch")[0] == 401
+    assert send(server, "POST", "/jobs", body, token=None)[0] == 401
+    assert send(server, "POST", "/jobs", body, content_type="text/plain")[0] == 415
+    status, data = send(server, "POST", "/jobs", body)
+    assert status == 202
+    assert send(server, "GET", f"/jobs/{data['id']}/events?from=x")[0] == 400
+    assert send(server, "GET", f"/jobs/{data['id']}/events?from=-1")[0] == 400
+
+
+@pytest.mark.parametrize("request_body", [
+    [],
+    {"video": ["talk.mp4"]},
+    {"output_base": 42},
+    {"output_base": "/nicht/vorhanden/talk"},
+    {"priority": "hoch"},
+    {"num_cores": True},
+    {"parallel": "ja"},
+    {"formats": [{"srt": 1}]},
+    {"subtitles": {"max_lines": "zwei"}},
+])
+def test_invalid_requests_are_rejected(server, video, request_body):
+    if isinstance(request_body, dict):
+        request_body = dict({"video": video}, **request_body)
+    status, data = send(server, "POST", "/jobs", json.dumps(request_body))
+    assert status == 400, data
+
+
+def test_submit_passes_checked_options(transcription_service, video, tmp_path):
+    job = transcription_service.submit({
+        "video": video, "output_base": str(tmp_path / "out"), "priority": -1, "num_cores": 4, "formats": ["vtt"]
+    })
+    assert job.priority == -1
+    assert job.worker.base_filename == str(tmp_path / "out")
+    assert job.worker.options["num_cores_to_use"] == 4
+    assert job.worker.options["subtitle_formats"] == ("vtt",)
+    assert transcription_service.pipeline.submitted == [(job.worker, -1)]
@@ -0,0 +1,66 @@
+import pytest
+
+from subtitles import SUBTITLE_CUE_GAP_SECONDS, SubtitleLayout, SubtitleSegmenter, format_timestamp
+
+
+def words_segment(text, start, seconds_per_word):
+    words = []
+    for index, word in enumerate(text.split()):
+        begin = start + index * seconds_per_word
+        words.append({"word": " " + word, "start": begin, "end": begin + seconds_per_word * 0.9})
+    return {"start": start, "end": words[-1]["end"], "text": text, "words": words}
+
+
+def segment_all(segments, layout):
+    segmenter = SubtitleSegmenter(layout)
+    cues = segmenter.add(segments)
+    return cues + segmenter.finish()
+
+
+def test_cues_respect_line_limits():
+    text = ("der schnelle braune Fuchs springt über den faulen Hund und läuft danach noch "
+            "eine ganze Weile durch den verschneiten Wald bis zum Fluss")
+    layout = SubtitleLayout(max_line_chars=20, max_lines=2, max_seconds=60)
+    cues = segment_all([words_segment(text, 0.0, 0.3)], layout)
+    assert len(cues) > 1
+    for cue in cues:
+        assert 1 <= len(cue["lines"]) <= 2
+        assert all(len(line) <= 20 for line in cue["lines"])
+    assert " ".join(cue["text"] for cue in cues) == text
+
+
+def test_cues_are_extended_for_reading_speed():
+    layout = SubtitleLayout(max_cps=10.0, min_seconds=1.0)
+    first = words_segment("Das ist ein recht langer Satz.", 0.0, 0.1)
+    second = words_segment("Danach", 10.0, 0.1)
+    first_cue, second_cue = segment_all([first, second], layout)
+    # 30 Zeichen bei 10 Zeichen pro Sekunde
+    assert first_cue["end"] == pytest.approx(3.0)
+    assert second_cue["end"] == pytest.approx(11.0)  # Mindestdauer
+
+
+def test_extension_stops_before_next_cue():
+    layout = SubtitleLayout(max_cps=5.0, max_gap_seconds=0.5)
+    first = words_segment("Ein ziemlich langer erster Satz.", 0.0, 0.1)
+    second = words_segment("Weiter", 2.0, 0.1)
+    first_cue, second_cue = segment_all([first, second], layout)
+    assert first_cue["end"] == pytest.approx(2.0 - SUBTITLE_CUE_GAP_SECONDS)
+    assert second_cue["start"] == pytest.approx(2.0)
+
+
+def test_long_pause_starts_new_cue():
+    layout = SubtitleLayout(max_gap_seconds=1.0)
+    cues = segment_all([words_segment("eins zwei", 0.0, 0.2), words_segment("drei", 5.0, 0.2)], layout)
+    assert [cue["text"] for cue in cues] == ["eins zwei", "drei"]
+
+
+def test_segments_without_words_are_spread_by_characters():
+    cues = segment_all([{"start": 0.0, "end": 2.0, "text": " ab abcd"}], SubtitleLayout())
+    cue, = cues
+    assert cue["text"] == "ab abcd"
+    assert cue["start"] == 0.0
+
+
+def test_format_timestamp():
+    assert format_timestamp(3723.456) == "01:02:03,456"
+    assert format_timestamp(0.5, ".") == "00:00:00.500"
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from core import SAMPLE_RATE
+from vad import SpeechTimeline, detect_speech
+
+# Sprache bei 1-3 s und 10-12 s einer 15-Sekunden-Aufnahme
+REGIONS = [(1 * SAMPLE_RATE, 3 * SAMPLE_RATE), (10 * SAMPLE_RATE, 12 * SAMPLE_RATE)]
+
+
+def test_timeline_maps_compact_times_to_original():
+    timeline = SpeechTimeline(REGIONS, 15 * SAMPLE_RATE)
+    assert timeline.skipped_fraction() == pytest.approx(11 / 15)
+    assert timeline.to_original(0.0) == pytest.approx(1.0)
+    assert timeline.to_original(1.5) == pytest.approx(2.5)
+    assert timeline.to_original(3.0) == pytest.approx(11.0)
+    # Die Grenze zwischen den Bereichen: ein Start gehört zum zweiten, ein Ende zum ersten Bereich
+    assert timeline.to_original(2.0) == pytest.approx(10.0)
+    assert timeline.to_original(2.0, is_end=True) == pytest.approx(3.0)
+
+
+def test_timeline_remaps_segments_and_words():
+    timeline = SpeechTimeline(REGIONS, 15 * SAMPLE_RATE)
+    words = [{"word": " eins", "start": 0.5, "end": 2.0}, {"word": " zwei", "start": 2.0, "end": 3.5}]
+    segments = timeline.remap_segments([{"start": 0.5, "end": 3.5, "seek": 0, "text": " eins zwei", "words": words}])
+    segment, = segments
+    assert (segment["start"], segment["end"]) == pytest.approx((1.5, 11.5))
+    assert segment["seek"] == 150
+    assert [(word["start"], word["end"]) for word in segment["words"]] == [(1.5, 3.0), (10.0, 11.5)]
+    assert words[0]["start"] == 0.5  # Die ursprüngliche Wortliste bleibt unverändert
+
+
+def test_compact_audio_reads_across_regions():
+    audio = np.arange(15 * SAMPLE_RATE, dtype=np.float32)
+    compact = SpeechTimeline(REGIONS, len(audio)).compact(audio)
+    assert len(compact) == 4 * SAMPLE_RATE
+    np.testing.assert_array_equal(compact[:], np.concatenate([audio[16000:48000], audio[160000:192000]]))
+    np.testing.assert_array_equal(compact[31990:32010], np.concatenate([audio[47990:48000], audio[160000:160010]]))
+
+
+def test_timeline_without_speech_keeps_times():
+    assert SpeechTimeline([], 15 * SAMPLE_RATE).to_original(4.2) == 4.2
+
+
+def test_detect_speech_finds_loud_region():
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 0.001, 10 * SAMPLE_RATE).astype(np.float32)
+    audio[3 * SAMPLE_RATE:6 * SAMPLE_RATE] += np.sin(np.arange(3 * SAMPLE_RATE) * 0.1).astype(np.float32) * 0.5
+    (start, end), = detect_speech(audio)
+    assert 2.5 * SAMPLE_RATE <= start <= 3 * SAMPLE_RATE
+    assert 6 * SAMPLE_RATE <= end <= 6.5 * SAMPLE_RATE
@@ -0,0 +1,131 @@
+"""Sprachaktivitätserkennung (VAD) vor der Transkription"""
+
+import numpy as np
+import bisect
+from core import FRAME_SAMPLES, HOP_LENGTH, SAMPLE_RATE, AudioSource, frame_energy_db
+
+VAD_MARGIN_DB = 12.0  # Abstand der Sprachschwelle zum Grundrauschen
+VAD_MIN_THRESHOLD_DB = -60.0
+VAD_MIN_SPEECH_SECONDS = 0.25
+VAD_MIN_SILENCE_SECONDS = 1.0  # Kürzere Pausen werden nicht herausgeschnitten
+VAD_PADDING_SECONDS = 0.3
+
+def detect_speech(audio):
+    """Findet Sprachbereiche anhand der Frame-Energie relativ zum Grundrauschen
+
+    Gibt eine Liste von (Start, Ende) in Samples zurück.
+    """
+    energy = frame_energy_db(audio)
+    if len(energy) == 0:
+        return []
+    noise_floor = float(np.percentile(energy, 10))
+    threshold = max(noise_floor + VAD_MARGIN_DB, VAD_MIN_THRESHOLD_DB)
+    speech = np.concatenate(([0], (energy > threshold).astype(np.int8), [0]))
+    changes = np.diff(speech)
+    starts = np.flatnonzero(changes == 1)
+    ends = np.flatnonzero(changes == -1)
+
+    frames_per_second = SAMPLE_RATE / FRAME_SAMPLES
+    min_silence = VAD_MIN_SILENCE_SECONDS * frames_per_second
+    min_speech = VAD_MIN_SPEECH_SECONDS * frames_per_second
+    padding = int(VAD_PADDING_SECONDS * frames_per_second)
+
+    # Kurze Pausen überbrücken, kurze Geräusche verwerfen
+    regions = []
+    for start, end in zip(starts, ends):
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    regions = [(start, end) for start, end in regions if end - start >= min_speech]
+
+    # Ränder erweitern und überlappende Bereiche zusammenfassen
+    padded = []
+    for start, end in regions:
+        start, end = max(0, start - padding), min(len(energy), end + padding)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    return [(int(start) * FRAME_SAMPLES, min(len(audio), int(end) * FRAME_SAMPLES)) for start, end in padded]
+
+class SpeechTimeline:
+    """Bildet Zeiten im gekürzten Audio (nur Sprache) auf Zeiten im Originalvideo ab"""
+    def __init__(self, regions, total_samples):
+        self.regions = regions
+        self.total_samples = total_samples
+        self.compact_starts = []
+        position = 0
+        for start, end in regions:
+            self.compact_starts.append(position)
+            position += end - start
+        self.speech_samples = position
+
+    def skipped_fraction(self):
+        if self.total_samples == 0:
+            return 0.0
+        return 1 - self.speech_samples / self.total_samples
+
+    def compact(self, audio):
+        """Gibt nur die Sprachbereiche als zusammenhängende Audioquelle zurück (ohne Kopie)"""
+        return CompactAudio(audio, self.regions, self.compact_starts, self.speech_samples)
+
+    def to_original(self, seconds, is_end=False):
+        """Rechnet eine Zeit im gekürzten Audio in eine Zeit im Original um
+
+        Endzeiten genau auf einer Bereichsgrenze gehören zum vorherigen Bereich.
+        """
+        if not self.regions:
+            return seconds
+        sample = seconds * SAMPLE_RATE
+        if is_end:
+            index = bisect.bisect_left(self.compact_starts, sample) - 1
+        else:
+            index = bisect.bisect_right(self.compact_starts, sample) - 1
+        index = max(0, index)
+        return (self.regions[index][0] + sample - self.compact_starts[index]) / SAMPLE_RATE
+
+    def remap_segments(self, segments):
+        """Überträgt Segmentzeiten (in place) auf die Zeitachse des Originals"""
+        for segment in segments:
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"], is_end=True)
+            segment["seek"] = round(segment["start"] * SAMPLE_RATE) // HOP_LENGTH
+            if "words" in segment:
+                # Neue Wortlisten, da Segmentkopien (siehe TranscriptionWorker.decode) sie sonst teilen
+                segment["words"] = [
+                    dict(word, start=self.to_original(word["start"]), end=self.to_original(word["end"], is_end=True))
+                    for word in segment["words"]
+                ]
+        return segments
+
+    def remap(self, results):
+        """Überträgt die Segmentzeiten aller Ergebnisse auf die Zeitachse des Originals"""
+        for result in results.values():
+            self.remap_segments(result["segments"])
+        return results
+
+class CompactAudio(AudioSource):
+    """Aneinandergereihte Sprachbereiche einer Audioquelle, gelesen erst beim Zugriff"""
+    def __init__(self, source, regions, compact_starts, total):
+        self.source = source
+        self.regions = regions
+        self.compact_starts = compact_starts
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def read(self, start, stop):
+        parts = []
+        index = max(0, bisect.bisect_right(self.compact_starts, start) - 1)
+        while start < stop and index < len(self.regions):
+            region_start, region_end = self.regions[index]
+            offset = start - self.compact_starts[index]
+            end = min(region_end, region_start + offset + stop - start)
+            parts.append(np.asarray(self.source[region_start + offset:end], dtype=np.float32))
+            start += end - region_start - offset
+            index += 1
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)